@@ -0,0 +1,107 @@
+"""练习目录加载与 ExerciseRunner 的基准测试"""
+import shutil
+import tempfile
+from pathlib import Path
+
+import toml
+
+from gitlings.core import metrics
+from gitlings.core.catalog import Catalog
+from gitlings.core.runner import ExerciseRunner
+
+from harness import benchmark
+
+EXERCISES_DIR = Path(__file__).resolve().parent.parent / "exercises"
+SYNTHETIC_EXERCISES = 500
+
+_tmp = Path(tempfile.mkdtemp(prefix="gitlings-bench-"))
+
+
+def synthetic_catalog(count: int) -> Path:
+    """生成 count 个练习(每个分类 50 个)的目录"""
+    root = _tmp / f"exercises-{count}"
+    if root.exists():
+        return root
+    for i in range(count):
+        exercise = root / f"topic{i // 50}" / f"exercise{i}"
+        exercise.mkdir(parents=True)
+        (exercise / "meta.toml").write_text(toml.dumps({
+            'exercise': {'name': f"Exercise {i}", 'difficulty': i % 3 + 1},
+            'verification': {'checks': [f"branch_exists:feature{i} @ 创建 feature{i} 分支"]},
+        }))
+        (exercise / "exercise.md").write_text(f"# Exercise {i}\n\nCreate branch feature{i}.\n")
+    return root
+
+
+def cache_dir(name: str) -> Path:
+    path = _tmp / name
+    shutil.rmtree(path, ignore_errors=True)
+    return path
+
+
+@benchmark("catalog.cold", repeat=5)
+def catalog_cold():
+    root = synthetic_catalog(SYNTHETIC_EXERCISES)
+    cache = cache_dir("cold")
+    return lambda: Catalog(root, cache).exercises()
+
+
+@benchmark("catalog.warm", number=10)
+def catalog_warm():
+    root = synthetic_catalog(SYNTHETIC_EXERCISES)
+    cache = cache_dir("warm")
+    Catalog(root, cache)  # 写入缓存
+    return lambda: Catalog(root, cache).exercises()
+
+
+@benchmark("runner.load", number=10)
+def runner_load():
+    # 使用仓库自带的练习, 走默认缓存目录
+    ExerciseRunner(EXERCISES_DIR)
+    return lambda: ExerciseRunner(EXERCISES_DIR)
+
+
+@benchmark("runner.shared_exercises", number=200)
+def runner_shared():
+    exercises = Catalog(EXERCISES_DIR).exercises()
+    return lambda: ExerciseRunner(EXERCISES_DIR, exercises=exercises)
+
+
+@benchmark("runner.execute_verify", number=200)
+def runner_execute_verify():
+    runner = ExerciseRunner(EXERCISES_DIR)
+    runner.execute("git init")
+    counter = iter(range(1_000_000))
+
+    def run():
+        runner.execute(f"git branch topic{next(counter)}")
+        runner.verify()
+    return run
+
+
+@benchmark("runner.undo_redo", number=200)
+def runner_undo_redo():
+    runner = ExerciseRunner(EXERCISES_DIR)
+    runner.execute("git init")
+    for n in range(20):
+        runner.execute(f"git branch topic{n}")
+
+    def run():
+        runner.execute("gitlings undo")
+        runner.execute("gitlings redo")
+    return run
+
+
+@benchmark("runner.execute_verify.metrics", number=200)
+def runner_execute_verify_metrics():
+    # 与 runner.execute_verify 相同, 但开启埋点; 两者之差即记录的开销
+    execute_verify = runner_execute_verify()
+    recorder = metrics.Metrics()
+
+    def run():
+        metrics.enable(recorder)
+        try:
+            execute_verify()
+        finally:
+            metrics.disable()
+    return run
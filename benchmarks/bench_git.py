@@ -0,0 +1,257 @@
+"""VirtualGit 模拟器的基准测试"""
+from gitlings.core.virtual_git import VirtualGit
+
+from harness import benchmark
+
+LARGE_FILES = 10_000
+DEEP_HISTORY = 2_000
+
+
+def synthetic_files(count: int, lines: int = 20) -> dict:
+    """生成 count 个文件, 每个目录 100 个"""
+    return {
+        f"src/pkg{i // 100}/module{i}.py": "".join(f"value_{i}_{n} = {n}\n" for n in range(lines))
+        for i in range(count)
+    }
+
+
+def new_repo(files: int = 0, commits: int = 1) -> VirtualGit:
+    """初始化仓库, 提交 files 个文件, 再追加 commits - 1 个单文件提交"""
+    git = VirtualGit()
+    git.run_command("git init")
+    git.state['working_dir'].update(synthetic_files(files))
+    for n in range(commits):
+        if n:
+            git.state['working_dir']['history.txt'] = f"revision {n}\n"
+        git.run_command("git add .")
+        git.run_command(f"git commit -m 'commit {n}'")
+    return git
+
+
+# ---- 各子命令的吞吐量 ----
+@benchmark("git.status", number=200)
+def status():
+    git = new_repo(files=50, commits=10)
+    git.state['working_dir']['src/pkg0/module0.py'] = "changed\n"
+    return lambda: git.run_command("git status")
+
+
+@benchmark("git.add_commit", number=200)
+def add_commit():
+    git = new_repo(files=50, commits=10)
+    counter = iter(range(1_000_000))
+
+    def run():
+        n = next(counter)
+        git.state['working_dir'][f"src/pkg0/module{n % 50}.py"] = f"edit {n}\n"
+        git.run_command(f"git add src/pkg0/module{n % 50}.py")
+        git.run_command(f"git commit -m 'edit {n}'")
+    return run
+
+
+@benchmark("git.branch_checkout", number=200)
+def branch_checkout():
+    git = new_repo(files=50, commits=10)
+    git.run_command("git branch feature HEAD~5")
+
+    def run():
+        git.run_command("git checkout feature")
+        git.run_command("git checkout main")
+    return run
+
+
+@benchmark("git.diff", number=200)
+def diff():
+    git = new_repo(files=50, commits=10)
+    for n in range(5):
+        git.state['working_dir'][f"src/pkg0/module{n}.py"] += "appended line\n"
+    return lambda: git.run_command("git diff")
+
+
+@benchmark("git.diff_revs", number=200)
+def diff_revs():
+    git = new_repo(files=50, commits=10)
+    return lambda: git.run_command("git diff HEAD~9 HEAD --stat")
+
+
+@benchmark("git.tag", number=200)
+def tag():
+    git = new_repo(files=50, commits=10)
+    return lambda: git.run_command("git tag")
+
+
+@benchmark("git.merge", number=20)
+def merge():
+    git = new_repo(files=50, commits=2)
+    counter = iter(range(1_000_000))
+
+    def run():
+        n = next(counter)
+        git.run_command(f"git checkout -b topic{n}")
+        git.state['working_dir']['src/pkg0/module1.py'] += f"topic {n}\n"
+        git.run_command("git add .")
+        git.run_command(f"git commit -m 'topic {n}'")
+        git.run_command("git checkout main")
+        git.state['working_dir']['src/pkg0/module2.py'] += f"main {n}\n"
+        git.run_command("git add .")
+        git.run_command(f"git commit -m 'main {n}'")
+        git.run_command(f"git merge topic{n}")
+    return run
+
+
+# ---- 大工作区 ----
+@benchmark("git.add_all.large", repeat=3)
+def add_all_large():
+    git = new_repo(commits=1)
+    git.state['working_dir'].update(synthetic_files(LARGE_FILES))
+    return lambda: git.run_command("git add .")
+
+
+@benchmark("git.status.large", number=100, repeat=5)
+def status_large():
+    git = new_repo(files=LARGE_FILES, commits=1)
+    for n in range(0, LARGE_FILES, 500):
+        git.state['working_dir'][f"src/pkg{n // 100}/module{n}.py"] = "changed\n"
+    return lambda: git.run_command("git status")
+
+
+@benchmark("git.commit.large", repeat=3)
+def commit_large():
+    git = new_repo(files=LARGE_FILES, commits=1)
+    for n in range(0, LARGE_FILES, 100):
+        git.state['working_dir'][f"src/pkg{n // 100}/module{n}.py"] = "changed\n"
+    git.run_command("git add .")
+    return lambda: git.run_command("git commit -m 'touch every package'")
+
+
+def scattered_changes() -> VirtualGit:
+    """大仓库中每个目录都有改动"""
+    git = new_repo(files=LARGE_FILES, commits=1)
+    for n in range(0, LARGE_FILES, 5):
+        git.state['working_dir'][f"src/pkg{n // 100}/module{n}.py"] = "changed\n"
+    return git
+
+
+# 单次只需几十微秒, 调用次数和轮数太少时结果抖动很大
+@benchmark("git.add_dir.large", number=50, repeat=10)
+def add_dir_large():
+    # 只应访问 src/pkg7 子树中的 20 个改动; 每次都重新改写它们, 保证每次调用都有内容要暂存
+    git = scattered_changes()
+    paths = [f"src/pkg7/module{n}.py" for n in range(700, 800, 5)]
+    counter = iter(range(1_000_000))
+
+    def run():
+        n = next(counter)
+        for path in paths:
+            git.state['working_dir'][path] = f"changed {n}\n"
+        git.run_command("git add src/pkg7")
+    return run
+
+
+@benchmark("git.status_dir.large", number=100, repeat=10)
+def status_dir_large():
+    git = scattered_changes()
+    return lambda: git.run_command("git status src/pkg7")
+
+
+@benchmark("git.diff_dir.large", number=100, repeat=10)
+def diff_dir_large():
+    git = scattered_changes()
+    return lambda: git.run_command("git diff --stat src/pkg7")
+
+
+@benchmark("git.stash.large", number=10, repeat=3)
+def stash_large():
+    # 贮藏与恢复只应触及改动过的路径
+    git = scattered_changes()
+
+    def run():
+        git.run_command("git stash")
+        git.run_command("git stash pop")
+    return run
+
+
+# ---- 检查点 ----
+@benchmark("git.checkpoint.large", number=200)
+def checkpoint_large():
+    # 每次只改一个文件, 快照只应重写该文件所在的两层目录
+    git = new_repo(files=LARGE_FILES, commits=1)
+    git.checkpoint()
+    counter = iter(range(1_000_000))
+
+    def run():
+        n = next(counter)
+        git.state['working_dir'][f"src/pkg{n % 100}/module{n % LARGE_FILES}.py"] = f"edit {n}\n"
+        git.checkpoint()
+    return run
+
+
+@benchmark("git.restore.large", number=50, repeat=3)
+def restore_large():
+    # 两个检查点之间相差 20 个文件和一个提交, 来回切换
+    git = scattered_changes()
+    git.run_command("git add src/pkg7")
+    before = git.checkpoint()
+    git.run_command("git commit -m 'pkg7'")
+    after = git.checkpoint()
+
+    def run():
+        git.restore(before)
+        git.restore(after)
+    return run
+
+
+# ---- 深历史 ----
+_deep = None
+
+
+def deep_repo() -> VirtualGit:
+    # 只读的测试共用同一个仓库, 避免每轮重新生成两千个提交
+    global _deep
+    if _deep is None:
+        _deep = new_repo(files=10, commits=DEEP_HISTORY)
+    return _deep
+
+
+@benchmark("git.push_fetch.deep", number=100)
+def push_fetch_deep():
+    # 远程已有两千个提交, 每轮只应传输新提交的三个对象
+    git = new_repo(files=10, commits=DEEP_HISTORY)
+    git.run_command("git remote add hub file:///srv/deep.git")
+    git.run_command("git push -u hub main")
+    clone = VirtualGit(network=git.network)
+    clone.run_command("git clone file:///srv/deep.git")
+    counter = iter(range(1_000_000))
+
+    def run():
+        n = next(counter)
+        git.state['working_dir']['history.txt'] = f"pushed {n}\n"
+        git.run_command("git add history.txt")
+        git.run_command(f"git commit -m 'push {n}'")
+        git.run_command("git push")
+        clone.run_command("git pull")
+    return run
+
+
+@benchmark("git.log.deep", number=5, repeat=3)
+def log_deep():
+    git = deep_repo()
+    return lambda: git.run_command("git log")
+
+
+@benchmark("git.log_oneline.deep", number=5, repeat=3)
+def log_oneline_deep():
+    git = deep_repo()
+    return lambda: git.run_command("git log --oneline")
+
+
+@benchmark("git.log_n.deep", number=200)
+def log_n_deep():
+    git = deep_repo()
+    return lambda: git.run_command("git log -n 10")
+
+
+@benchmark("git.rev_parse.deep", number=200)
+def rev_parse_deep():
+    git = deep_repo()
+    return lambda: git.run_command(f"git diff HEAD~{DEEP_HISTORY - 1} HEAD --stat")
@@ -0,0 +1,63 @@
+"""终端面板渲染的基准测试"""
+import io
+
+from rich.console import Console
+
+from gitlings.tui.interface import GitTerminal
+
+from harness import benchmark
+
+TRANSCRIPT_COMMANDS = 5_000
+VIEW_HEIGHT = 40
+
+
+class _Terminal(GitTerminal):
+    # 不挂载到 App 时没有尺寸, 固定可见行数
+    view_height = VIEW_HEIGHT
+
+
+def transcript_terminal(commands: int) -> _Terminal:
+    terminal = _Terminal(lambda command: "")
+    for n in range(commands):
+        terminal.update_content(
+            f"$ git log -n 2\n"
+            f"commit {n:040x}\nAuthor: Gitlings <gitlings@example.com>\n\n    commit {n}\n"
+        )
+    return terminal
+
+
+def draw(terminal: _Terminal, console: Console) -> None:
+    console.file = io.StringIO()
+    console.print(terminal.render())
+
+
+def new_console() -> Console:
+    return Console(file=io.StringIO(), width=120, height=VIEW_HEIGHT + 2,
+                   force_terminal=True, color_system="truecolor")
+
+
+@benchmark("tui.append", number=1000)
+def append():
+    terminal = _Terminal(lambda command: "")
+    return lambda: terminal.update_content("$ git status\nOn branch main\nnothing to commit")
+
+
+@benchmark("tui.render.long", number=50)
+def render_long():
+    terminal = transcript_terminal(TRANSCRIPT_COMMANDS)
+    console = new_console()
+    draw(terminal, console)  # 高亮缓存预热, 与用户停留在底部时一致
+    return lambda: draw(terminal, console)
+
+
+@benchmark("tui.render.scroll", number=50)
+def render_scroll():
+    # 每次向上翻一页, 新进入窗口的输出块需要重新高亮
+    terminal = transcript_terminal(TRANSCRIPT_COMMANDS)
+    console = new_console()
+    pages = iter(range(1_000_000))
+
+    def run():
+        terminal.view_offset = next(pages) * VIEW_HEIGHT
+        draw(terminal, console)
+    return run
@@ -0,0 +1,59 @@
+import gc
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+# 名称 -> Benchmark, 由 @benchmark 注册
+BENCHMARKS: Dict[str, "Benchmark"] = {}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    number: int  # 每轮调用次数, 结果按单次调用计
+    repeat: int
+
+
+@dataclass
+class Result:
+    name: str
+    best: float  # 单次调用的最短时间(秒), 用于与基线比较
+    median: float
+    number: int
+
+
+def benchmark(name: str, number: int = 1, repeat: int = 5):
+    """注册基准测试
+
+    被装饰的函数负责准备数据(不计时), 返回要计时的无参函数;
+    每一轮都会重新准备, 所以被测函数可以修改状态(例如 git add)。
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, number, repeat)
+        return setup
+    return decorator
+
+
+def run_benchmark(bench: Benchmark) -> Result:
+    samples: List[float] = []
+    for _ in range(bench.repeat):
+        func = bench.setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(bench.number):
+                func()
+            samples.append((time.perf_counter() - start) / bench.number)
+        finally:
+            gc.enable()
+    return Result(bench.name, min(samples), statistics.median(samples), bench.number)
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""运行基准测试并与保存的基线比较
+
+    python benchmarks/run.py              # 比较, 有回退时退出码为 1
+    python benchmarks/run.py --update     # 重新生成基线
+    python benchmarks/run.py -k git.log   # 只运行名称包含 git.log 的测试
+"""
+import json
+import platform
+import sys
+from pathlib import Path
+
+import click
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(BENCH_DIR), str(BENCH_DIR.parent / "src")]
+
+import bench_catalog  # noqa: E402,F401  注册基准测试
+import bench_git  # noqa: E402,F401
+import bench_tui  # noqa: E402,F401
+from harness import BENCHMARKS, format_time, run_benchmark  # noqa: E402
+
+BASELINE = BENCH_DIR / "baseline.json"
+
+
+def load_baseline(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get('results', {})
+    except (OSError, ValueError):
+        return {}
+
+
+@click.command()
+@click.option("-k", "keyword", default="", help="只运行名称包含该字符串的测试")
+@click.option("--update", is_flag=True, help="把本次结果写入基线")
+@click.option("--threshold", default=0.25, show_default=True,
+              help="比基线慢超过该比例视为回退")
+@click.option("--baseline", "baseline_path", type=click.Path(path_type=Path), default=BASELINE,
+              show_default=True)
+@click.option("--json", "json_output", type=click.Path(path_type=Path), default=None,
+              help="把结果写入 JSON 文件")
+def main(keyword, update, threshold, baseline_path, json_output):
+    """gitlings 基准测试"""
+    baseline = load_baseline(baseline_path)
+    selected = [bench for name, bench in sorted(BENCHMARKS.items()) if keyword in name]
+    if not selected:
+        click.echo(f"没有匹配 '{keyword}' 的基准测试")
+        sys.exit(2)
+
+    results = {}
+    regressions = []
+    for bench in selected:
+        result = run_benchmark(bench)
+        results[result.name] = {'best': result.best, 'median': result.median}
+        line = f"{result.name:<28} {format_time(result.best):>10} {format_time(result.median):>10}"
+        base = baseline.get(result.name, {}).get('best')
+        if base:
+            ratio = result.best / base - 1
+            line += f"  {ratio:+7.1%}"
+            if ratio > threshold:
+                regressions.append(result.name)
+                line = click.style(line + "  回退", fg="red")
+        else:
+            line += "  (无基线)"
+        click.echo(line)
+
+    if json_output:
+        json_output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if update:
+        # 只更新本次运行的测试, 保留其余基线
+        merged = {**baseline, **results}
+        baseline_path.write_text(json.dumps({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': dict(sorted(merged.items())),
+        }, indent=2) + "\n", encoding="utf-8")
+        click.echo(f"基线已写入 {baseline_path}")
+    elif regressions:
+        click.echo(f"{len(regressions)} 项比基线慢 {threshold:.0%} 以上: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
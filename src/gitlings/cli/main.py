@@ -1,19 +1,211 @@
 # src/gitlings/cli/main.py
+import asyncio
+import json
+import time
+from pathlib import Path
 import click
+from gitlings.core import metrics
+from gitlings.core.runner import ExerciseRunner
 from gitlings.core.virtual_git import VirtualGit
 from gitlings.tui.interface import GitlingsApp
-from gitlings.core.exercise import Exercise
+from gitlings.core.catalog import Catalog
+from gitlings.core.exercise import EXERCISES_DIR, Exercise
 
 @click.group()
 def cli():
     """Gitlings - Interactive Git learning tool"""
     pass
 
+_METRICS_HELP = "Record command timings to this file (.prom for Prometheus text, JSON otherwise)"
+
+
 @cli.command()
 @click.option("--exercise", default="basic/01_init", help="Exercise to start with")
-def start(exercise):
+@click.option("--repo", type=click.Path(file_okay=False), default=None,
+              help="Run commands with real git in this sandbox directory instead of the simulator")
+@click.option("--metrics", "metrics_path", type=click.Path(dir_okay=False), default=None,
+              help=_METRICS_HELP)
+@click.option("--watch/--no-watch", default=True,
+              help="Reload edited exercises and, with --repo, re-check after git runs outside the TUI")
+def start(exercise, repo, metrics_path, watch):
     """Start the interactive TUI"""
-    git_simulator = VirtualGit()
-    exercise_data = Exercise.load_exercise(exercise)
-    app = GitlingsApp(git_simulator.run_command, exercise_data)
-    app.run()
+    recorder = metrics.enable() if metrics_path else None
+    if repo:
+        from gitlings.core.real_git import RealGit
+        git_simulator = RealGit(Path(repo))
+    else:
+        git_simulator = VirtualGit()
+    catalog = Catalog(EXERCISES_DIR)
+    exercise_data = Exercise.load_exercise(exercise, catalog)
+    # 命令经由 ExerciseRunner 执行, gitlings undo/redo/reset 才能使用
+    runner = ExerciseRunner(EXERCISES_DIR, [catalog.get(exercise)], git=git_simulator)
+    checks = runner.checks
+    watchers = []
+    if watch:
+        from gitlings.core.watch import ExerciseWatcher, RepoWatcher
+
+        def exercise_changed(keys):
+            # 在监视线程中调用; 只关心当前练习
+            if exercise not in keys or exercise not in catalog:
+                return
+            data = Exercise.load_exercise(exercise, catalog)
+
+            def apply():
+                if data['checks'] != exercise_data['checks']:
+                    checks.load(data['checks'])
+                    exercise_data['checks'] = data['checks']
+                return checks.results()
+            app.call_from_thread(app.show_exercise, data)
+            app.external_change(apply)
+
+        def repo_changed():
+            def apply():
+                git_simulator.reload()
+                return checks.results()
+            app.external_change(apply)
+
+        watchers.append(ExerciseWatcher(catalog, exercise_changed))
+        if repo:
+            watchers.append(RepoWatcher(Path(repo), repo_changed))
+    app = GitlingsApp(runner.stream_command, exercise_data, verifier=checks.reevaluate,
+                      watchers=watchers)
+    try:
+        app.run()
+    finally:
+        if recorder:
+            recorder.save(Path(metrics_path))
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", help="Address to listen on")
+@click.option("--port", default=8765, help="TCP port to listen on")
+@click.option("--socket", "socket_path", default=None, help="Listen on a Unix socket instead of TCP")
+@click.option("--max-sessions", default=1000, help="Sessions kept in memory before spilling to disk")
+@click.option("--spill-dir", default=None, help="Directory for evicted sessions")
+@click.option("--metrics", "metrics_path", type=click.Path(dir_okay=False), default=None,
+              help=_METRICS_HELP)
+@click.option("--metrics-interval", default=15.0, help="Seconds between metrics file updates")
+def serve(host, port, socket_path, max_sessions, spill_dir, metrics_path, metrics_interval):
+    """Host many learner sessions in one process"""
+    from gitlings.server import SessionHost
+
+    recorder = metrics.enable() if metrics_path else None
+
+    async def save_metrics():
+        while True:
+            await asyncio.sleep(metrics_interval)
+            recorder.save(Path(metrics_path))
+
+    async def main():
+        exercises_dir = Path(__file__).parent.parent.parent / "exercises"
+        session_host = SessionHost(exercises_dir, spill_dir, max_sessions=max_sessions)
+        if socket_path:
+            server = await session_host.serve_unix(socket_path)
+        else:
+            server = await session_host.serve_tcp(host, port)
+        tasks = [asyncio.create_task(session_host.run_evictor())]
+        if recorder:
+            tasks.append(asyncio.create_task(save_metrics()))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await session_host.close()
+            if recorder:
+                recorder.save(Path(metrics_path))
+
+    asyncio.run(main())
+
+
+@cli.command()
+@click.argument("transcripts", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--sessions", default=100, help="Concurrent sessions; transcripts are assigned round-robin")
+@click.option("--verify", is_flag=True, help="Also verify after every command")
+@click.option("--files", default=0, help="Start every session from a synthetic repo with this many files")
+@click.option("--depth", default=2, help="Synthetic repo: maximum directory depth")
+@click.option("--commits", default=10, help="Synthetic repo: commits on main")
+@click.option("--branches", default=0, help="Synthetic repo: feature branches")
+@click.option("--tags", default=0, help="Synthetic repo: tags")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON")
+def replay(transcripts, sessions, verify, files, depth, commits, branches, tags, as_json):
+    """Replay recorded command transcripts through many sessions and report latency
+
+    TRANSCRIPTS are text files (one command per line), JSON command lists,
+    or session directories written by `gitlings serve`.
+    """
+    from gitlings.core.synthetic import generate_repo
+    from gitlings.server import load_transcripts
+    from gitlings.server import replay as run_replay
+
+    loaded = [t for path in transcripts for t in load_transcripts(Path(path))]
+    if not loaded:
+        raise click.ClickException("no commands found in the given transcripts")
+    seed_git = None
+    if files or branches or tags:
+        seed_git = generate_repo(files=files, depth=depth, commits=commits,
+                                 branches=branches, tags=tags)
+    exercises_dir = Path(__file__).parent.parent.parent / "exercises"
+    report = asyncio.run(run_replay(exercises_dir, loaded, sessions, verify=verify, seed_git=seed_git))
+
+    summary = report.summary()
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+        return
+    click.echo(f"{summary['sessions']} sessions, {summary['commands']} commands in {summary['elapsed']:.2f}s "
+               f"({summary['throughput']:.0f} commands/s)")
+    if summary['busy']:
+        click.echo(f"{summary['busy']} requests rejected as busy")
+    click.echo("latency: " + ", ".join(f"{key} {_format_seconds(summary[key])}"
+                                       for key in ("p50", "p95", "p99", "p999", "max")))
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.0f}µs"
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["table", "json", "prometheus"]), default="table",
+              help="Output format")
+def stats(path, fmt):
+    """Show metrics recorded with --metrics (JSON file)"""
+    from rich.console import Console
+    from rich.table import Table
+
+    try:
+        recorded = metrics.Metrics.load(Path(path))
+    except (ValueError, KeyError):
+        raise click.ClickException(f"{path} is not a gitlings metrics JSON file")
+    if fmt == "json":
+        click.echo(json.dumps(recorded.to_dict(), indent=2))
+        return
+    if fmt == "prometheus":
+        click.echo(recorded.to_prometheus(), nl=False)
+        return
+
+    table = Table(title=f"Command latency since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(recorded.started))}")
+    for column in ("command", "count", "mean", "p50", "p95", "p99", "max"):
+        table.add_column(column, justify="left" if column == "command" else "right")
+    rows = [(f"git {name}", hist) for name, hist in
+            sorted(recorded.commands.items(), key=lambda item: -item[1].total)]
+    rows += [("execute (total)", recorded.execute), ("verify", recorded.verify)]
+    for name, hist in rows:
+        if not hist.count:
+            continue
+        table.add_row(name, str(hist.count), _format_seconds(hist.total / hist.count),
+                      *(_format_seconds(hist.quantile(q)) for q in (0.5, 0.95, 0.99)),
+                      _format_seconds(hist.max))
+    console = Console()
+    console.print(table)
+    if recorded.state:
+        sizes = Table(title="Repository size")
+        for column in ("", "last", "max"):
+            sizes.add_column(column, justify="right" if column else "left")
+        for name, entry in sorted(recorded.state.items()):
+            sizes.add_row(name, str(entry['last']), str(entry['max']))
+        console.print(sizes)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .exercise import Exercise
+
+# 2: 缓存中的验证条件已在解析时检查过
+# 3: 记录根目录和分类目录的 mtime
+CATALOG_VERSION = 3
+
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "gitlings"
+
+
+class Catalog:
+    """练习目录索引
+
+    只在内存中保存元数据(名称、难度、验证条件), 并持久化到缓存文件;
+    启动时先比较根目录和各分类目录的 mtime, 都没变就直接使用缓存, 不再逐个 stat;
+    否则 stat 每个 meta.toml, 仅重新解析修改过的练习。
+    练习目录内的改动(原地修改或增删 meta.toml)不会改变这些 mtime: 运行期间由
+    ExerciseWatcher 调用 refresh, 其余情况传入 scan=True 强制逐个检查。
+    练习说明和提示在第一次访问时才读取。
+    """
+
+    def __init__(self, root: Path, cache_dir: Optional[Path] = None, scan: bool = False):
+        self.root = Path(root)
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self._entries: Dict[str, dict] = {}
+        # 加载时根目录和分类目录的 mtime, 随缓存保存
+        self._dirs: Dict[str, int] = {}
+        self._exercises: Dict[str, Exercise] = {}
+        self._load(scan)
+
+    @property
+    def cache_path(self) -> Path:
+        digest = hashlib.sha1(str(self.root.resolve()).encode()).hexdigest()[:12]
+        return self.cache_dir / f"catalog-{digest}.json"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[str]:
+        return sorted(self._entries)
+
+    def get(self, key: str) -> Exercise:
+        """按 "分类/目录名" 获取练习"""
+        exercise = self._exercises.get(key)
+        if exercise is None:
+            entry = self._entries[key]
+            exercise = Exercise(
+                entry['id'], entry['name'], entry['difficulty'], entry['checks'],
+                path=self.root / key,
+            )
+            self._exercises[key] = exercise
+        return exercise
+
+    def exercises(self) -> List[Exercise]:
+        return [self.get(key) for key in self.keys()]
+
+    def refresh(self, key: str) -> bool:
+        """重新读取单个练习(新增、修改或删除), 返回是否有变化"""
+        meta = self.root / key / "meta.toml"
+        old = self._entries.get(key)
+        if not meta.exists():
+            changed = self._entries.pop(key, None) is not None
+        else:
+            mtime = meta.stat().st_mtime_ns
+            if old is not None and old['mtime'] == mtime:
+                return False
+            self._entries[key] = self._parse(key, mtime)
+            changed = True
+        self._exercises.pop(key, None)
+        if changed:
+            self._save()
+        return changed
+
+    def invalidate(self, key: str) -> None:
+        """说明或提示改动后丢弃已加载的练习, 下次访问时重新读取"""
+        self._exercises.pop(key, None)
+
+    # ---- 缓存读写 ----
+    def _parse(self, key: str, mtime: int) -> dict:
+        exercise = Exercise.load(self.root / key)
+        return {
+            'id': exercise.id,
+            'name': exercise.name,
+            'difficulty': exercise.difficulty,
+            'checks': exercise.checks,
+            'mtime': mtime,
+        }
+
+    def _read_cache(self) -> dict:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != CATALOG_VERSION:
+            return {}
+        return data
+
+    def _dir_mtimes(self) -> Dict[str, int]:
+        """根目录("")和各分类目录的 mtime; 增删练习或分类会改变其中之一"""
+        mtimes = {"": self.root.stat().st_mtime_ns}
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                mtimes[entry.name] = entry.stat().st_mtime_ns
+        return mtimes
+
+    def _save(self) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(
+                {'version': CATALOG_VERSION, 'dirs': self._dirs, 'exercises': self._entries},
+                ensure_ascii=False,
+            ), encoding="utf-8")
+            tmp.replace(self.cache_path)
+        except OSError:
+            # 缓存只是加速手段, 写不了就每次重新解析
+            pass
+
+    def _load(self, scan: bool) -> None:
+        data = self._read_cache()
+        cached: Dict[str, dict] = data.get('exercises', {})
+        try:
+            self._dirs = self._dir_mtimes()
+        except OSError:
+            self._dirs = {}
+        if not scan and self._dirs and data.get('dirs') == self._dirs:
+            self._entries = cached
+            return
+        dirty = data.get('dirs') != self._dirs
+        for meta in self.root.glob("*/*/meta.toml"):
+            key = f"{meta.parent.parent.name}/{meta.parent.name}"
+            mtime = meta.stat().st_mtime_ns
+            entry = cached.get(key)
+            if entry is None or entry['mtime'] != mtime:
+                entry = self._parse(key, mtime)
+                dirty = True
+            self._entries[key] = entry
+        if dirty or len(self._entries) != len(cached):
+            self._save()
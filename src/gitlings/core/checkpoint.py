@@ -0,0 +1,78 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .refs import EMPTY_REFS, RefSnapshot
+
+
+@dataclass(frozen=True)
+class RepoState:
+    """VirtualGit 状态的不可变快照
+
+    工作区和暂存区以对象库中的目录树保存, 文件内容和未改动的子树与其他快照共享;
+    引用以分桶的元组保存(见 refs.RefMap), 同样共享未改动的桶;
+    其余部分(远程、进行中的合并等)都很小, 直接复制。
+    network 为模拟的远程仓库各自的快照, 撤销 push 时远程仓库一起回退;
+    后加的字段带默认值, 旧会话中保存的检查点仍然可用。
+    """
+    worktree: str
+    index: str
+    unmerged: Tuple[Tuple[str, tuple], ...]
+    repo_initialized: bool
+    current_branch: str
+    branches: RefSnapshot
+    tags: RefSnapshot
+    remotes: dict
+    stashes: tuple
+    conflict: bool
+    merge: Optional[dict]
+    sequence: Optional[dict]
+    remote_branches: RefSnapshot = EMPTY_REFS
+    upstream: Optional[dict] = None
+    config: Optional[dict] = None
+    network: Tuple[Tuple[str, "RepoState"], ...] = ()
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """ExerciseRunner 的检查点: 仓库状态加上各验证条件的状态"""
+    command: str  # 检查点之后执行的命令, 用于提示撤销了什么
+    repo: RepoState
+    checks: Tuple[dict, ...]
+
+    def same_state(self, other: "Checkpoint") -> bool:
+        return self.repo == other.repo and self.checks == other.checks
+
+
+class UndoStack:
+    """撤销/重做栈, 最多保留 limit 个检查点; 新的改动会清空重做栈"""
+
+    def __init__(self, limit: int = 1000):
+        self._undo: deque = deque(maxlen=limit)
+        self._redo: List[Checkpoint] = []
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def push(self, checkpoint: Checkpoint) -> None:
+        self._undo.append(checkpoint)
+        self._redo.clear()
+
+    def undo(self, current: Checkpoint) -> Optional[Checkpoint]:
+        """返回要恢复的检查点, current 进入重做栈"""
+        if not self._undo:
+            return None
+        previous = self._undo.pop()
+        self._redo.append(Checkpoint(previous.command, current.repo, current.checks))
+        return previous
+
+    def redo(self, current: Checkpoint) -> Optional[Checkpoint]:
+        if not self._redo:
+            return None
+        following = self._redo.pop()
+        self._undo.append(Checkpoint(following.command, current.repo, current.checks))
+        return following
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,250 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+# meta.toml 中的验证条件写作 "谓词[:参数] @ 描述", 例如:
+#   "file_exists:README.md @ 检查README文件"
+#   "commit_count:1 @ 检查提交次数"
+#   "commit_message:feat: @ 检查提交信息规范"
+#   "config_set:user.name @ 检查用户配置"
+# 早期练习使用的中文/命令式写法通过 LEGACY_CHECKS 映射到同样的谓词。
+
+
+class Check:
+    """编译后的验证条件, 订阅 VirtualGit 的状态事件并增量更新结果"""
+    events: tuple = ()
+
+    def __init__(self, desc: str, arg: Optional[str] = None):
+        self.desc = desc
+        self.arg = arg
+        self.passed = False
+
+    def reset(self, git) -> None:
+        """对当前状态做一次完整求值"""
+
+    def update(self, git, event: str, data: dict) -> None:
+        """根据单个事件增量更新"""
+        self.reset(git)
+
+
+class RepoInitialized(Check):
+    events = ('init',)
+
+    def reset(self, git) -> None:
+        self.passed = git.state['repo_initialized']
+
+
+class FileExists(Check):
+    events = ('command',)
+
+    def reset(self, git) -> None:
+        self.passed = self.arg in git.state['working_dir']
+
+
+class BranchExists(Check):
+    events = ('command', 'refs')
+
+    def reset(self, git) -> None:
+        self.passed = self.arg in git.state['branches']
+
+
+class TagExists(Check):
+    events = ('command', 'refs')
+
+    def reset(self, git) -> None:
+        self.passed = self.arg in git.state['tags']
+
+
+class OnBranch(Check):
+    events = ('command', 'refs')
+
+    def reset(self, git) -> None:
+        self.passed = git.state['current_branch'] == self.arg
+
+
+class CommandRun(Check):
+    """执行过某个 git 子命令"""
+    events = ('command',)
+
+    def reset(self, git) -> None:
+        pass
+
+    def update(self, git, event: str, data: dict) -> None:
+        if data['name'] == self.arg:
+            self.passed = True
+
+
+class ConfigSet(Check):
+    """git config 中设置了某个键"""
+    events = ('command',)
+
+    def reset(self, git) -> None:
+        self.passed = bool(git.config_value(self.arg))
+
+    def update(self, git, event: str, data: dict) -> None:
+        if data['name'] == 'config':
+            self.reset(git)
+
+
+class ConflictResolved(Check):
+    """出现过合并冲突并且已经解决"""
+    events = ('conflict',)
+
+    def __init__(self, desc: str, arg: Optional[str] = None):
+        super().__init__(desc, arg)
+        self._seen_conflict = False
+
+    def reset(self, git) -> None:
+        if git.state['conflict']:
+            self._seen_conflict = True
+        self.passed = self._seen_conflict and not git.state['conflict']
+
+
+class HistoryCheck(Check):
+    """基于 HEAD 可达提交的条件; HEAD 前进时只检查新增的提交"""
+    events = ('head',)
+
+    def reset(self, git) -> None:
+        self._start()
+        for sha, commit in git.iter_commits():
+            self._add(commit)
+
+    def update(self, git, event: str, data: dict) -> None:
+        old, new = data['old'], data['new']
+        if new is None:
+            self._start()
+        elif old is not None and git.graph.is_ancestor(old, new):
+            objects = git.state['objects']
+            for sha in git.graph.range([old], [new]):
+                self._add(objects.get(sha))
+        else:
+            self.reset(git)
+
+    def _start(self) -> None:
+        raise NotImplementedError
+
+    def _add(self, commit) -> None:
+        raise NotImplementedError
+
+
+class CommitCount(HistoryCheck):
+    def _start(self) -> None:
+        self.count = 0
+        self.passed = int(self.arg or 1) <= 0
+
+    def _add(self, commit) -> None:
+        self.count += 1
+        self.passed = self.count >= int(self.arg or 1)
+
+
+class CommitMessage(HistoryCheck):
+    def _start(self) -> None:
+        self.passed = False
+
+    def _add(self, commit) -> None:
+        if self.arg in commit.message:
+            self.passed = True
+
+
+class MergeCommit(HistoryCheck):
+    def _start(self) -> None:
+        self.passed = False
+
+    def _add(self, commit) -> None:
+        if len(commit.parents) > 1:
+            self.passed = True
+
+
+PREDICATES = {
+    'repo_initialized': RepoInitialized,
+    'file_exists': FileExists,
+    'branch_exists': BranchExists,
+    'tag_exists': TagExists,
+    'on_branch': OnBranch,
+    'command': CommandRun,
+    'config_set': ConfigSet,
+    'conflict_resolved': ConflictResolved,
+    'commit_count': CommitCount,
+    'commit_message': CommitMessage,
+    'merge_commit': MergeCommit,
+}
+
+LEGACY_CHECKS = {
+    'git init': ('repo_initialized', None),
+    'hello.txt存在': ('file_exists', 'hello.txt'),
+    '提交信息规范': ('commit_message', 'feat:'),
+    'git merge': ('command', 'merge'),
+    '解决README冲突': ('conflict_resolved', None),
+}
+
+
+def compile_check(spec: str) -> Check:
+    """把 "谓词[:参数] @ 描述" 编译为 Check 对象; 未知的谓词抛出 ValueError"""
+    check_id, _, desc = spec.partition("@")
+    check_id, desc = check_id.strip(), desc.strip() or check_id.strip()
+    if check_id in LEGACY_CHECKS:
+        name, arg = LEGACY_CHECKS[check_id]
+    else:
+        name, _, arg = check_id.partition(":")
+        name, arg = name.strip(), arg.strip() or None
+    if name not in PREDICATES:
+        raise ValueError(f"unknown check predicate '{name}' in {spec!r}")
+    return PREDICATES[name](desc, arg)
+
+
+class CheckEngine:
+    """把一组验证条件挂到 VirtualGit 上, 每条命令之后只更新关心相应事件的条件"""
+
+    def __init__(self, specs: List[str], git):
+        self.on_change: List[Callable[[Check], None]] = []
+        self.git = git
+        self.load(specs)
+        git.subscribe(self._on_event)
+
+    def load(self, specs: List[str]) -> None:
+        """换成另一组验证条件(例如练习被修改之后), 并对当前状态求值"""
+        self.checks = [compile_check(spec) for spec in specs]
+        self._by_event: Dict[str, List[Check]] = {}
+        for check in self.checks:
+            for event in check.events:
+                self._by_event.setdefault(event, []).append(check)
+        for check in self.checks:
+            check.reset(self.git)
+
+    def _on_event(self, event: str, data: dict) -> None:
+        for check in self._by_event.get(event, ()):
+            before = check.passed
+            check.update(self.git, event, data)
+            if check.passed != before:
+                for callback in self.on_change:
+                    callback(check)
+
+    def results(self) -> Dict[str, bool]:
+        return {check.desc: check.passed for check in self.checks}
+
+    def reevaluate(self) -> Dict[str, bool]:
+        """对当前状态完整求值一遍, 补上事件没有覆盖到的改动(例如直接编辑的文件)"""
+        for check in self.checks:
+            before = check.passed
+            check.reset(self.git)
+            if check.passed != before:
+                for callback in self.on_change:
+                    callback(check)
+        return self.results()
+
+    def snapshot(self) -> Tuple[dict, ...]:
+        """各条件的内部状态(是否通过、计数等), 配合仓库检查点一起撤销"""
+        return tuple(check.__dict__.copy() for check in self.checks)
+
+    def restore(self, states: Tuple[dict, ...]) -> None:
+        for check, saved in zip(self.checks, states):
+            before = check.passed
+            check.__dict__.clear()
+            check.__dict__.update(saved)
+            if check.passed != before:
+                for callback in self.on_change:
+                    callback(check)
+
+    def __getstate__(self):
+        # 界面回调不随会话一起序列化
+        state = self.__dict__.copy()
+        state['on_change'] = []
+        return state
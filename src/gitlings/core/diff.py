@@ -0,0 +1,332 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 匹配块 (a 起点, b 起点, 长度)
+Block = Tuple[int, int, int]
+# 编辑操作 (标签, a 起点, a 终点, b 起点, b 终点), 标签为 equal/delete/insert/replace
+Opcode = Tuple[str, int, int, int, int]
+
+ALGORITHMS = ('myers', 'patience', 'histogram')
+
+
+def split_lines(text: str) -> List[str]:
+    """按行切分并保留换行符, 以便区分末尾有无换行"""
+    return text.splitlines(keepends=True) if text else []
+
+
+def _myers(a, b, alo: int, ahi: int, blo: int, bhi: int, out: List[Block]) -> None:
+    """Myers O(ND) 贪心算法, 求 a[alo:ahi] 与 b[blo:bhi] 的最短编辑脚本"""
+    n, m = ahi - alo, bhi - blo
+    offset = n + m + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    x = y = 0
+    for d in range(n + m + 1):
+        # 保存上一轮的 V (k 属于 [-d, d]), 回溯时使用
+        trace.append(v[offset - d:offset + d + 1])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+
+    blocks = []
+    for d in range(len(trace) - 1, 0, -1):
+        prev = trace[d]
+        k = x - y
+        if k == -d or (k != d and prev[d + k - 1] < prev[d + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = prev[d + prev_k]
+        prev_y = prev_x - prev_k
+        # 编辑之后的对角线部分即为匹配
+        start_x = prev_x + (1 if prev_k == k - 1 else 0)
+        if x > start_x:
+            blocks.append((alo + start_x, blo + start_x - k, x - start_x))
+        x, y = prev_x, prev_y
+    if x > 0:
+        blocks.append((alo, blo, x))
+    out.extend(reversed(blocks))
+
+
+def _trim(a, b, alo: int, ahi: int, blo: int, bhi: int, out: List[Block]):
+    """去掉公共前缀和后缀, 把它们记为匹配块"""
+    start = 0
+    while alo + start < ahi and blo + start < bhi and a[alo + start] == b[blo + start]:
+        start += 1
+    if start:
+        out.append((alo, blo, start))
+    alo, blo = alo + start, blo + start
+    end = 0
+    while ahi - end > alo and bhi - end > blo and a[ahi - end - 1] == b[bhi - end - 1]:
+        end += 1
+    if end:
+        out.append((ahi - end, bhi - end, end))
+    return alo, ahi - end, blo, bhi - end
+
+
+def _patience_anchors(a, b, alo, ahi, blo, bhi) -> List[Tuple[int, int]]:
+    """两侧都只出现一次的行中, 按位置递增的最长公共子序列"""
+    in_a: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        entry = in_a.setdefault(a[i], [0, i])
+        entry[0] += 1
+    in_b: Dict[int, List[int]] = {}
+    for j in range(blo, bhi):
+        if b[j] in in_a:
+            entry = in_b.setdefault(b[j], [0, j])
+            entry[0] += 1
+    pairs = sorted((in_a[line][1], j) for line, (count, j) in in_b.items()
+                   if count == 1 and in_a[line][0] == 1)
+    # 按 b 中的位置求最长递增子序列(耐心排序)
+    tails: List[int] = []
+    tail_idx: List[int] = []
+    links: List[Optional[int]] = []
+    for idx, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        links.append(tail_idx[pos - 1] if pos else None)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(idx)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = idx
+    anchors = []
+    idx = tail_idx[-1] if tail_idx else None
+    while idx is not None:
+        anchors.append(pairs[idx])
+        idx = links[idx]
+    return anchors[::-1]
+
+
+def _histogram_anchor(a, b, alo, ahi, blo, bhi) -> Optional[Block]:
+    """在 a 中出现次数最少的公共行处取锚点, 并向两侧扩展成最长匹配"""
+    positions: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        positions.setdefault(a[i], []).append(i)
+    best = None
+    for j in range(blo, bhi):
+        found = positions.get(b[j])
+        if found and len(found) <= 64 and (best is None or len(found) < best[0]):
+            best = (len(found), found[0], j)
+            if best[0] == 1:
+                break
+    if best is None:
+        return None
+    _, i, j = best
+    start_i, start_j = i, j
+    while start_i > alo and start_j > blo and a[start_i - 1] == b[start_j - 1]:
+        start_i -= 1
+        start_j -= 1
+    end_i, end_j = i + 1, j + 1
+    while end_i < ahi and end_j < bhi and a[end_i] == b[end_j]:
+        end_i += 1
+        end_j += 1
+    return start_i, start_j, end_i - start_i
+
+
+def matching_blocks(a, b, algorithm: str = 'myers') -> List[Block]:
+    """两个行序列(已映射为整数)的匹配块, 按位置排序"""
+    out: List[Block] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = _trim(a, b, *stack.pop(), out)
+        if alo == ahi or blo == bhi:
+            continue
+        if algorithm == 'patience':
+            anchors = _patience_anchors(a, b, alo, ahi, blo, bhi)
+            if anchors:
+                # 锚点之间的区间分别递归
+                prev_i, prev_j = alo, blo
+                for i, j in anchors:
+                    if prev_i < i and prev_j < j:
+                        stack.append((prev_i, i, prev_j, j))
+                    out.append((i, j, 1))
+                    prev_i, prev_j = i + 1, j + 1
+                stack.append((prev_i, ahi, prev_j, bhi))
+                continue
+        elif algorithm == 'histogram':
+            anchor = _histogram_anchor(a, b, alo, ahi, blo, bhi)
+            if anchor:
+                i, j, size = anchor
+                out.append(anchor)
+                stack.append((alo, i, blo, j))
+                stack.append((i + size, ahi, j + size, bhi))
+                continue
+        _myers(a, b, alo, ahi, blo, bhi, out)
+
+    # 排序并合并相邻的块
+    merged: List[Block] = []
+    for i, j, size in sorted(out):
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+def opcodes(blocks: List[Block], len_a: int, len_b: int) -> List[Opcode]:
+    """把匹配块转换为编辑操作序列"""
+    codes: List[Opcode] = []
+    i = j = 0
+    for ai, bj, size in blocks + [(len_a, len_b, 0)]:
+        if i < ai and j < bj:
+            codes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            codes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            codes.append(('insert', i, ai, j, bj))
+        if size:
+            codes.append(('equal', ai, ai + size, bj, bj + size))
+        i, j = ai + size, bj + size
+    return codes
+
+
+def group_hunks(codes: List[Opcode], context: int = 3) -> Iterator[List[Opcode]]:
+    """按上下文行数把编辑操作分组为 hunk"""
+    if not codes or (len(codes) == 1 and codes[0][0] == 'equal'):
+        return
+    codes = list(codes)
+    tag, i1, i2, j1, j2 = codes[0]
+    if tag == 'equal':
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    tag, i1, i2, j1, j2 = codes[-1]
+    if tag == 'equal':
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # 较长的相同区间把 hunk 分开
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            yield group
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _range(start: int, count: int) -> str:
+    # unified diff 的行号从 1 开始, 空区间写作 "起点-1,0"
+    if count == 1:
+        return str(start + 1)
+    return f"{start + 1 if count else start},{count}"
+
+
+def format_hunk(hunk: List[Opcode], a: List[str], b: List[str]) -> str:
+    first, last = hunk[0], hunk[-1]
+    lines = [f"@@ -{_range(first[1], last[2] - first[1])} +{_range(first[3], last[4] - first[3])} @@"]
+    for tag, i1, i2, j1, j2 in hunk:
+        if tag == 'equal':
+            lines.extend(_prefixed(' ', a[i1:i2]))
+            continue
+        if tag in ('delete', 'replace'):
+            lines.extend(_prefixed('-', a[i1:i2]))
+        if tag in ('insert', 'replace'):
+            lines.extend(_prefixed('+', b[j1:j2]))
+    return "\n".join(lines)
+
+
+def _prefixed(mark: str, lines: List[str]) -> Iterator[str]:
+    for line in lines:
+        if line.endswith("\n"):
+            yield mark + line[:-1]
+        else:
+            yield mark + line
+            yield "\\ No newline at end of file"
+
+
+class DiffEngine:
+    """带缓存的行级 diff
+
+    - 每个 blob 只切分并映射一次: 相同的行映射为同一个整数, 比较时只比较整数
+    - 每对 (旧 blob, 新 blob, 算法) 的编辑操作只计算一次
+    """
+
+    def __init__(self, cache_size: int = 1024, max_lines: int = 1_000_000):
+        self.cache_size = cache_size
+        self.max_lines = max_lines
+        self._line_ids: Dict[str, int] = {}
+        self._blobs: "OrderedDict[str, Tuple[List[str], List[int]]]" = OrderedDict()
+        self._codes: "OrderedDict[tuple, List[Opcode]]" = OrderedDict()
+
+    def lines(self, key: Optional[str], text: Optional[str]) -> Tuple[List[str], List[int]]:
+        """blob 的 (行列表, 行编号列表); key 为 blob 哈希, text 为其内容"""
+        if key is None:
+            return [], []
+        cached = self._blobs.get(key)
+        if cached is not None:
+            self._blobs.move_to_end(key)
+            return cached
+        lines = split_lines(text or "")
+        line_ids = self._line_ids
+        ids = [line_ids.setdefault(line, len(line_ids)) for line in lines]
+        self._blobs[key] = (lines, ids)
+        if len(self._blobs) > self.cache_size:
+            self._blobs.popitem(last=False)
+        return lines, ids
+
+    def opcodes(self, old_key: Optional[str], old_text: Optional[str],
+                new_key: Optional[str], new_text: Optional[str],
+                algorithm: str = 'myers') -> List[Opcode]:
+        cache_key = (old_key, new_key, algorithm)
+        codes = self._codes.get(cache_key)
+        if codes is not None:
+            self._codes.move_to_end(cache_key)
+            return codes
+        if len(self._line_ids) > self.max_lines:
+            # 行表过大时整体重建, 已缓存的编号随之失效
+            self.clear()
+        _, a = self.lines(old_key, old_text)
+        _, b = self.lines(new_key, new_text)
+        codes = opcodes(matching_blocks(a, b, algorithm), len(a), len(b))
+        self._codes[cache_key] = codes
+        if len(self._codes) > self.cache_size:
+            self._codes.popitem(last=False)
+        return codes
+
+    def hunks(self, old_key: Optional[str], old_text: Optional[str],
+              new_key: Optional[str], new_text: Optional[str],
+              algorithm: str = 'myers', context: int = 3) -> Iterator[str]:
+        """逐个产生格式化后的 hunk"""
+        codes = self.opcodes(old_key, old_text, new_key, new_text, algorithm)
+        a, _ = self.lines(old_key, old_text)
+        b, _ = self.lines(new_key, new_text)
+        for hunk in group_hunks(codes, context):
+            yield format_hunk(hunk, a, b)
+
+    def stat(self, old_key: Optional[str], old_text: Optional[str],
+             new_key: Optional[str], new_text: Optional[str],
+             algorithm: str = 'myers') -> Tuple[int, int]:
+        """(新增行数, 删除行数)"""
+        added = deleted = 0
+        for tag, i1, i2, j1, j2 in self.opcodes(old_key, old_text, new_key, new_text, algorithm):
+            if tag != 'equal':
+                deleted += i2 - i1
+                added += j2 - j1
+        return added, deleted
+
+    def clear(self) -> None:
+        self._line_ids.clear()
+        self._blobs.clear()
+        self._codes.clear()
+
+    def __getstate__(self):
+        # 缓存可以重建, 不写入会话快照
+        state = self.__dict__.copy()
+        state['_line_ids'] = {}
+        state['_blobs'] = OrderedDict()
+        state['_codes'] = OrderedDict()
+        return state
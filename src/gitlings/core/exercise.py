@@ -1,51 +1,70 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import toml
-from typing import List, Dict
+from typing import List, Dict, Optional
+from .checks import compile_check
+
+EXERCISES_DIR = Path(__file__).parent.parent.parent / "exercises"
 
 @dataclass
 class Exercise:
     id: str
     name: str
-    description: str
     difficulty: int
-    hints: List[str]
     checks: List[Dict[str, str]]
-    
+    path: Optional[Path] = None
+    _description: Optional[str] = field(default=None, repr=False)
+    _hints: Optional[List[str]] = field(default=None, repr=False)
+
+    @property
+    def description(self) -> str:
+        """练习说明, 第一次访问时才读取"""
+        if self._description is None:
+            with open(self.path / "exercise.md") as f:
+                self._description = f.read()
+        return self._description
+
+    @property
+    def hints(self) -> List[str]:
+        """提示列表, 第一次访问时才读取"""
+        if self._hints is None:
+            with open(self.path / "hint.md") as f:
+                self._hints = [h.strip() for h in f.read().split("---") if h.strip()]
+        return self._hints
+
     @classmethod
     def load(cls, path: Path):
-        """从上一级目录加载练习"""
+        """从上一级目录加载练习元数据, 说明和提示延迟读取"""
         meta = toml.load(path / "meta.toml")
-        with open(path / "exercise.md") as f:
-            desc = f.read()
-        with open(path / "hint.md") as f:
-            hints = [h.strip() for h in f.read().split("---") if h.strip()]
-        
+        exercise = meta.get("exercise", {})
+        checks = meta.get("verification", {}).get("checks", [])
+        for spec in checks:
+            # 写错的验证条件在加载时就报错, 而不是变成永远不通过的条件
+            try:
+                compile_check(spec)
+            except ValueError as exc:
+                raise ValueError(f"{path / 'meta.toml'}: {exc}") from None
         return cls(
-            meta["exercise"]["id"],
-            meta["exercise"]["name"],
-            desc,
-            meta["exercise"]["difficulty"],
-            hints,
-            meta["verification"]["checks"]
+            exercise.get("id", f"{path.parent.name}/{path.name}"),
+            exercise.get("name", path.name),
+            exercise.get("difficulty", 1),
+            checks,
+            path=path,
         )
 
-    
-    def load_exercise(exercise_path: str) -> dict:
-        """加载练习数据"""
-        base_path = Path(__file__).parent.parent.parent / "exercises"
-        full_path = base_path / exercise_path
-        
-        meta = toml.load(full_path / "meta.toml")
-        with open(full_path / "exercise.md") as f:
-            description = f.read()
-        with open(full_path / "hint.md") as f:
-            hints = f.read().split("---")
-        
+
+    def load_exercise(exercise_path: str, catalog=None) -> dict:
+        """加载练习数据, 可以传入已有的 Catalog"""
+        from .catalog import Catalog
+        if catalog is None:
+            catalog = Catalog(EXERCISES_DIR)
+        exercise = catalog.get(exercise_path)
+
         return {
             'id': exercise_path,
-            'name': meta['exercise']['name'],
-            'description': description,
-            'hints': hints,
-            'difficulty': meta['exercise'].get('difficulty', 1)
+            'name': exercise.name,
+            'description': exercise.description,
+            'hints': exercise.hints,
+            'difficulty': exercise.difficulty,
+            'checks': exercise.checks,
         }
@@ -0,0 +1,121 @@
+import heapq
+from typing import Dict, Iterable, List, Optional
+from .objects import ObjectStore
+
+# 遍历时使用的颜色标记
+_OURS = 1
+_THEIRS = 2
+_STALE = 4
+
+
+class CommitGraph:
+    """提交图: 在对象库的父指针之上缓存每个提交的代数(generation number)
+
+    代数 = 1 + max(父提交代数), 根提交为 1。沿父指针代数严格递减,
+    因此按代数从大到小遍历时, 一个提交被取出时它的所有后代都已处理完,
+    查询可以在代数低于目标后立即停止, 而不必走完整个历史。
+    """
+
+    def __init__(self, objects: ObjectStore):
+        self._objects = objects
+        self._generation: Dict[str, int] = {}
+
+    def parents(self, sha: str) -> tuple:
+        return self._objects.get(sha).parents
+
+    def generation(self, sha: str) -> int:
+        gen = self._generation.get(sha)
+        if gen is not None:
+            return gen
+        # 迭代计算, 避免深历史上的递归溢出
+        stack = [sha]
+        while stack:
+            top = stack[-1]
+            if top in self._generation:
+                stack.pop()
+                continue
+            missing = [p for p in self.parents(top) if p not in self._generation]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            self._generation[top] = 1 + max(
+                (self._generation[p] for p in self.parents(top)), default=0
+            )
+        return self._generation[sha]
+
+    def add(self, sha: str) -> int:
+        """新提交写入后登记代数, 父提交已登记时为 O(父提交数)"""
+        return self.generation(sha)
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """ancestor 是否可以从 descendant 沿父指针到达(包含相等)"""
+        if ancestor == descendant:
+            return True
+        target_gen = self.generation(ancestor)
+        if target_gen >= self.generation(descendant):
+            return False
+        seen = {descendant}
+        stack = [descendant]
+        while stack:
+            for parent in self.parents(stack.pop()):
+                if parent == ancestor:
+                    return True
+                # 代数不高于目标的提交不可能是它的后代
+                if parent not in seen and self.generation(parent) > target_gen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def merge_bases(self, a: str, b: str) -> List[str]:
+        """两个提交的最佳公共祖先"""
+        if a == b:
+            return [a]
+        flags = {a: _OURS, b: _THEIRS}
+        queue = [(-self.generation(a), a), (-self.generation(b), b)]
+        heapq.heapify(queue)
+        result = []
+        while queue and any(not flags[sha] & _STALE for _, sha in queue):
+            _, sha = heapq.heappop(queue)
+            flag = flags[sha]
+            if flag & (_OURS | _THEIRS) == (_OURS | _THEIRS) and not flag & _STALE:
+                result.append(sha)
+                flag |= _STALE
+                flags[sha] = flag
+            for parent in self.parents(sha):
+                old = flags.get(parent)
+                new = (old or 0) | flag
+                if old != new:
+                    if old is None:
+                        heapq.heappush(queue, (-self.generation(parent), parent))
+                    flags[parent] = new
+        return result
+
+    def merge_base(self, a: str, b: str) -> Optional[str]:
+        bases = self.merge_bases(a, b)
+        return bases[0] if bases else None
+
+    def range(self, exclude: Iterable[str], include: Iterable[str]) -> List[str]:
+        """`A..B`: 从 include 可达但从 exclude 不可达的提交, 按代数从新到旧排列"""
+        flags: Dict[str, int] = {}
+        queue = []
+        for sha, flag in [(s, _STALE) for s in exclude] + [(s, _OURS) for s in include]:
+            if sha not in flags:
+                heapq.heappush(queue, (-self.generation(sha), sha))
+            flags[sha] = flags.get(sha, 0) | flag
+        result = []
+        while queue and any(not flags[sha] & _STALE for _, sha in queue):
+            _, sha = heapq.heappop(queue)
+            flag = flags[sha]
+            if not flag & _STALE:
+                result.append(sha)
+            for parent in self.parents(sha):
+                old = flags.get(parent)
+                # 被排除端到达的提交标记为 STALE, 覆盖普通标记
+                new = _STALE if flag & _STALE else (old or 0) | flag
+                if old is None:
+                    heapq.heappush(queue, (-self.generation(parent), parent))
+                    flags[parent] = new
+                elif new & _STALE and not old & _STALE:
+                    flags[parent] = old | _STALE
+        return result
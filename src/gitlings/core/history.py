@@ -0,0 +1,267 @@
+import bisect
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 启动时从文件末尾向前读取, 每次读取的块大小翻倍
+_READ_BLOCK = 64 * 1024
+# 匹配的命令很多时先检查光标附近的这么多条, 通常不必查索引
+_WINDOW = 256
+# 前缀范围的上界: 以前缀开头的命令都小于 前缀 + 最大字符
+_MAX_CHAR = "\U0010ffff"
+
+
+def default_history_path() -> Path:
+    data_home = Path(os.environ.get("XDG_DATA_HOME", Path.home() / ".local" / "share"))
+    return data_home / "gitlings" / "history"
+
+
+class CommandHistory:
+    """跨会话共享的命令历史
+
+    磁盘上是只追加的文本文件(每行一条命令), 启动时只读取末尾的 max_entries 条,
+    文件超过这部分的两倍后重写为只含这些命令。
+    内存中按不同的命令建立索引: 排好序的命令列表用于前缀查找, 所有命令拼接成的字符串
+    用于子串和模糊搜索, 再用二分查找定位每条命令在光标前后出现的位置。
+    支持 ↑/↓ 按前缀导航和 Ctrl-R 反向增量搜索。
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 500_000):
+        self.path = Path(path) if path is not None else default_history_path()
+        self.max_entries = max_entries
+        self.entries: List[str] = []
+        # 上次重建索引后从内存中丢弃的命令数; 索引中的位置从重建时的第一条命令算起
+        self._base = 0
+        self._ids: Dict[str, int] = {}
+        self._commands: List[str] = []
+        self._positions: List[List[int]] = []
+        self._sorted: List[str] = []
+        self._text = ""
+        self._starts: List[int] = []
+        self._matches: Dict[Tuple[str, str], List[int]] = {}
+        self._rebuild(self._read())
+        self._cursor = len(self.entries)
+        self._prefix = ""
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ---- 文件 ----
+    def _read(self) -> List[str]:
+        try:
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                start, block, newlines = size, _READ_BLOCK, 0
+                chunks: List[bytes] = []
+                while start > 0 and newlines <= self.max_entries:
+                    step = min(block, start)
+                    start -= step
+                    f.seek(start)
+                    chunks.append(f.read(step))
+                    newlines += chunks[-1].count(b"\n")
+                    block *= 2
+        except OSError:
+            return []
+        lines = b"".join(reversed(chunks)).decode("utf-8", errors="replace").splitlines()
+        if start > 0:
+            # 第一行可能只读到后半截
+            del lines[0]
+        entries = [line for line in lines if line][-self.max_entries:]
+        if size > 2 * sum(len(line) + 1 for line in entries):
+            self._compact(entries)
+        return entries
+
+    def _compact(self, entries: List[str]) -> None:
+        """把文件重写为只含保留的命令; 其他会话在重写期间追加的命令可能丢失"""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("".join(command + "\n" for command in entries))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def append(self, command: str) -> None:
+        command = command.strip().replace("\n", " ")
+        self.reset()
+        if not command or (self.entries and self.entries[-1] == command):
+            return
+        if self._add(command):
+            bisect.insort(self._sorted, command)
+            self._matches.clear()
+        if len(self.entries) > self.max_entries:
+            dropped = len(self.entries) - self.max_entries
+            del self.entries[:dropped]
+            self._base += dropped
+            # 索引里仍保留着已丢弃的命令, 累计丢弃一半时重建, 内存不超过 max_entries 的 1.5 倍
+            if self._base * 2 >= self.max_entries:
+                self._rebuild(self.entries)
+        self._cursor = len(self.entries)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # O_APPEND 保证多个会话同时写入时每行完整
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(command + "\n")
+        except OSError:
+            pass
+
+    # ---- 索引 ----
+    def _rebuild(self, entries: List[str]) -> None:
+        """从 entries 重新建立全部索引"""
+        self.entries = []
+        self._base = 0
+        self._ids = {}
+        self._commands = []
+        self._positions = []
+        self._text = ""
+        self._starts = []
+        self._matches = {}
+        for command in entries:
+            self._add(command)
+        self._sorted = sorted(self._commands)
+        self._index_text()
+
+    def _add(self, command: str) -> bool:
+        """记录一条命令, 返回它是否第一次出现"""
+        position = self._base + len(self.entries)
+        self.entries.append(command)
+        cid = self._ids.get(command)
+        if cid is not None:
+            self._positions[cid].append(position)
+            return False
+        self._ids[command] = len(self._commands)
+        self._commands.append(command)
+        self._positions.append([position])
+        return True
+
+    def _cached(self, key: Tuple[str, str], compute: Callable[[], List[int]]) -> List[int]:
+        """查找结果按 (种类, 查询) 缓存, 出现新的命令时清空"""
+        ids = self._matches.get(key)
+        if ids is None:
+            if len(self._matches) >= 64:
+                self._matches.clear()
+            ids = self._matches[key] = compute()
+        return ids
+
+    def _prefix_ids(self, prefix: str) -> List[int]:
+        def compute() -> List[int]:
+            lo = bisect.bisect_left(self._sorted, prefix)
+            hi = bisect.bisect_left(self._sorted, prefix + _MAX_CHAR, lo)
+            return [self._ids[command] for command in self._sorted[lo:hi]]
+        return self._cached(("prefix", prefix), compute)
+
+    def _substring_ids(self, query: str) -> List[int]:
+        return self._cached(("substring", query),
+                            lambda: self._find_ids(lambda pos: self._text.find(query, pos)))
+
+    def _fuzzy_ids(self, pattern: "re.Pattern") -> List[int]:
+        def find(pos: int) -> int:
+            found = pattern.search(self._text, pos)
+            return found.start() if found else -1
+        return self._cached(("fuzzy", pattern.pattern), lambda: self._find_ids(find))
+
+    def _index_text(self) -> None:
+        """把新出现的命令接到拼接文本的末尾"""
+        if len(self._starts) < len(self._commands):
+            added = self._commands[len(self._starts):]
+            offset = len(self._text)
+            for command in added:
+                self._starts.append(offset)
+                offset += len(command) + 1
+            self._text += "".join(command + "\n" for command in added)
+
+    def _find_ids(self, find: Callable[[int], int]) -> List[int]:
+        """在所有命令拼接成的文本中查找; find(pos) 返回 pos 之后下一个匹配的偏移, 没有时为 -1"""
+        self._index_text()
+        ids = []
+        pos = find(0)
+        while pos >= 0:
+            cid = bisect.bisect_right(self._starts, pos) - 1
+            ids.append(cid)
+            # 从下一条命令开始继续找
+            pos = find(self._starts[cid] + len(self._commands[cid]) + 1)
+        return ids
+
+    def _last_before(self, ids: Callable[[], List[int]], end: int,
+                     match: Callable[[str], bool]) -> Optional[int]:
+        """匹配的命令在 end 之前最后一次出现的位置
+
+        先逐条检查 end 之前的 _WINDOW 条, 匹配的命令很多时通常就在其中;
+        否则才用 ids() 给出的命令编号在索引中二分查找。
+        """
+        stop = max(end - _WINDOW, 0)
+        for i in range(end - 1, stop - 1, -1):
+            if match(self.entries[i]):
+                return i
+        if stop == 0:
+            return None
+        limit = self._base + stop
+        best = -1
+        for cid in ids():
+            positions = self._positions[cid]
+            k = bisect.bisect_left(positions, limit)
+            if k and positions[k - 1] > best:
+                best = positions[k - 1]
+        return best - self._base if best >= self._base else None
+
+    def _first_after(self, ids: Callable[[], List[int]], start: int,
+                     match: Callable[[str], bool]) -> Optional[int]:
+        """匹配的命令在 start 之后第一次出现的位置"""
+        stop = min(start + _WINDOW, len(self.entries) - 1)
+        for i in range(start + 1, stop + 1):
+            if match(self.entries[i]):
+                return i
+        if stop >= len(self.entries) - 1:
+            return None
+        limit = self._base + stop
+        best = None
+        for cid in ids():
+            positions = self._positions[cid]
+            k = bisect.bisect_right(positions, limit)
+            if k < len(positions) and (best is None or positions[k] < best):
+                best = positions[k]
+        return best - self._base if best is not None else None
+
+    # ---- ↑/↓ 导航 ----
+    def reset(self, prefix: str = "") -> None:
+        """结束导航; prefix 为下次导航时匹配的前缀"""
+        self._cursor = len(self.entries)
+        self._prefix = prefix
+
+    def previous(self) -> Optional[str]:
+        prefix = self._prefix
+        i = self._last_before(lambda: self._prefix_ids(prefix), self._cursor,
+                              lambda command: command.startswith(prefix))
+        if i is None:
+            return None
+        self._cursor = i
+        return self.entries[i]
+
+    def next(self) -> Optional[str]:
+        prefix = self._prefix
+        i = self._first_after(lambda: self._prefix_ids(prefix), self._cursor,
+                              lambda command: command.startswith(prefix))
+        if i is not None:
+            self._cursor = i
+            return self.entries[i]
+        # 越过最新一条时回到用户输入的前缀
+        self._cursor = len(self.entries)
+        return self._prefix
+
+    # ---- Ctrl-R 搜索 ----
+    def search(self, query: str, before: Optional[int] = None) -> Optional[Tuple[int, str]]:
+        """从 before 之前向旧的方向查找, 先找子串匹配, 找不到再按字符顺序模糊匹配
+
+        返回 (位置, 命令), 再次搜索时把位置传给 before 可以继续向前找。
+        """
+        end = len(self.entries) if before is None else before
+        if not query:
+            return (end - 1, self.entries[end - 1]) if end > 0 else None
+        i = self._last_before(lambda: self._substring_ids(query), end,
+                              lambda command: query in command)
+        if i is None:
+            pattern = re.compile(".*?".join(map(re.escape, query)))
+            i = self._last_before(lambda: self._fuzzy_ids(pattern), end,
+                                  lambda command: pattern.search(command) is not None)
+        return (i, self.entries[i]) if i is not None else None
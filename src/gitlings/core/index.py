@@ -0,0 +1,264 @@
+from collections.abc import MutableSet
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .objects import Blob, hash_object
+from .pathspec import IgnoreRules
+from .trie import PathTrie
+
+
+def fingerprint(content: str) -> Tuple[int, int]:
+    """工作区文件的内容指纹, 相当于 git 索引里的 stat 信息"""
+    return len(content), hash(content)
+
+
+class DirtySet(MutableSet):
+    """改动过的路径集合, 增删时同步更新路径树上各目录的改动计数"""
+
+    def __init__(self, trie: PathTrie):
+        self._paths: Set[str] = set()
+        self._trie = trie
+
+    def __contains__(self, path) -> bool:
+        return path in self._paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __repr__(self) -> str:
+        return f"DirtySet({self._paths!r})"
+
+    def add(self, path: str) -> None:
+        if path not in self._paths:
+            self._paths.add(path)
+            self._trie.set_dirty(path, True)
+
+    def discard(self, path: str) -> None:
+        if path in self._paths:
+            self._paths.remove(path)
+            self._trie.set_dirty(path, False)
+
+    def update(self, paths: Iterable[str]) -> None:
+        for path in paths:
+            self.add(path)
+
+    def clear(self) -> None:
+        for path in self._paths:
+            self._trie.set_dirty(path, False)
+        self._paths.clear()
+
+
+class WorkingDir(dict):
+    """工作区: 路径 -> 文件内容, 记录自上次同步以来被改动过的路径
+
+    另外维护一棵路径树(tree), 用于按目录查找文件和改动过的路径,
+    以及所有 .gitignore 文件的位置, 规则编译一次后缓存到文件内容改变为止。
+    snapshot() 把工作区写成对象库中的目录树, 只重写上次快照以来改动过的路径。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.tree = PathTrie()
+        self.dirty = DirtySet(self.tree)
+        # 与 dirty 不同, 这里记录的是相对于上次快照的改动
+        self._changed: Set[str] = set()
+        self._snapshot: Optional[str] = None
+        self._ignore_files: Set[str] = set()
+        # .gitignore 文件增删改时递增, 编译好的规则按版本缓存
+        self._ignore_version = 0
+        self._ignore_cache: Tuple[int, Optional[IgnoreRules]] = (-1, None)
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        # 默认的 dict 子类序列化会在 __init__ 之前调用 __setitem__; 路径树在恢复时重建
+        return _restore_working_dir, (dict(self), set(self.dirty), set(self._changed), self._snapshot)
+
+    def __setitem__(self, path: str, content: str) -> None:
+        if path not in self:
+            self.tree.set_file(path, True)
+        if path.endswith('.gitignore') and path.rpartition('/')[2] == '.gitignore':
+            self._ignore_files.add(path)
+            self._ignore_version += 1
+        super().__setitem__(path, content)
+        self.dirty.add(path)
+        self._changed.add(path)
+
+    def __delitem__(self, path: str) -> None:
+        super().__delitem__(path)
+        self._removed(path)
+
+    def _removed(self, path: str) -> None:
+        self.tree.set_file(path, False)
+        if path in self._ignore_files:
+            self._ignore_files.remove(path)
+            self._ignore_version += 1
+        self.dirty.add(path)
+        self._changed.add(path)
+
+    def pop(self, path, *default):
+        if path not in self:
+            return super().pop(path, *default)
+        content = super().pop(path)
+        self._removed(path)
+        return content
+
+    def setdefault(self, path, default=None):
+        if path not in self:
+            self[path] = default
+        return self[path]
+
+    def update(self, *args, **kwargs) -> None:
+        for path, content in dict(*args, **kwargs).items():
+            self[path] = content
+
+    def clear(self) -> None:
+        for path in list(self):
+            del self[path]
+
+    def popitem(self):
+        path, content = super().popitem()
+        self._removed(path)
+        return path, content
+
+    def ignore_rules(self) -> IgnoreRules:
+        """工作区中所有 .gitignore 的规则, 上级目录的文件优先级低"""
+        version, rules = self._ignore_cache
+        if rules is None or version != self._ignore_version:
+            sources = sorted(
+                ((path.rpartition('/')[0], self[path]) for path in self._ignore_files),
+                key=lambda source: (source[0].count('/') + bool(source[0]), source[0]),
+            )
+            rules = IgnoreRules(sources)
+            self._ignore_cache = (self._ignore_version, rules)
+        return rules
+
+    def snapshot(self, objects) -> str:
+        """工作区对应的目录树哈希, 未改动的子树与上次快照共享"""
+        if self._changed or self._snapshot is None:
+            changes = {path: objects.write_blob(self[path]) if path in self else None
+                       for path in self._changed}
+            self._snapshot = objects.update_tree(self._snapshot, changes)
+            self._changed.clear()
+        return self._snapshot
+
+    def restore(self, objects, target: str) -> None:
+        """回到快照 target, 只改写两棵目录树之间不同的文件"""
+        for path, _, blob in objects.diff_trees(self.snapshot(objects), target):
+            if blob is None:
+                self.pop(path, None)
+            else:
+                self[path] = objects.read_blob(blob)
+
+
+def _restore_working_dir(files: Dict[str, str], dirty: Set[str],
+                         changed: Optional[Set[str]] = None, snapshot: Optional[str] = None) -> WorkingDir:
+    working_dir = WorkingDir(files)
+    working_dir.dirty.clear()
+    working_dir.dirty.update(dirty)
+    if snapshot is not None:
+        working_dir._changed = changed
+        working_dir._snapshot = snapshot
+    return working_dir
+
+
+class Index:
+    """暂存区: 路径 -> (blob哈希, 内容指纹)
+
+    staged 记录与 HEAD 不一致的路径, 配合 WorkingDir.dirty,
+    `git add .` 与 `git status` 只需处理发生变化的路径。
+    unmerged 记录合并冲突中尚未解决的路径及其 (base, ours, theirs) 三个版本。
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[str, Optional[Tuple[int, int]]]] = {}
+        self.staged: Set[str] = set()
+        self.unmerged: Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        self._changed: Set[str] = set()
+        self._snapshot: Optional[str] = None
+
+    def __setstate__(self, state: dict) -> None:
+        # 旧版本的会话快照中没有快照信息, 第一次 snapshot() 时整体写入
+        self.__dict__.update(state)
+        if '_snapshot' not in state:
+            self._changed = set(self.entries)
+            self._snapshot = None
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def blob(self, path: str) -> Optional[str]:
+        entry = self.entries.get(path)
+        return entry[0] if entry else None
+
+    def set(self, path: str, blob: Optional[str], content: Optional[str] = None) -> None:
+        """写入(blob 为 None 时删除)一个索引项; 未给出内容时指纹留待下次比较时计算
+
+        写入即视为解决了该路径上的合并冲突。
+        """
+        self.unmerged.pop(path, None)
+        self._changed.add(path)
+        if blob is None:
+            self.entries.pop(path, None)
+        else:
+            self.entries[path] = (blob, fingerprint(content) if content is not None else None)
+
+    def mark(self, path: str, head_blob: Optional[str]) -> None:
+        """根据 HEAD 中的版本更新该路径的已暂存标记"""
+        if self.blob(path) == head_blob:
+            self.staged.discard(path)
+        else:
+            self.staged.add(path)
+
+    def is_clean(self, path: str, working_dir: WorkingDir) -> bool:
+        """工作区中的文件是否与索引一致"""
+        entry = self.entries.get(path)
+        if entry is None:
+            return path not in working_dir
+        if path not in working_dir:
+            return False
+        content = working_dir[path]
+        if entry[1] is None:
+            # 指纹未知时退回到比较内容哈希, 一致则补上指纹
+            if hash_object(Blob(content)) != entry[0]:
+                return False
+            self.entries[path] = (entry[0], fingerprint(content))
+            return True
+        return entry[1] == fingerprint(content)
+
+    def classify(self, working_dir: WorkingDir,
+                 paths: Optional[Iterable[str]] = None) -> Tuple[List[str], List[str], List[str]]:
+        """把工作区中的脏路径(或其中的 paths)分为 (已修改, 已删除, 未跟踪); 已恢复一致的路径会被移出脏集合"""
+        modified, deleted, untracked = [], [], []
+        for path in list(working_dir.dirty if paths is None else paths):
+            if path not in self.entries:
+                if path in working_dir:
+                    untracked.append(path)
+                else:
+                    working_dir.dirty.discard(path)
+            elif path not in working_dir:
+                deleted.append(path)
+            elif self.is_clean(path, working_dir):
+                working_dir.dirty.discard(path)
+            else:
+                modified.append(path)
+        return sorted(modified), sorted(deleted), sorted(untracked)
+
+    def snapshot(self, objects) -> str:
+        """索引中各路径的 blob 组成的目录树哈希(不含冲突中的三个版本)"""
+        if self._changed or self._snapshot is None:
+            changes = {path: self.blob(path) for path in self._changed}
+            self._snapshot = objects.update_tree(self._snapshot, changes)
+            self._changed.clear()
+        return self._snapshot
+
+    def restore(self, objects, target: str) -> List[str]:
+        """回到快照 target(指纹留待下次比较时计算), 返回改动过的路径"""
+        paths = []
+        for path, _, blob in objects.diff_trees(self.snapshot(objects), target):
+            self.set(path, blob)
+            paths.append(path)
+        return paths
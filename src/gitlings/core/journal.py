@@ -0,0 +1,195 @@
+import logging
+import os
+import pickle
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+SNAPSHOT_MAGIC = b"GLSNAP\x01"
+SNAPSHOT_FILE = "snapshot.bin"
+JOURNAL_FILE = "journal.bin"
+
+log = logging.getLogger(__name__)
+
+# 日志记录: 操作(1B) 时间戳(8B) 长度(4B) 内容 CRC32(4B)
+_RECORD_HEADER = struct.Struct(">cqI")
+_CRC = struct.Struct(">I")
+OP_EXECUTE = b"x"
+OP_NEXT = b"n"
+
+
+def dump_snapshot(runner) -> bytes:
+    """把 ExerciseRunner 会话序列化为压缩的二进制快照(练习列表不写入)"""
+    state = {
+        'current_index': runner.current_index,
+        'git': runner.git,
+        'checks': runner.checks,
+        'history': runner.history,
+        # 检查点只引用对象库中的目录树, 随仓库一起保存几乎不占空间
+        'undo': runner.undo_stack,
+        'fixture': runner.fixture,
+    }
+    return SNAPSHOT_MAGIC + zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+
+def load_snapshot(runner, data: bytes) -> None:
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("not a gitlings session snapshot")
+    state = pickle.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]))
+    runner.current_index = state['current_index']
+    runner.git = state['git']
+    runner.checks = state['checks']
+    runner.history = state['history']
+    if 'fixture' in state:
+        runner.undo_stack = state['undo']
+        runner.fixture = state['fixture']
+    else:
+        runner.undo_stack.clear()
+        runner.fixture = None
+
+
+def read_records(path: Path) -> Iterator[Tuple[bytes, int, str]]:
+    """读取日志中完整的记录, 遇到被截断或损坏的尾部即停止"""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return
+    pos = 0
+    while pos + _RECORD_HEADER.size <= len(data):
+        op, timestamp, length = _RECORD_HEADER.unpack_from(data, pos)
+        end = pos + _RECORD_HEADER.size + length
+        if end + _CRC.size > len(data):
+            return
+        (crc,) = _CRC.unpack_from(data, end)
+        if crc != zlib.crc32(data[pos:end]):
+            return
+        yield op, timestamp, data[pos + _RECORD_HEADER.size:end].decode("utf-8")
+        pos = end + _CRC.size
+
+
+def read_history(directory: Path) -> List[str]:
+    """不恢复会话, 只读出会话目录中快照和日志记录的全部命令"""
+    directory = Path(directory)
+    history: List[str] = []
+    try:
+        data = (directory / SNAPSHOT_FILE).read_bytes()
+    except OSError:
+        data = b""
+    if data.startswith(SNAPSHOT_MAGIC):
+        history.extend(pickle.loads(zlib.decompress(data[len(SNAPSHOT_MAGIC):]))['history'])
+    history.extend(arg for op, _, arg in read_records(directory / JOURNAL_FILE) if op == OP_EXECUTE)
+    return history
+
+
+class SessionJournal:
+    """会话快照 + 预写日志
+
+    每条命令先追加到日志再执行; 每 checkpoint_interval 条命令写一次快照并清空日志。
+    恢复时加载快照, 再重放日志中剩余的少量命令。
+    """
+
+    def __init__(self, directory: Path, checkpoint_interval: int = 200, fsync: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_interval = checkpoint_interval
+        self.fsync = fsync
+        self.pending = 0
+        # 恢复时重放抛出异常的命令
+        self.skipped: List[str] = []
+        self._log = None
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / SNAPSHOT_FILE
+
+    @property
+    def journal_path(self) -> Path:
+        return self.directory / JOURNAL_FILE
+
+    # ---- 恢复 ----
+    def records(self) -> Iterator[Tuple[bytes, int, str]]:
+        return read_records(self.journal_path)
+
+    def resume(self, runner) -> int:
+        """恢复会话, 返回重放的命令数"""
+        if self.snapshot_path.exists():
+            load_snapshot(runner, self.snapshot_path.read_bytes())
+        replayed = 0
+        for op, timestamp, arg in self.records():
+            try:
+                self._apply(runner, op, timestamp, arg)
+            except Exception:
+                # 执行时这条命令同样抛出了异常并已报告给调用方; 记下它,
+                # 但不能让会话从此无法恢复
+                log.warning("replaying %r in %s raised", arg, self.directory, exc_info=True)
+                self.skipped.append(arg)
+            replayed += 1
+        # 重放过的命令并入新快照, 同时丢弃可能损坏的日志尾部
+        if replayed:
+            self.checkpoint(runner)
+        else:
+            self._open(truncate=True)
+        return replayed
+
+    # ---- 记录与执行 ----
+    def execute(self, runner, command: str) -> str:
+        timestamp = int(time.time())
+        self._append(OP_EXECUTE, timestamp, command)
+        output = self._apply(runner, OP_EXECUTE, timestamp, command)
+        self._maybe_checkpoint(runner)
+        return output
+
+    def next(self, runner) -> bool:
+        self._append(OP_NEXT, int(time.time()), "")
+        moved = runner.next()
+        self._maybe_checkpoint(runner)
+        return moved
+
+    def _apply(self, runner, op: bytes, timestamp: int, arg: str):
+        if op == OP_NEXT:
+            return runner.next()
+        runner.git.frozen_time = timestamp
+        try:
+            return runner.execute(arg)
+        finally:
+            runner.git.frozen_time = None
+
+    def _append(self, op: bytes, timestamp: int, arg: str) -> None:
+        if self._log is None:
+            self._open()
+        payload = arg.encode("utf-8")
+        record = _RECORD_HEADER.pack(op, timestamp, len(payload)) + payload
+        self._log.write(record + _CRC.pack(zlib.crc32(record)))
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self.pending += 1
+
+    def _open(self, truncate: bool = False) -> None:
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.journal_path, "wb" if truncate else "ab")
+
+    # ---- 检查点 ----
+    def _maybe_checkpoint(self, runner) -> None:
+        if self.pending >= self.checkpoint_interval:
+            self.checkpoint(runner)
+
+    def checkpoint(self, runner) -> None:
+        """原子地写入快照, 然后清空日志"""
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(dump_snapshot(runner))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        tmp.replace(self.snapshot_path)
+        self._open(truncate=True)
+        self.pending = 0
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,88 @@
+from typing import Iterator, List, Optional, Tuple
+
+from .diff import DiffEngine
+
+# 一个版本: (blob哈希, 内容), 不存在时为 None
+Side = Optional[Tuple[str, str]]
+
+
+def _matches(engine: DiffEngine, base: Side, other: Side) -> List[Tuple[int, int, int]]:
+    """base 与 other 的匹配块, 使用 DiffEngine 的缓存"""
+    base_key, base_text = base or (None, None)
+    other_key, other_text = other or (None, None)
+    return [(i1, j1, i2 - i1)
+            for tag, i1, i2, j1, j2 in engine.opcodes(base_key, base_text, other_key, other_text)
+            if tag == 'equal']
+
+
+def _sync_regions(ours_matches, theirs_matches, len_base: int, len_ours: int, len_theirs: int):
+    """两侧都与 base 一致的区间: (base起, base止, ours起, ours止, theirs起, theirs止)"""
+    regions = []
+    i = j = 0
+    while i < len(ours_matches) and j < len(theirs_matches):
+        a_base, a_start, a_len = ours_matches[i]
+        b_base, b_start, b_len = theirs_matches[j]
+        start = max(a_base, b_base)
+        end = min(a_base + a_len, b_base + b_len)
+        if start < end:
+            a_sub = a_start + start - a_base
+            b_sub = b_start + start - b_base
+            regions.append((start, end, a_sub, a_sub + end - start, b_sub, b_sub + end - start))
+        if a_base + a_len < b_base + b_len:
+            i += 1
+        else:
+            j += 1
+    regions.append((len_base, len_base, len_ours, len_ours, len_theirs, len_theirs))
+    return regions
+
+
+def merge_regions(engine: DiffEngine, base: Side, ours: Side, theirs: Side) -> Iterator[tuple]:
+    """diff3: 产出 ('unchanged'|'ours'|'theirs'|'same', 行列表) 或 ('conflict', ours行, theirs行)"""
+    base_lines, base_ids = engine.lines(*(base or (None, None)))
+    ours_lines, ours_ids = engine.lines(*(ours or (None, None)))
+    theirs_lines, theirs_ids = engine.lines(*(theirs or (None, None)))
+    regions = _sync_regions(_matches(engine, base, ours), _matches(engine, base, theirs),
+                            len(base_ids), len(ours_ids), len(theirs_ids))
+    z = a = b = 0
+    for z_start, z_end, a_start, a_end, b_start, b_end in regions:
+        # 同步区间之前: 至少一侧有改动
+        if a < a_start or b < b_start:
+            changed_ours = ours_ids[a:a_start] != base_ids[z:z_start]
+            changed_theirs = theirs_ids[b:b_start] != base_ids[z:z_start]
+            if ours_ids[a:a_start] == theirs_ids[b:b_start]:
+                yield 'same', ours_lines[a:a_start]
+            elif not changed_ours:
+                yield 'theirs', theirs_lines[b:b_start]
+            elif not changed_theirs:
+                yield 'ours', ours_lines[a:a_start]
+            else:
+                yield 'conflict', ours_lines[a:a_start], theirs_lines[b:b_start]
+        if z_start < z_end:
+            yield 'unchanged', base_lines[z_start:z_end]
+        z, a, b = z_end, a_end, b_end
+
+
+def merge_lines(engine: DiffEngine, base: Side, ours: Side, theirs: Side,
+                ours_label: str = 'HEAD', theirs_label: str = 'theirs') -> Tuple[str, int]:
+    """逐行三方合并, 返回 (合并结果, 冲突块数); 冲突处写入 git 风格的冲突标记"""
+    merged: List[str] = []
+    conflicts = 0
+    for region in merge_regions(engine, base, ours, theirs):
+        if region[0] != 'conflict':
+            merged.extend(region[1])
+            continue
+        conflicts += 1
+        _, ours_part, theirs_part = region
+        merged.append(f"<<<<<<< {ours_label}\n")
+        merged.extend(_terminated(ours_part))
+        merged.append("=======\n")
+        merged.extend(_terminated(theirs_part))
+        merged.append(f">>>>>>> {theirs_label}\n")
+    return "".join(merged), conflicts
+
+
+def _terminated(lines: List[str]) -> List[str]:
+    # 冲突标记必须独占一行
+    if lines and not lines[-1].endswith("\n"):
+        return lines[:-1] + [lines[-1] + "\n"]
+    return lines
@@ -0,0 +1,166 @@
+import json
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 延迟直方图的桶上界(秒), 与 Prometheus 的累计桶一致, 最后一个桶为 +Inf
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 未启用时为 None; 埋点处只检查这一个全局变量, 关闭时几乎没有开销
+active: Optional["Metrics"] = None
+
+
+class Histogram:
+    """固定桶的延迟直方图"""
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """按桶内线性插值估计分位数"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {'counts': self.counts, 'count': self.count, 'sum': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        hist = cls()
+        hist.counts = list(data['counts'])
+        hist.count = data['count']
+        hist.total = data['sum']
+        hist.max = data['max']
+        return hist
+
+
+class Metrics:
+    """命令延迟、调用次数、状态规模和验证耗时的统计
+
+    - commands: 每个 git 子命令在模拟器中的执行耗时
+    - execute: ExerciseRunner.execute 的总耗时(含验证条件的增量更新)
+    - verify: ExerciseRunner.verify 的耗时
+    - state: 每条命令之后的仓库规模, 记录最近一次和最大值
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.commands: Dict[str, Histogram] = {}
+        self.execute = Histogram()
+        self.verify = Histogram()
+        self.state: Dict[str, Dict[str, int]] = {}
+
+    def command(self, name: str, seconds: float) -> None:
+        hist = self.commands.get(name)
+        if hist is None:
+            hist = self.commands[name] = Histogram()
+        hist.observe(seconds)
+
+    def state_size(self, **sizes: int) -> None:
+        for name, value in sizes.items():
+            entry = self.state.setdefault(name, {'last': 0, 'max': 0})
+            entry['last'] = value
+            if value > entry['max']:
+                entry['max'] = value
+
+    # ---- 导出 ----
+    def to_dict(self) -> dict:
+        return {
+            'started': self.started,
+            'commands': {name: hist.to_dict() for name, hist in sorted(self.commands.items())},
+            'execute': self.execute.to_dict(),
+            'verify': self.verify.to_dict(),
+            'state': self.state,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Metrics":
+        metrics = cls()
+        metrics.started = data.get('started', metrics.started)
+        metrics.commands = {name: Histogram.from_dict(hist)
+                            for name, hist in data.get('commands', {}).items()}
+        metrics.execute = Histogram.from_dict(data['execute'])
+        metrics.verify = Histogram.from_dict(data['verify'])
+        metrics.state = data.get('state', {})
+        return metrics
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式, 可供 node_exporter 的 textfile 收集器读取"""
+        lines: List[str] = []
+        _prometheus_histogram(lines, 'gitlings_command_duration_seconds',
+                              'Time spent in each simulated git subcommand',
+                              {name: hist for name, hist in sorted(self.commands.items())})
+        _prometheus_histogram(lines, 'gitlings_execute_duration_seconds',
+                              'Time spent in ExerciseRunner.execute', {None: self.execute})
+        _prometheus_histogram(lines, 'gitlings_verify_duration_seconds',
+                              'Time spent in ExerciseRunner.verify', {None: self.verify})
+        for name, entry in sorted(self.state.items()):
+            metric = f'gitlings_state_{name}'
+            lines.append(f'# HELP {metric} Repository size after the last command')
+            lines.append(f'# TYPE {metric} gauge')
+            for stat in ('last', 'max'):
+                lines.append(f'{metric}{{stat="{stat}"}} {entry[stat]}')
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Path) -> None:
+        """按扩展名写入 .prom (Prometheus) 或 JSON; 先写临时文件再替换, 读取方不会看到半个文件"""
+        path = Path(path)
+        text = self.to_prometheus() if path.suffix == '.prom' else json.dumps(self.to_dict())
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Metrics":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def _prometheus_histogram(lines: List[str], metric: str, help_text: str,
+                          series: Dict[Optional[str], Histogram]) -> None:
+    lines.append(f'# HELP {metric} {help_text}')
+    lines.append(f'# TYPE {metric} histogram')
+    for name, hist in series.items():
+        label = f'command="{name}",' if name is not None else ''
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), hist.counts):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{metric}_bucket{{{label}le="{le}"}} {cumulative}')
+        suffix = f'{{{label.rstrip(",")}}}' if label else ''
+        lines.append(f'{metric}_sum{suffix} {hist.total}')
+        lines.append(f'{metric}_count{suffix} {hist.count}')
+
+
+def enable(metrics: Optional[Metrics] = None) -> Metrics:
+    """开始记录, 返回正在使用的 Metrics"""
+    global active
+    active = metrics if metrics is not None else Metrics()
+    return active
+
+
+def disable() -> Optional[Metrics]:
+    """停止记录, 返回已记录的 Metrics"""
+    global active
+    metrics, active = active, None
+    return metrics
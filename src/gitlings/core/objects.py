@@ -0,0 +1,238 @@
+import hashlib
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+@dataclass(frozen=True)
+class Blob:
+    """文件内容对象"""
+    data: str
+
+    type = 'blob'
+
+
+@dataclass(frozen=True)
+class Tree:
+    """目录对象, entries 为按 git 规则排序的 (名称, 类型, 哈希)"""
+    entries: Tuple[Tuple[str, str, str], ...]
+
+    type = 'tree'
+
+
+@dataclass(frozen=True)
+class Commit:
+    """提交对象"""
+    tree: str
+    parents: Tuple[str, ...]
+    message: str
+    author: str
+    timestamp: int
+
+    type = 'commit'
+
+
+GitObject = Union[Blob, Tree, Commit]
+
+_MODES = {'blob': '100644', 'tree': '40000'}
+
+# 新写入的哈希先放在未排序的缓冲区, 超过该数量再并入有序数组
+_PENDING_IDS = 256
+
+
+def serialize(obj: GitObject) -> bytes:
+    """按 git 的对象格式序列化(不含头部)"""
+    if isinstance(obj, Blob):
+        return obj.data.encode()
+    if isinstance(obj, Tree):
+        return b''.join(
+            f"{_MODES[kind]} {name}".encode() + b'\0' + bytes.fromhex(sha)
+            for name, kind, sha in obj.entries
+        )
+    lines = [f"tree {obj.tree}"]
+    lines.extend(f"parent {p}" for p in obj.parents)
+    lines.append(f"author {obj.author} {obj.timestamp} +0000")
+    lines.append(f"committer {obj.author} {obj.timestamp} +0000")
+    return ("\n".join(lines) + f"\n\n{obj.message}\n").encode()
+
+
+def hash_object(obj: GitObject) -> str:
+    """计算与 git 一致的 SHA-1 对象哈希"""
+    body = serialize(obj)
+    header = f"{obj.type} {len(body)}\0".encode()
+    return hashlib.sha1(header + body).hexdigest()
+
+
+def _entry_key(entry: Tuple[str, str, str]) -> str:
+    # git 对子目录按 "name/" 排序
+    name, kind, _ = entry
+    return name + '/' if kind == 'tree' else name
+
+
+class ObjectStore:
+    """以内容 SHA-1 为键的对象库, 相同内容只保存一份"""
+
+    def __init__(self):
+        self._objects: Dict[str, GitObject] = {}
+        # 缩写哈希查找用: 有序的哈希数组 + 少量最近写入的哈希
+        self._ids: List[str] = []
+        self._new_ids: List[str] = []
+        # 目录树哈希 -> {名称: (类型, 哈希)}, 单路径查找用; 树不可变, 可以一直缓存
+        self._tree_maps: Dict[str, Dict[str, Tuple[str, str]]] = {}
+
+    def __contains__(self, sha: str) -> bool:
+        return sha in self._objects
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._objects)
+
+    def put(self, obj: GitObject) -> str:
+        sha = hash_object(obj)
+        if sha not in self._objects:
+            self._objects[sha] = obj
+            self._new_ids.append(sha)
+        return sha
+
+    def get(self, sha: str) -> GitObject:
+        return self._objects[sha]
+
+    def add(self, sha: str, obj: GitObject) -> None:
+        """写入从另一个对象库取得的对象; 哈希已知, 对象不可变, 两边共享同一个实例"""
+        if sha not in self._objects:
+            self._objects[sha] = obj
+            self._new_ids.append(sha)
+
+    def find_prefix(self, prefix: str) -> List[str]:
+        """所有以 prefix 开头的对象哈希, 有序数组上二分查找, 与对象总数无关"""
+        if len(self._new_ids) > _PENDING_IDS:
+            self._ids.extend(self._new_ids)
+            self._ids.sort()
+            self._new_ids = []
+        matches = []
+        i = bisect_left(self._ids, prefix)
+        while i < len(self._ids) and self._ids[i].startswith(prefix):
+            matches.append(self._ids[i])
+            i += 1
+        matches.extend(sha for sha in self._new_ids if sha.startswith(prefix))
+        return sorted(matches)
+
+    # ---- 便捷读写 ----
+    def write_blob(self, data: str) -> str:
+        return self.put(Blob(data))
+
+    def read_blob(self, sha: str) -> str:
+        return self._objects[sha].data
+
+    def write_commit(self, tree: str, parents: Tuple[str, ...], message: str,
+                     author: str, timestamp: int) -> str:
+        return self.put(Commit(tree, tuple(parents), message, author, timestamp))
+
+    def write_tree(self, files: Dict[str, str]) -> str:
+        """由 {路径: blob哈希} 构建嵌套的目录树"""
+        return self.update_tree(None, files)
+
+    def update_tree(self, base: Optional[str], changes: Dict[str, Optional[str]]) -> str:
+        """在已有目录树上应用变更, 只重写被修改路径上的子树
+
+        changes 中值为 None 表示删除该路径。
+        """
+        entries = {}
+        if base is not None:
+            entries = {name: (kind, sha) for name, kind, sha in self._objects[base].entries}
+
+        nested: Dict[str, Dict[str, Optional[str]]] = {}
+        for path, sha in changes.items():
+            head, sep, rest = path.partition('/')
+            if sep:
+                nested.setdefault(head, {})[rest] = sha
+            elif sha is None:
+                entries.pop(head, None)
+            else:
+                entries[head] = ('blob', sha)
+
+        for name, sub_changes in nested.items():
+            current = entries.get(name)
+            sub_base = current[1] if current and current[0] == 'tree' else None
+            sub_tree = self.update_tree(sub_base, sub_changes)
+            if self._objects[sub_tree].entries:
+                entries[name] = ('tree', sub_tree)
+            else:
+                entries.pop(name, None)
+
+        flat = sorted(((n, k, s) for n, (k, s) in entries.items()), key=_entry_key)
+        return self.put(Tree(tuple(flat)))
+
+    def read_tree(self, sha: str, prefix: str = '') -> Dict[str, str]:
+        """把目录树展开为 {路径: blob哈希}"""
+        return dict(self.iter_tree(sha, prefix))
+
+    def iter_tree(self, sha: str, prefix: str = '') -> Iterator[Tuple[str, str]]:
+        for name, kind, entry_sha in self._objects[sha].entries:
+            path = prefix + name
+            if kind == 'tree':
+                yield from self.iter_tree(entry_sha, path + '/')
+            else:
+                yield path, entry_sha
+
+    def lookup_path(self, tree: Optional[str], path: str) -> Optional[str]:
+        """在目录树中查找单个路径对应的 blob 哈希"""
+        entry = self.lookup_entry(tree, path)
+        return entry[1] if entry and entry[0] == 'blob' else None
+
+    def lookup_entry(self, tree: Optional[str], path: str) -> Optional[Tuple[str, str]]:
+        """在目录树中查找路径, 返回 (类型, 哈希); 空路径为整棵树"""
+        if not path:
+            return ('tree', tree) if tree else None
+        parts = path.split('/')
+        for i, part in enumerate(parts):
+            if tree is None:
+                return None
+            kind_sha = self._tree_map(tree).get(part)
+            if kind_sha is None:
+                return None
+            if i == len(parts) - 1:
+                return kind_sha
+            kind, sha = kind_sha
+            tree = sha if kind == 'tree' else None
+        return None
+
+    def _tree_map(self, tree: str) -> Dict[str, Tuple[str, str]]:
+        entries = self._tree_maps.get(tree)
+        if entries is None:
+            entries = {name: (kind, sha) for name, kind, sha in self._objects[tree].entries}
+            self._tree_maps[tree] = entries
+        return entries
+
+    def diff_trees(self, old: Optional[str], new: Optional[str],
+                   prefix: str = '') -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """比较两棵目录树, 产出 (路径, 旧blob, 新blob); 哈希相同的子树直接跳过"""
+        if old == new:
+            return
+        old_entries = {n: (k, s) for n, k, s in self._objects[old].entries} if old else {}
+        new_entries = {n: (k, s) for n, k, s in self._objects[new].entries} if new else {}
+        for name in sorted(old_entries.keys() | new_entries.keys()):
+            before = old_entries.get(name)
+            after = new_entries.get(name)
+            if before == after:
+                continue
+            path = prefix + name
+            old_sub = before[1] if before and before[0] == 'tree' else None
+            new_sub = after[1] if after and after[0] == 'tree' else None
+            if old_sub or new_sub:
+                yield from self.diff_trees(old_sub, new_sub, path + '/')
+            old_blob = before[1] if before and before[0] == 'blob' else None
+            new_blob = after[1] if after and after[0] == 'blob' else None
+            if old_blob != new_blob:
+                yield path, old_blob, new_blob
+
+    def empty_tree(self) -> str:
+        return self.put(Tree(()))
+
+    def __getstate__(self):
+        # 查找缓存可以重建, 不写入会话快照
+        state = self.__dict__.copy()
+        state['_tree_maps'] = {}
+        return state
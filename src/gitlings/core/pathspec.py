@@ -0,0 +1,193 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+_GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+def _translate(pattern: str, star: str) -> str:
+    """把通配符模式翻译为正则; star 是单个 * 对应的正则
+
+    `**/`、`/**/` 和结尾的 `/**` 可以匹配任意层目录(包括零层)。
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i) and i + 2 == n and (i == 0 or pattern[i - 1] == '/'):
+            out.append('.*')
+            i += 2
+        elif c == '*':
+            out.append(star)
+            i += 1
+        elif c == '?':
+            out.append(star[:-1])
+            i += 1
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^', ']') else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body[:1] in ('!', '^'):
+                body = '^' + body[1:]
+            out.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+
+def _alternation(parts: List[str]) -> Optional["re.Pattern"]:
+    return re.compile('|'.join(f'(?:{p})' for p in parts)) if parts else None
+
+
+class Pathspec:
+    """命令行中的路径参数, 编译为一个包含正则和一个排除正则
+
+    - 普通路径匹配该文件或目录下的所有文件, `.` 匹配全部
+    - 含 `*`/`?`/`[...]` 时按通配符匹配完整路径, `*` 可以跨目录(与 git 相同)
+    - `:!path`、`:^path`、`:(exclude)path` 为排除
+    roots 是各个模式中不含通配符的目录前缀, 只需要在这些子树中查找。
+    """
+
+    def __init__(self, specs: Iterable[str]):
+        self.specs: List[Tuple[str, str, "re.Pattern"]] = []  # (原文, 根路径, 正则)
+        includes, excludes, roots = [], [], []
+        for spec in specs:
+            exclude = False
+            for magic in (':!', ':^', ':(exclude)'):
+                if spec.startswith(magic):
+                    spec, exclude = spec[len(magic):], True
+                    break
+            regex, root = self._compile(spec)
+            if exclude:
+                excludes.append(regex)
+                continue
+            includes.append(regex)
+            roots.append(root)
+            self.specs.append((spec, root, re.compile(regex)))
+        if not includes:
+            # 只有排除项时相当于从 `.` 中排除
+            includes, roots = ['.*'], ['']
+        self._include = _alternation(includes)
+        self._exclude = _alternation(excludes)
+        self._everything = self._exclude is None and '.*' in includes
+        # 去掉位于其他根之下的根, 避免重复遍历
+        roots = sorted(set(roots))
+        self.roots = [r for i, r in enumerate(roots)
+                      if not any(r == o or not o or r.startswith(o + '/') for o in roots[:i])]
+
+    @staticmethod
+    def _compile(spec: str) -> Tuple[str, str]:
+        """单个模式的正则和根路径"""
+        while spec.startswith('./'):
+            spec = spec[2:]
+        if spec in ('', '.', ':/'):
+            return '.*', ''
+        directory_only = spec.endswith('/')
+        spec = spec.rstrip('/')
+        glob = _GLOB_CHARS.search(spec)
+        if glob is None:
+            body, root = re.escape(spec), spec
+        else:
+            body, root = _translate(spec, '.*'), spec[:spec.rfind('/', 0, glob.start()) + 1].rstrip('/')
+        return body + ('/.*' if directory_only else '(?:/.*)?'), root
+
+    def match(self, path: str) -> bool:
+        if self._everything:
+            return True
+        if not self._include.fullmatch(path):
+            return False
+        return self._exclude is None or not self._exclude.fullmatch(path)
+
+
+@lru_cache(maxsize=256)
+def compile_pathspec(specs: Tuple[str, ...]) -> Pathspec:
+    """编译并缓存 pathspec, 同样的参数只编译一次"""
+    return Pathspec(specs)
+
+
+class IgnoreRules:
+    """所有 .gitignore 文件中的规则, 编译为文件和目录两个正则
+
+    规则按优先级从低到高排列(上级目录的文件在前, 同一文件中后面的规则在后)。
+    两个正则都是按优先级倒序排列的分支, 第一个匹配的分支就是最终生效的规则,
+    由分支的组名判断它是忽略还是 `!` 取消忽略。只以 `/` 结尾的规则只匹配目录。
+    """
+
+    def __init__(self, sources: Iterable[Tuple[str, str]]):
+        """sources: (所在目录, 文件内容), 目录为 '' 表示仓库根目录"""
+        file_rules, dir_rules = [], []
+        for directory, text in sources:
+            for line in text.splitlines():
+                rule = self._compile(directory, line)
+                if rule is None:
+                    continue
+                regex, negated, directory_only = rule
+                dir_rules.append((regex, negated))
+                if not directory_only:
+                    file_rules.append((regex, negated))
+        self._file = self._combine(file_rules)
+        self._dir = self._combine(dir_rules)
+
+    @staticmethod
+    def _compile(directory: str, line: str) -> Optional[Tuple[str, bool, bool]]:
+        if not line.strip() or line.startswith('#'):
+            return None
+        line = line.rstrip(' ') if not line.endswith('\\ ') else line
+        negated = line.startswith('!')
+        if negated or line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        directory_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+        # 开头或中间有 / 的规则相对于 .gitignore 所在目录, 否则匹配任意层的文件名
+        anchored = '/' in line
+        line = line.lstrip('/')
+        base = re.escape(directory + '/') if directory else ''
+        regex = base + ('' if anchored else '(?:.*/)?') + _translate(line, '[^/]*')
+        return regex, negated, directory_only
+
+    @staticmethod
+    def _combine(rules: List[Tuple[str, bool]]) -> Optional["re.Pattern"]:
+        if not rules:
+            return None
+        branches = [f'(?P<{"n" if negated else "i"}{n}>{regex})'
+                    for n, (regex, negated) in reversed(list(enumerate(rules)))]
+        return re.compile('|'.join(branches))
+
+    def __bool__(self) -> bool:
+        return self._dir is not None
+
+    @staticmethod
+    def _decide(pattern: Optional["re.Pattern"], path: str) -> bool:
+        if pattern is None:
+            return False
+        match = pattern.fullmatch(path)
+        return match is not None and match.lastgroup[0] == 'i'
+
+    def ignores_file(self, path: str) -> bool:
+        """只看文件本身, 不检查上级目录"""
+        return self._decide(self._file, path)
+
+    def ignores_dir(self, path: str) -> bool:
+        """目录本身是否被忽略; 被忽略目录下的文件不能再被 `!` 规则取消忽略"""
+        return self._decide(self._dir, path)
+
+    def ignores(self, path: str) -> bool:
+        """文件或它的任一上级目录被忽略"""
+        parts = path.split('/')
+        for i in range(1, len(parts)):
+            if self.ignores_dir('/'.join(parts[:i])):
+                return True
+        return self.ignores_file(path)
@@ -0,0 +1,417 @@
+import heapq
+import os
+import queue
+import shlex
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import git
+
+from .graph import CommitGraph
+from .objects import Blob, Commit, Tree
+
+# 沙箱中执行命令时禁止交互: 不启动编辑器/分页器, 不询问凭据
+_GIT_ENV = {
+    'GIT_EDITOR': 'true',
+    'GIT_PAGER': 'cat',
+    'GIT_TERMINAL_PROMPT': '0',
+}
+
+
+class CatFile:
+    """一个常驻的 `git cat-file --batch` 进程, 每次查询只是一次管道往返"""
+
+    def __init__(self, repo_path: Path):
+        self._proc = subprocess.Popen(
+            ['git', 'cat-file', '--batch'], cwd=repo_path,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, rev: str) -> Optional[Tuple[str, str, bytes]]:
+        """读取对象, 返回 (哈希, 类型, 内容); 对象不存在或有歧义时返回 None"""
+        if not rev or any(c.isspace() for c in rev):
+            return None
+        self._proc.stdin.write(rev.encode("utf-8") + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline()
+        if not header:
+            raise OSError("git cat-file exited unexpectedly")
+        parts = header.split()
+        if len(parts) != 3:
+            # "<rev> missing" / "<rev> ambiguous"
+            return None
+        sha, kind, size = parts
+        data = self._proc.stdout.read(int(size))
+        self._proc.stdout.read(1)  # 内容后的换行
+        return sha.decode(), kind.decode(), data
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            self._proc.wait()
+
+
+class GitProcessPool:
+    """常驻 git 进程池, 多个线程可以同时查询同一个仓库
+
+    进程按需启动, 最多 size 个; 用完放回池中复用, 不会为每次查询新建进程。
+    """
+
+    def __init__(self, repo_path: Path, size: int = 2):
+        self.repo_path = Path(repo_path)
+        self.size = size
+        self._idle: "queue.LifoQueue[CatFile]" = queue.LifoQueue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._all: List[CatFile] = []
+
+    @contextmanager
+    def reader(self) -> Iterator[CatFile]:
+        cat = self._acquire()
+        try:
+            yield cat
+        except BaseException:
+            # 管道状态未知, 不再复用
+            self._discard(cat)
+            raise
+        else:
+            self._idle.put(cat)
+
+    def read(self, rev: str) -> Optional[Tuple[str, str, bytes]]:
+        with self.reader() as cat:
+            return cat.read(rev)
+
+    def _acquire(self) -> CatFile:
+        while True:
+            try:
+                cat = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if cat.alive:
+                return cat
+            self._discard(cat)
+        with self._lock:
+            if self._started < self.size:
+                self._started += 1
+                cat = CatFile(self.repo_path)
+                self._all.append(cat)
+                return cat
+        return self._idle.get()
+
+    def _discard(self, cat: CatFile) -> None:
+        cat.close()
+        with self._lock:
+            self._started -= 1
+            self._all.remove(cat)
+
+    def close(self) -> None:
+        with self._lock:
+            for cat in self._all:
+                cat.close()
+            self._all.clear()
+            self._started = 0
+        self._idle = queue.LifoQueue()
+
+
+def parse_commit(data: bytes) -> Commit:
+    headers, _, message = data.decode("utf-8", "replace").partition("\n\n")
+    tree, parents, author, timestamp = "", [], "", 0
+    for line in headers.split("\n"):
+        key, _, value = line.partition(" ")
+        if key == 'tree':
+            tree = value
+        elif key == 'parent':
+            parents.append(value)
+        elif key == 'author':
+            # "Name <email> 1700000000 +0800"
+            author, stamp, _ = value.rsplit(" ", 2)
+            timestamp = int(stamp)
+    return Commit(tree, tuple(parents), message.rstrip("\n"), author, timestamp)
+
+
+def parse_tree(data: bytes) -> Tree:
+    entries = []
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        mode = data[pos:space]
+        name = data[space + 1:nul].decode("utf-8", "replace")
+        sha = data[nul + 1:nul + 21].hex()
+        entries.append((name, 'tree' if mode == b'40000' else 'blob', sha))
+        pos = nul + 21
+    return Tree(tuple(entries))
+
+
+class RepoObjects:
+    """真实仓库的只读对象库, 接口与 ObjectStore.get 一致
+
+    对象不可变, 解析结果永久缓存; 未命中时通过进程池读取。
+    """
+
+    def __init__(self, repo_path: Path, pool_size: int = 2):
+        self.repo_path = Path(repo_path)
+        self.pool_size = pool_size
+        self._pool: Optional[GitProcessPool] = None
+        self._cache: Dict[str, object] = {}
+
+    @property
+    def pool(self) -> GitProcessPool:
+        if self._pool is None:
+            self._pool = GitProcessPool(self.repo_path, self.pool_size)
+        return self._pool
+
+    def get(self, sha: str):
+        obj = self._cache.get(sha)
+        if obj is None:
+            found = self.pool.read(sha)
+            if found is None:
+                raise KeyError(sha)
+            _, kind, data = found
+            if kind == 'commit':
+                obj = parse_commit(data)
+            elif kind == 'tree':
+                obj = parse_tree(data)
+            else:
+                obj = Blob(data.decode("utf-8", "replace"))
+            self._cache[sha] = obj
+        return obj
+
+    def __contains__(self, sha: str) -> bool:
+        try:
+            self.get(sha)
+        except KeyError:
+            return False
+        return True
+
+    def resolve(self, rev: str) -> Optional[str]:
+        """把 rev 解析为提交哈希, 无法解析时返回 None"""
+        found = self.pool.read(f"{rev}^{{commit}}")
+        return found[0] if found else None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def __getstate__(self):
+        # 进程不随会话序列化, 恢复后按需重新启动
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+
+class Worktree:
+    """沙箱工作区的只读视图, 用于 `path in state['working_dir']`"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def __contains__(self, path: str) -> bool:
+        return (self.root / path).is_file()
+
+    def __iter__(self) -> Iterator[str]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if '.git' in dirnames:
+                dirnames.remove('.git')
+            for name in filenames:
+                yield os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+
+
+class RealGit:
+    """在真实的沙箱仓库中执行 git 命令, 接口与 VirtualGit 相同
+
+    命令交给系统 git 执行; 验证条件需要的引用从 .git 目录直接读取,
+    提交对象通过常驻的 cat-file 进程池读取, 单次查询不需要启动新进程。
+    """
+
+    def __init__(self, path: Path, pool_size: int = 2):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._objects = RepoObjects(self.path, pool_size)
+        self._graph = CommitGraph(self._objects)
+        self._listeners = []
+        self._state = {}
+        self._head: Optional[str] = None
+        self._refresh()
+
+    @property
+    def state(self) -> Dict:
+        return self._state
+
+    @property
+    def graph(self) -> CommitGraph:
+        return self._graph
+
+    @property
+    def git_dir(self) -> Path:
+        return self.path / ".git"
+
+    def subscribe(self, listener) -> None:
+        """注册状态变化监听器, listener(event, data), 事件与 VirtualGit 相同, 另有 reload 发出的 refs"""
+        self._listeners.append(listener)
+
+    def _emit(self, event: str, **data) -> None:
+        for listener in self._listeners:
+            listener(event, data)
+
+    # ---- 命令执行 ----
+    def _parse(self, command: str):
+        """拆分命令行, 返回参数列表; 不是合法的 git 命令时返回错误信息"""
+        try:
+            cmd_parts = shlex.split(command)
+        except ValueError as exc:
+            return f"error: {exc}"
+        if not cmd_parts:
+            return ""
+        if cmd_parts[0] != "git":
+            return f"git: '{cmd_parts[0]}' is not a git command."
+        if len(cmd_parts) < 2:
+            return "usage: git <command> [<args>]"
+        return cmd_parts
+
+    def run_command(self, command: str) -> str:
+        """在沙箱仓库中执行 git 命令"""
+        cmd_parts = self._parse(command)
+        if isinstance(cmd_parts, str):
+            return cmd_parts
+
+        status, stdout, stderr = git.Git(self.path).execute(
+            cmd_parts, with_extended_output=True, with_exceptions=False,
+            env=_GIT_ENV, kill_after_timeout=60, strip_newline_in_stdout=True,
+        )
+        self._sync()
+        self._emit('command', name=cmd_parts[1], args=cmd_parts[2:])
+        return "\n".join(part for part in (stdout, stderr.rstrip("\n")) if part)
+
+    def stream_command(self, command: str) -> Iterator[str]:
+        """与 run_command 相同, 但输出逐行产生; 迭代器被提前关闭时终止 git 进程"""
+        cmd_parts = self._parse(command)
+        if isinstance(cmd_parts, str):
+            yield cmd_parts
+            return
+        proc = subprocess.Popen(
+            cmd_parts, cwd=self.path, env={**os.environ, **_GIT_ENV},
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, errors='replace',
+        )
+        try:
+            for line in proc.stdout:
+                yield line.rstrip("\n")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+            self._sync()
+            self._emit('command', name=cmd_parts[1], args=cmd_parts[2:])
+
+    def _sync(self) -> None:
+        """命令执行后重新读取引用, 并发出与 VirtualGit 相同的状态事件"""
+        was_initialized = self._state['repo_initialized']
+        old_head, old_conflict = self._head, self._state['conflict']
+        self._refresh()
+        if self._state['repo_initialized'] and not was_initialized:
+            self._emit('init')
+        if self._head != old_head:
+            self._emit('head', old=old_head, new=self._head)
+        if self._state['conflict'] != old_conflict:
+            self._emit('conflict', value=self._state['conflict'])
+
+    def reload(self) -> None:
+        """仓库在命令之外被改动(例如在另一个终端中执行了 git)后重新读取
+
+        除 init/head/conflict 外, 分支、标签或当前分支有变化时发出 refs 事件,
+        只有依赖引用的验证条件会重新求值。
+        """
+        old_refs = (self._state['branches'], self._state['tags'], self._state['current_branch'])
+        self._sync()
+        if (self._state['branches'], self._state['tags'], self._state['current_branch']) != old_refs:
+            self._emit('refs')
+
+    def config_value(self, key: str) -> Optional[str]:
+        """git 实际生效的配置值(包括全局配置), 未设置时为 None"""
+        status, stdout, _ = git.Git(self.path).execute(
+            ["git", "config", "--get", key], with_extended_output=True, with_exceptions=False,
+            env=_GIT_ENV, strip_newline_in_stdout=True,
+        )
+        return stdout if status == 0 else None
+
+    # ---- 仓库状态 ----
+    def _refresh(self) -> None:
+        initialized = (self.git_dir / "HEAD").is_file()
+        refs = self._read_refs() if initialized else {}
+        head_ref = self._read_head() if initialized else "refs/heads/main"
+        current = head_ref[len("refs/heads/"):] if head_ref.startswith("refs/heads/") else None
+        branches = {name[len("refs/heads/"):]: sha for name, sha in refs.items()
+                    if name.startswith("refs/heads/")}
+        if current and current not in branches:
+            branches[current] = None  # 尚无提交的当前分支
+        self._head = refs.get(head_ref) if current else head_ref
+        self._state = {
+            'repo_initialized': initialized,
+            'branches': branches,
+            'current_branch': current,
+            'working_dir': Worktree(self.path),
+            'objects': self._objects,
+            'tags': {name[len("refs/tags/"):]: sha for name, sha in refs.items()
+                     if name.startswith("refs/tags/")},
+            'conflict': any((self.git_dir / name).exists()
+                            for name in ("MERGE_HEAD", "CHERRY_PICK_HEAD", "REVERT_HEAD")),
+        }
+
+    def _read_head(self) -> str:
+        """HEAD 指向的引用名; 分离头指针时为提交哈希"""
+        head = (self.git_dir / "HEAD").read_text().strip()
+        return head[len("ref: "):] if head.startswith("ref: ") else head
+
+    def _read_refs(self) -> Dict[str, str]:
+        """读取 packed-refs 和松散引用, 松散引用优先"""
+        refs: Dict[str, str] = {}
+        try:
+            for line in (self.git_dir / "packed-refs").read_text().splitlines():
+                if line and line[0] not in "#^":
+                    sha, _, name = line.partition(" ")
+                    refs[name] = sha
+        except OSError:
+            pass
+        refs_dir = self.git_dir / "refs"
+        for dirpath, _, filenames in os.walk(refs_dir):
+            for filename in filenames:
+                path = Path(dirpath, filename)
+                try:
+                    value = path.read_text().strip()
+                except OSError:
+                    continue
+                if len(value) == 40:
+                    refs[path.relative_to(self.git_dir).as_posix()] = value
+        return refs
+
+    def iter_commits(self, rev: str = 'HEAD') -> Iterator[tuple]:
+        """按时间倒序遍历 rev 可达的所有提交, 产出 (哈希, Commit)"""
+        start = self._objects.resolve(rev) if self._state['repo_initialized'] else None
+        if start is None:
+            return
+        objects = self._objects
+        seen = {start}
+        heap = [(-objects.get(start).timestamp, 0, start)]
+        counter = 1
+        while heap:
+            _, _, sha = heapq.heappop(heap)
+            commit: Commit = objects.get(sha)
+            yield sha, commit
+            for parent in commit.parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(heap, (-objects.get(parent).timestamp, counter, parent))
+                    counter += 1
+
+    def close(self) -> None:
+        self._objects.close()
@@ -0,0 +1,107 @@
+import zlib
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+# 快照把引用按名字分到固定数量的桶中, 每个桶是 (名字, 哈希) 的 frozenset
+BUCKETS = 64
+RefSnapshot = Tuple[FrozenSet[Tuple[str, Optional[str]]], ...]
+EMPTY_REFS: RefSnapshot = (frozenset(),) * BUCKETS
+
+
+def _bucket(name: str) -> int:
+    # 不能用 hash(): 字符串哈希每个进程不同, 而快照会随会话一起保存
+    return zlib.crc32(name.encode()) % BUCKETS
+
+
+class RefMap(dict):
+    """分支或标签: 名字 -> 提交哈希, 与 WorkingDir 一样记录自上次快照以来改动过的名字
+
+    快照之间共享未改动的桶, 改动一个引用只需复制外层元组并重建一个桶;
+    比较两个快照时相同的桶按对象身份直接跳过。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._changed: Set[str] = set()
+        self._snapshot: Optional[RefSnapshot] = None
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        return _restore_ref_map, (dict(self), set(self._changed), self._snapshot)
+
+    def __setitem__(self, name: str, sha: Optional[str]) -> None:
+        super().__setitem__(name, sha)
+        self._changed.add(name)
+
+    def __delitem__(self, name: str) -> None:
+        super().__delitem__(name)
+        self._changed.add(name)
+
+    def pop(self, name, *default):
+        if name in self:
+            self._changed.add(name)
+        return super().pop(name, *default)
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def update(self, *args, **kwargs) -> None:
+        for name, sha in dict(*args, **kwargs).items():
+            self[name] = sha
+
+    def clear(self) -> None:
+        self._changed.update(self)
+        super().clear()
+
+    def popitem(self):
+        name, sha = super().popitem()
+        self._changed.add(name)
+        return name, sha
+
+    def snapshot(self) -> RefSnapshot:
+        if not self._changed and self._snapshot is not None:
+            return self._snapshot
+        if self._snapshot is None:
+            buckets = [[] for _ in range(BUCKETS)]
+            for name, sha in self.items():
+                buckets[_bucket(name)].append((name, sha))
+            self._snapshot = tuple(map(frozenset, buckets))
+        elif self._changed:
+            touched: Dict[int, Set[str]] = {}
+            for name in self._changed:
+                touched.setdefault(_bucket(name), set()).add(name)
+            buckets = list(self._snapshot)
+            for b, names in touched.items():
+                kept = [item for item in buckets[b] if item[0] not in names]
+                kept.extend((name, self[name]) for name in names if name in self)
+                buckets[b] = frozenset(kept)
+            self._snapshot = tuple(buckets)
+        self._changed.clear()
+        return self._snapshot
+
+    def restore(self, target: RefSnapshot) -> None:
+        """回到快照 target, 只比较和改动不同的桶"""
+        current_snapshot = self.snapshot()
+        if current_snapshot is target:
+            return
+        for current, wanted in zip(current_snapshot, target):
+            if current is wanted or current == wanted:
+                continue
+            old, new = dict(current), dict(wanted)
+            for name in old.keys() - new.keys():
+                self.pop(name)
+            for name, sha in new.items():
+                if name not in old or old[name] != sha:
+                    self[name] = sha
+        self._snapshot = target
+        self._changed.clear()
+
+
+def _restore_ref_map(refs: Dict[str, Optional[str]], changed: Set[str],
+                     snapshot: Optional[RefSnapshot]) -> RefMap:
+    ref_map = RefMap(refs)
+    if snapshot is not None:
+        ref_map._changed = changed
+        ref_map._snapshot = snapshot
+    return ref_map
@@ -0,0 +1,71 @@
+from typing import Callable, Iterable, List, Tuple
+
+from .objects import ObjectStore
+
+# 模拟的远程仓库是同一进程中的其他 VirtualGit(裸仓库), 按 URL 登记在一个共享的字典中;
+# 各仓库有自己的对象库, 传输时只复制对方缺少的对象, 对象本身不可变, 复制的只是引用。
+#
+# 协商中 "have" 集合就是接收方的对象库: 提交总是连同全部祖先、目录树总是连同全部内容
+# 一起写入, 所以对方已有某个提交(或子树)时, 它可达的一切都不需要再发送。
+
+
+def normalize_url(url: str) -> str:
+    return url.rstrip('/')
+
+
+def negotiate(objects: ObjectStore, wants: Iterable[str],
+              have: Callable[[str], bool]) -> List[str]:
+    """have/want 协商: 从 wants 沿父指针遍历, 遇到对方已有的提交即停止
+
+    返回对方缺少的提交, 父提交在前; 代价与新提交数成正比。
+    """
+    order: List[str] = []
+    seen = set()
+    stack: List[Tuple[str, bool]] = [(sha, False) for sha in wants]
+    while stack:
+        sha, expanded = stack.pop()
+        if expanded:
+            order.append(sha)
+            continue
+        if sha in seen or have(sha):
+            continue
+        seen.add(sha)
+        stack.append((sha, True))
+        stack.extend((parent, False) for parent in objects.get(sha).parents)
+    return order
+
+
+def send_objects(src: ObjectStore, dst: ObjectStore, commits: List[str]) -> int:
+    """把 commits(父提交在前)及其目录树中 dst 缺少的对象写入 dst, 返回写入的对象数
+
+    dst 已有的子树整个跳过, 所以只访问新提交改动过的目录。
+    """
+    count = 0
+    for sha in commits:
+        commit = src.get(sha)
+        pending = [commit.tree]
+        trees = []
+        while pending:
+            tree_sha = pending.pop()
+            if tree_sha in dst:
+                continue
+            tree = src.get(tree_sha)
+            trees.append((tree_sha, tree))
+            for _, kind, entry in tree.entries:
+                if kind == 'tree':
+                    pending.append(entry)
+                elif entry not in dst:
+                    dst.add(entry, src.get(entry))
+                    count += 1
+        # 子树先于父目录写入, 保持 "有目录树就有其全部内容"
+        for tree_sha, tree in reversed(trees):
+            dst.add(tree_sha, tree)
+        dst.add(sha, commit)
+        count += len(trees) + 1
+    return count
+
+
+def transfer(src: ObjectStore, dst: ObjectStore, wants: Iterable[str]) -> Tuple[int, int]:
+    """把 wants 可达而 dst 没有的对象复制过去, 返回 (新提交数, 对象数)"""
+    commits = negotiate(src, [sha for sha in wants if sha], dst.__contains__)
+    return len(commits), send_objects(src, dst, commits)
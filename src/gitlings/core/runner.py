@@ -1,21 +1,33 @@
+import time
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Dict, Iterator, List, Optional, Union
+from . import metrics
+from .catalog import Catalog
+from .checkpoint import Checkpoint, UndoStack
+from .checks import CheckEngine
 from .exercise import Exercise
+from .real_git import RealGit
 from .virtual_git import VirtualGit
 
 class ExerciseRunner:
-    def __init__(self, exercises_dir: Path):
-        self.exercises = self._load_exercises(exercises_dir)
+    def __init__(self, exercises_dir: Path, exercises: Optional[List[Exercise]] = None,
+                 sandbox: Optional[Path] = None, git=None):
+        # 多个会话可以共享同一份已加载的练习列表
+        self.exercises = exercises if exercises is not None else self._load_exercises(exercises_dir)
+        # 指定 sandbox 时每个练习在其下的真实仓库中进行, 否则使用模拟器
+        self.sandbox = sandbox
         self.current_index = 0
-        self.git = VirtualGit()
+        # 也可以从给定的仓库状态开始(例如 synthetic.generate_repo 生成的大仓库)
+        self.git = git if git is not None else self._new_git()
+        self.checks = self._compile_checks()
         self.history = []
+        # 模拟器中每条改变了状态的命令之前都有一个检查点, 供 gitlings undo/redo 使用
+        self.undo_stack = UndoStack()
+        # 练习的初始状态, 执行第一条命令前才记录, 创建会话时不需要为它付出代价
+        self.fixture: Optional[Checkpoint] = None
     
     def _load_exercises(self, root: Path) -> List[Exercise]:
-        exercises = []
-        for ex_dir in sorted(root.glob("*/*")):
-            if (ex_dir / "meta.toml").exists():
-                exercises.append(Exercise.load(ex_dir))
-        return exercises
+        return Catalog(root).exercises()
     
     @property
     def current_exercise(self) -> Optional[Exercise]:
@@ -26,39 +38,134 @@ class ExerciseRunner:
     def next(self) -> bool:
         if self.current_index + 1 < len(self.exercises):
             self.current_index += 1
-            self.git = VirtualGit()  # 重置Git环境
+            if isinstance(self.git, RealGit):
+                self.git.close()
+            self.git = self._new_git()  # 重置Git环境
+            self.checks = self._compile_checks()
+            self.undo_stack.clear()
+            self.fixture = None
             return True
         return False
     
-    def verify(self) -> Dict[str, bool]:
+    def _new_git(self):
+        if self.sandbox is None:
+            return VirtualGit()
+        exercise = self.current_exercise
+        name = exercise.id.replace("/", "_") if exercise else "playground"
+        return RealGit(Path(self.sandbox) / name)
+
+    def _compile_checks(self) -> CheckEngine:
+        """编译当前练习的验证条件, 之后随 VirtualGit 的状态事件增量更新"""
+        checks = self.current_exercise.checks if self.current_exercise else []
+        return CheckEngine(checks, self.git)
+
+    def verify(self, full: bool = False) -> Dict[str, bool]:
+        """各验证条件的结果; full 时从当前状态重新求值, 而不只读取增量结果"""
         if not self.current_exercise:
             return {}
-        
-        results = {}
-        for check in self.current_exercise.checks:
-            check_id, check_desc = check.split("@")
-            check_id = check_id.strip()
-            
-            if check_id == "git init":
-                results[check_desc.strip()] = self.git.state['repo_initialized']
-            elif check_id == "hello.txt存在":
-                results[check_desc.strip()] = "hello.txt" in self.git.state['working_dir']
-            elif check_id == "提交信息规范":
-                results[check_desc.strip()] = any(
-                    "feat:" in c['message'] for c in self.git.state['commits']
-                )
-            elif check_id == "git merge":
-                results[check_desc.strip()] = any(
-                    "merge" in cmd for cmd in self.git.command_history
-                )
-            elif check_id == "解决README冲突":
-                results[check_desc.strip()] = self.git.state['conflict'] is None
-            else:
-                results[check_desc.strip()] = False
-        
+        evaluate = self.checks.reevaluate if full else self.checks.results
+        recorder = metrics.active
+        if recorder is None:
+            return evaluate()
+        start = time.perf_counter()
+        results = evaluate()
+        recorder.verify.observe(time.perf_counter() - start)
         return results
     
     def execute(self, command: str) -> str:
-        output = self.git.run_command(command)
-        self.history.append((command, output))
+        recorder = metrics.active
+        start = time.perf_counter() if recorder else 0.0
+        parts = command.split()
+        if self.fixture is None:
+            self.fixture = self._checkpoint()
+        if parts[:1] == ['gitlings']:
+            output = self._cmd_gitlings(parts[1:])
+        elif self.fixture is None:
+            output = self.git.run_command(command)
+        else:
+            before = self._checkpoint(command)
+            output = self.git.run_command(command)
+            if not self._checkpoint().same_state(before):
+                self.undo_stack.push(before)
+        # 只保留命令文本, 输出可以由命令重放得到
+        self.history.append(command)
+        if recorder:
+            recorder.execute.observe(time.perf_counter() - start)
+            self._record_state_size(recorder)
         return output
+
+    def stream_command(self, command: str) -> Union[str, Iterator[str]]:
+        """供终端分页使用的 execute
+
+        git log/diff 不改变状态, 输出由 git.stream_command 惰性产生;
+        真实仓库没有检查点, 所有命令都逐行输出。其余命令与 execute 相同。
+        """
+        parts = command.split()
+        lazy = parts[:1] == ['git'] and (isinstance(self.git, RealGit) or parts[1:2] in (['log'], ['diff']))
+        if not lazy:
+            return self.execute(command)
+        self.history.append(command)
+        return self.git.stream_command(command)
+
+    # ---- 撤销与重做 ----
+    def _checkpoint(self, command: str = "") -> Optional[Checkpoint]:
+        """真实仓库不支持检查点, 返回 None"""
+        if isinstance(self.git, RealGit):
+            return None
+        return Checkpoint(command, self.git.checkpoint(), self.checks.snapshot())
+
+    def _restore(self, checkpoint: Checkpoint) -> None:
+        self.git.restore(checkpoint.repo)
+        self.checks.restore(checkpoint.checks)
+
+    def undo(self) -> Optional[str]:
+        """撤销上一条改变了状态的命令, 返回该命令; 没有可撤销的命令时返回 None"""
+        target = self.undo_stack.undo(self._checkpoint())
+        if target is None:
+            return None
+        self._restore(target)
+        return target.command
+
+    def redo(self) -> Optional[str]:
+        target = self.undo_stack.redo(self._checkpoint())
+        if target is None:
+            return None
+        self._restore(target)
+        return target.command
+
+    def reset_exercise(self) -> bool:
+        """回到当前练习的初始状态, 重置本身也可以撤销; 已经在初始状态时返回 False"""
+        current = self._checkpoint("gitlings reset")
+        if current.same_state(self.fixture):
+            return False
+        self.undo_stack.push(current)
+        self._restore(self.fixture)
+        return True
+
+    def _cmd_gitlings(self, args: List[str]) -> str:
+        if self.fixture is None:
+            return "gitlings: undo/redo/reset are only available in the simulator"
+        if args == ['undo']:
+            command = self.undo()
+            return f"Undid '{command}'" if command is not None else "Nothing to undo."
+        if args == ['redo']:
+            command = self.redo()
+            return f"Redid '{command}'" if command is not None else "Nothing to redo."
+        if args == ['reset']:
+            if not self.reset_exercise():
+                return "Already at the start of the exercise."
+            return "Exercise reset to its starting state (use 'gitlings undo' to go back)."
+        return "usage: gitlings (undo | redo | reset)"
+
+    def _record_state_size(self, recorder: "metrics.Metrics") -> None:
+        state = self.git.state
+        head = state['branches'].get(state['current_branch']) if state['current_branch'] else None
+        sizes = {
+            # HEAD 的代数即历史深度, 提交图已缓存, 不需要遍历
+            'commits': self.git.graph.generation(head) if head else 0,
+            'branches': len(state['branches']),
+        }
+        if hasattr(state['working_dir'], '__len__'):
+            # 真实仓库的工作区需要遍历磁盘才能计数, 不记录
+            sizes['files'] = len(state['working_dir'])
+        recorder.state_size(**sizes)
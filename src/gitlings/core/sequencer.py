@@ -0,0 +1,81 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+
+from .diff import DiffEngine
+from .objects import ObjectStore
+
+# rebase -i 的 todo 命令及其缩写
+ACTIONS = {
+    'p': 'pick', 'pick': 'pick',
+    'r': 'reword', 'reword': 'reword',
+    's': 'squash', 'squash': 'squash',
+    'f': 'fixup', 'fixup': 'fixup',
+    'd': 'drop', 'drop': 'drop',
+    'b': 'break', 'break': 'break',
+}
+
+TODO_HELP = """
+# Commands:
+# p, pick <commit> = use commit
+# r, reword <commit> <message> = use commit, with <message> as the new commit message
+# s, squash <commit> = use commit, but meld into previous commit
+# f, fixup <commit> = like "squash", but discard this commit's log message
+# d, drop <commit> = remove commit
+# b, break = stop here (continue rebase later with 'git rebase --continue')
+#
+# Edit the list with: git rebase --edit-todo "pick <commit>; squash <commit>; ..."
+# then run: git rebase --continue"""
+
+
+@dataclass
+class Step:
+    """重放序列中的一步"""
+    action: str
+    commit: Optional[str] = None
+    message: Optional[str] = None  # reword 的新提交信息
+
+
+def parse_todo(text: str, resolve: Callable[[str], Optional[str]]) -> Union[List[Step], str]:
+    """解析 todo 列表(按行或分号分隔), 出错时返回错误信息"""
+    steps: List[Step] = []
+    for number, line in enumerate(re.split(r'[;\n]', text), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        word, _, rest = line.partition(' ')
+        action = ACTIONS.get(word)
+        if action is None:
+            return f"error: invalid command '{word}'\nerror: invalid line {number}: {line}"
+        if action == 'break':
+            steps.append(Step(action))
+            continue
+        rev, _, message = rest.strip().partition(' ')
+        sha = resolve(rev) if rev else None
+        if sha is None:
+            return f"error: could not parse '{rev}'\nerror: invalid line {number}: {line}"
+        if action in ('squash', 'fixup') and not any(s.action != 'drop' and s.commit for s in steps):
+            return f"error: cannot '{action}' without a previous commit"
+        steps.append(Step(action, sha, message.strip() if action == 'reword' and message.strip() else None))
+    return steps
+
+
+def patch_id(objects: ObjectStore, engine: DiffEngine,
+             parent_tree: Optional[str], tree: Optional[str]) -> str:
+    """与行号和空白无关的补丁指纹, 内容相同的改动(例如被 cherry-pick 过的提交)得到相同的值"""
+    digest = hashlib.sha1()
+    for path, old, new in objects.diff_trees(parent_tree, tree):
+        digest.update(path.encode() + b"\0")
+        old_text = objects.read_blob(old) if old else None
+        new_text = objects.read_blob(new) if new else None
+        old_lines, _ = engine.lines(old, old_text)
+        new_lines, _ = engine.lines(new, new_text)
+        for tag, i1, i2, j1, j2 in engine.opcodes(old, old_text, new, new_text):
+            if tag == 'equal':
+                continue
+            for line in old_lines[i1:i2]:
+                digest.update(b"-" + "".join(line.split()).encode())
+            for line in new_lines[j1:j2]:
+                digest.update(b"+" + "".join(line.split()).encode())
+    return digest.hexdigest()
@@ -0,0 +1,83 @@
+import random
+from typing import Dict, List, Optional
+
+from .index import WorkingDir
+from .refs import RefMap
+from .virtual_git import VirtualGit
+
+# 生成的提交从这个时间开始, 每个提交间隔一分钟; 同样的参数总是得到同样的哈希
+START_TIME = 1_700_000_000
+AUTHOR = "Synthetic <synthetic@example.com>"
+
+
+def synthetic_paths(files: int, depth: int = 2, fanout: int = 10, seed: int = 0) -> List[str]:
+    """files 个文件路径, 分布在最多 depth 层、每层 fanout 个子目录中"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        parts = [f"dir{rng.randrange(fanout)}" for _ in range(rng.randint(0, depth))]
+        paths.append("/".join(parts + [f"file{i}.txt"]))
+    return paths
+
+
+def _content(path: str, revision: int, lines: int) -> str:
+    return "".join(f"{path} line {n} rev {revision}\n" for n in range(lines))
+
+
+def generate_repo(files: int = 100, depth: int = 2, commits: int = 10, branches: int = 0,
+                  tags: int = 0, branch_commits: int = 2, changes_per_commit: int = 3,
+                  lines: int = 10, seed: int = 0) -> VirtualGit:
+    """直接在对象库中构建一个大仓库, 不经过命令解析
+
+    - main 上有 commits 个提交, 第一个提交添加全部文件, 之后每个提交修改几个文件
+    - branches 个分支从 main 的随机提交分出, 各有 branch_commits 个提交
+    - tags 个标签指向 main 上的随机提交
+    工作区和暂存区与 main 的最新提交一致。
+    """
+    rng = random.Random(seed)
+    git = VirtualGit()
+    state = git.state
+    objects = state['objects']
+    state['repo_initialized'] = True
+
+    paths = synthetic_paths(files, depth, seed=seed)
+    contents: Dict[str, str] = {path: _content(path, 0, lines) for path in paths}
+    clock = iter(range(START_TIME, START_TIME + 60 * (commits + branches * branch_commits + 1), 60))
+
+    def commit(parent: Optional[str], changes: Dict[str, str], message: str) -> str:
+        blobs = {path: objects.write_blob(text) for path, text in changes.items()}
+        base = objects.get(parent).tree if parent else None
+        tree = objects.update_tree(base, blobs)
+        sha = objects.write_commit(tree, (parent,) if parent else (), message, AUTHOR, next(clock))
+        git.graph.add(sha)
+        return sha
+
+    def edit(revision: int) -> Dict[str, str]:
+        changed = rng.sample(paths, min(changes_per_commit, len(paths)))
+        return {path: _content(path, revision, lines) for path in changed}
+
+    history: List[str] = []
+    head = None
+    for n in range(commits):
+        changes = dict(contents) if n == 0 else edit(n)
+        contents.update(changes)
+        head = commit(head, changes, "Initial commit" if n == 0 else f"Update {len(changes)} files ({n})")
+        history.append(head)
+
+    state['branches'] = RefMap({'main': head})
+    for b in range(branches if history else 0):
+        tip = rng.choice(history)
+        for n in range(branch_commits):
+            tip = commit(tip, edit(commits + b * branch_commits + n),
+                         f"Work on feature {b} ({n + 1})")
+        state['branches'][f"feature{b}"] = tip
+    for t in range(tags if history else 0):
+        state['tags'][f"v0.{t}"] = rng.choice(history)
+
+    working_dir = WorkingDir(contents if history else {})
+    working_dir.dirty.clear()
+    state['working_dir'] = working_dir
+    index = state['index']
+    for path, text in working_dir.items():
+        index.set(path, objects.write_blob(text), text)
+    return git
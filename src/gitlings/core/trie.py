@@ -0,0 +1,103 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+from .pathspec import IgnoreRules
+
+
+class _Node:
+    __slots__ = ('children', 'is_file', 'is_dirty', 'files', 'dirty')
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.is_file = False
+        self.is_dirty = False
+        self.files = 0  # 子树中的文件数(含自身)
+        self.dirty = 0  # 子树中被改动过的路径数(含自身, 包括已删除的文件)
+
+
+class PathTrie:
+    """按目录层级组织的路径树, 每个目录节点记录子树的文件数和改动数
+
+    改动数为 0 的子树可以整个跳过, 所以按目录进行的 add/status/diff
+    只访问目标子树中真正改动过的路径。
+    """
+
+    def __init__(self):
+        self.root = _Node()
+
+    def _adjust(self, path: str, files: int, dirty: int) -> Optional[_Node]:
+        """沿路径修改计数; 子树变空时直接删除并返回 None, 否则返回 path 对应的节点"""
+        node = self.root
+        node.files += files
+        node.dirty += dirty
+        for part in path.split('/'):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+            child.files += files
+            child.dirty += dirty
+            if not child.files and not child.dirty:
+                del node.children[part]
+                return None
+            node = child
+        return node
+
+    # 调用方保证状态确实发生了变化(文件确实新增/删除, 路径确实加入/移出改动集合)
+    def set_file(self, path: str, present: bool) -> None:
+        node = self._adjust(path, 1 if present else -1, 0)
+        if node is not None:
+            node.is_file = present
+
+    def set_dirty(self, path: str, dirty: bool) -> None:
+        node = self._adjust(path, 0, 1 if dirty else -1)
+        if node is not None:
+            node.is_dirty = dirty
+
+    def find(self, path: str) -> Optional[_Node]:
+        node = self.root
+        for part in path.split('/') if path else ():
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def is_dir(self, path: str) -> bool:
+        node = self.find(path)
+        return node is not None and bool(node.children)
+
+    def count(self, path: str = '') -> int:
+        """目录下的文件数"""
+        node = self.find(path)
+        return node.files if node else 0
+
+    def dirty_count(self, path: str = '') -> int:
+        node = self.find(path)
+        return node.dirty if node else 0
+
+    def walk(self, root: str = '', dirty_only: bool = False,
+             rules: Optional[IgnoreRules] = None) -> Iterator[Tuple[str, bool]]:
+        """遍历 root 子树中的文件(dirty_only 时为改动过的路径), 产出 (路径, 是否位于被忽略的目录中)
+
+        每个目录只与忽略规则匹配一次, 没有改动的子树不会进入。
+        """
+        node = self.find(root)
+        if node is None:
+            return
+        ignores_dir = rules.ignores_dir if rules else None
+        ignored = False
+        if ignores_dir:
+            parts = root.split('/') if root else []
+            ignored = any(ignores_dir('/'.join(parts[:i])) for i in range(1, len(parts)))
+        stack = [(node, root, ignored)]
+        while stack:
+            node, path, ignored = stack.pop()
+            if node.is_dirty or (not dirty_only and node.is_file):
+                yield path, ignored
+            prefix = path + '/' if path else ''
+            for name, child in node.children.items():
+                if not (child.dirty or (not dirty_only and child.files)):
+                    continue
+                child_path = prefix + name
+                if ignored or not (ignores_dir and child.children):
+                    stack.append((child, child_path, ignored))
+                else:
+                    stack.append((child, child_path, ignores_dir(child_path)))
@@ -1,46 +1,143 @@
-from typing import Dict, List, Optional
-import random
+from typing import Dict, Iterator, List, Optional, Tuple
+import copy
+import heapq
+import itertools
+from collections import deque
+import re
+import shlex
 import textwrap
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+from . import metrics
+from .checkpoint import RepoState
+from .diff import ALGORITHMS, DiffEngine
+from .graph import CommitGraph
+from .index import Index, WorkingDir
+from .merge import merge_lines
+from .sequencer import TODO_HELP, Step, parse_todo, patch_id
+from .objects import Blob, Commit, ObjectStore, hash_object
+from .pathspec import Pathspec, compile_pathspec
+from .refs import RefMap
+from .remote import normalize_url, transfer
+
+AUTHOR = "User <user@example.com>"
+
+# 版本表达式: 名称后跟任意个 ~n / ^n, 例如 HEAD~2、main^、abc1234^2~1
+_REV = re.compile(r'([^~^]*)((?:[~^]\d*)*)')
+_REV_STEP = re.compile(r'([~^])(\d*)')
+_HEX = re.compile(r'[0-9a-f]{4,40}')
+_STASH_REF = re.compile(r'stash@\{(\d+)\}')
+
+
+class AmbiguousRevision(LookupError):
+    """缩写哈希对应多个提交"""
+
+    def __init__(self, prefix: str, candidates: List[str]):
+        super().__init__(prefix)
+        self.prefix = prefix
+        self.candidates = candidates
+
 
 class VirtualGit:
-    def __init__(self):
+    def __init__(self, network: Optional[Dict[str, "VirtualGit"]] = None):
         self._state = {
             'repo_initialized': False,
-            'branches': ['main'],
+            'branches': RefMap({'main': None}),  # 分支名 -> 提交哈希, 尚无提交时为None
             'current_branch': 'main',
-            'staged_files': [],
-            'working_dir': {},
-            'commits': [],
-            'remotes': {},
-            'tags': {},
-            'stashes': [],
-            'conflict': False
+            'index': Index(),
+            'working_dir': WorkingDir(),
+            'objects': ObjectStore(),
+            'remotes': {},  # 远程名 -> {'url'}
+            'remote_branches': RefMap(),  # 远程跟踪分支 "origin/main" -> 提交哈希
+            'upstream': {},  # 本地分支 -> 上游的远程跟踪分支
+            'tags': RefMap(),  # 标签名 -> 提交哈希
+            'stashes': [],  # 贮藏提交的哈希, 最新的在最后
+            'conflict': False,  # 是否有未解决的冲突路径
+            'merge': None,  # 进行中的合并: {'head', 'orig_head', 'message', 'paths'}
+            'sequence': None,  # 进行中的 rebase/cherry-pick/revert, 见 _start_sequence
+            'config': {},  # git config 设置的键值, 不区分 --global 和 --local
         }
         self._commit_hash_length = 7
+        self._graph = CommitGraph(self._state['objects'])
+        self._diff = DiffEngine()
+        self._patch_ids: Dict[str, str] = {}
+        self._listeners = []
+        self._frozen_cache: Dict[str, object] = {}
+        # 模拟的远程仓库: URL -> 进程内的裸仓库, clone 出来的仓库与远程共用同一个字典
+        self.network: Dict[str, VirtualGit] = network if network is not None else {}
+        # 作为远程仓库创建时的初始状态, 撤销时远程仓库可能需要回到这里
+        self._pristine: Optional[RepoState] = None
+        # 不为 None 时新提交使用该时间戳, 重放日志时保证得到相同的哈希
+        self.frozen_time: Optional[int] = None
         self._init_sample_data()
 
+    def __setstate__(self, state: dict) -> None:
+        # 旧版本的会话快照中分支和标签是普通字典
+        for key in ('branches', 'tags'):
+            if not isinstance(state['_state'][key], RefMap):
+                state['_state'][key] = RefMap(state['_state'][key])
+        state.setdefault('_frozen_cache', {})
+        state.setdefault('network', {})
+        state.setdefault('_pristine', None)
+        state['_state'].setdefault('remote_branches', RefMap())
+        state['_state'].setdefault('upstream', {})
+        state['_state'].setdefault('config', {})
+        # 旧版本的贮藏是保存全部文件的字典, 无法转换为贮藏提交
+        state['_state']['stashes'] = [s for s in state['_state']['stashes'] if isinstance(s, str)]
+        self.__dict__.update(state)
+
+    @property
+    def state(self) -> Dict:
+        return self._state
+
+    @property
+    def graph(self) -> CommitGraph:
+        return self._graph
+
+    def subscribe(self, listener) -> None:
+        """注册状态变化监听器, listener(event, data)
+
+        事件: init, command(name, args), head(old, new), conflict(value)
+        """
+        self._listeners.append(listener)
+
+    def _emit(self, event: str, **data) -> None:
+        for listener in self._listeners:
+            listener(event, data)
+
     def _init_sample_data(self):
         """初始化一些示例数据使输出更真实"""
         if not self._state['repo_initialized']:
             return
             
         # 添加示例远程仓库
-        self._state['remotes']['origin'] = {
-            'url': 'https://github.com/example/repo.git',
-            'branches': ['main', 'develop']
-        }
+        self._state['remotes']['origin'] = {'url': 'https://github.com/example/repo.git'}
         
         # 添加一些示例文件
-        self._state['working_dir'] = {
+        self._state['working_dir'] = WorkingDir({
             'README.md': 'Sample content',
             'src/main.py': 'print("Hello")',
             '.gitignore': '*.log\n__pycache__/'
-        }
+        })
+
+    def _split_command(self, command: str) -> List[str]:
+        try:
+            return shlex.split(command)
+        except ValueError:
+            return command.strip().split()
+
+    def stream_command(self, command: str) -> Iterator[str]:
+        """与 run_command 相同, 但 git log/diff 的输出惰性产生, 供终端分页显示"""
+        cmd_parts = self._split_command(command)
+        streams = {'log': self.iter_log, 'diff': self.iter_diff}
+        if cmd_parts[:1] == ['git'] and len(cmd_parts) > 1 and cmd_parts[1] in streams:
+            self._emit('command', name=cmd_parts[1], args=cmd_parts[2:])
+            return streams[cmd_parts[1]](cmd_parts[2:])
+        return iter([self.run_command(command)])
 
     def run_command(self, command: str) -> str:
         """执行模拟的git命令"""
-        cmd_parts = command.strip().split()
+        cmd_parts = self._split_command(command)
         if not cmd_parts:
             return ""
             
@@ -64,6 +161,7 @@ class VirtualGit:
             'branch': self._cmd_branch,
             'checkout': self._cmd_checkout,
             'merge': self._cmd_merge,
+            'merge-base': self._cmd_merge_base,
             # 远程操作
             'remote': self._cmd_remote,
             'push': self._cmd_push,
@@ -74,6 +172,7 @@ class VirtualGit:
             'commit': self._cmd_commit,
             'log': self._cmd_log,
             'status': self._cmd_status,
+            'diff': self._cmd_diff,
             # 撤销与回退
             'reset': self._cmd_reset,
             'revert': self._cmd_revert,
@@ -83,11 +182,23 @@ class VirtualGit:
             'rebase': self._cmd_rebase,
             'stash': self._cmd_stash,
             'cherry-pick': self._cmd_cherry_pick,
+            # 配置
+            'config': self._cmd_config,
         }
         
         handler = cmd_handlers.get(sub_cmd)
         if handler:
-            return handler(args)
+            recorder = metrics.active
+            start = time.perf_counter() if recorder else 0.0
+            try:
+                output = handler(args)
+            except AmbiguousRevision as exc:
+                output = self._ambiguous_error(exc)
+            else:
+                self._emit('command', name=sub_cmd, args=args)
+            if recorder:
+                recorder.command(sub_cmd, time.perf_counter() - start)
+            return output
         else:
             return f"git: '{sub_cmd}' is not a simulated command."
 
@@ -97,45 +208,102 @@ class VirtualGit:
             return "Reinitialized existing Git repository in .git/"
         self._state['repo_initialized'] = True
         self._init_sample_data()
+        self._emit('init')
         return "Initialized empty Git repository in .git/"
 
     def _cmd_clone(self, args) -> str:
-        if not args:
+        names = [a for a in args if not a.startswith('-')]
+        if not names:
             return "fatal: You must specify a repository to clone."
-        url = args[0]
-        repo_name = url.split('/')[-1].replace('.git', '')
-        return f"Cloning into '{repo_name}'...\nremote: Enumerating objects: 100, done.\nReceiving objects: 100% (100/100), 1.23 MiB | 2.56 MiB/s, done."
+        url = names[0]
+        repo_name = names[1] if len(names) > 1 else normalize_url(url).split('/')[-1].removesuffix('.git')
+        # 模拟器只有一个工作区: 在尚未初始化的仓库中 clone 即成为该远程仓库的克隆
+        if self._state['repo_initialized']:
+            return f"fatal: destination path '{repo_name}' already exists and is not an empty directory."
+        self._state['repo_initialized'] = True
+        self._emit('init')
+        self._state['remotes']['origin'] = {'url': url}
+        count, _ = self._fetch('origin')
+        output = [f"Cloning into '{repo_name}'..."]
+        remote = self._remote_repo(url).state
+        branch = remote['current_branch']
+        if not remote['branches'].get(branch):
+            branch = min((b for b, sha in remote['branches'].items() if sha), default=None)
+        if branch is None:
+            output.append("warning: You appear to have cloned an empty repository.")
+            return "\n".join(output)
+        output.extend(self._transfer_progress(count, 'Receiving'))
+        branches = self._state['branches']
+        if branches.get(self._state['current_branch'], '') is None:
+            del branches[self._state['current_branch']]
+        self._state['current_branch'] = branch
+        self._state['upstream'][branch] = f"origin/{branch}"
+        sha = remote['branches'][branch]
+        self._checkout_commit(None, sha)
+        self._update_head(sha)
+        return "\n".join(output)
 
     # ---- 分支操作命令 ----
     def _cmd_branch(self, args) -> str:
-        if not args:
+        if not args or args[0] in ('-a', '--all'):
             # 列出所有分支
             branches = []
-            for branch in self._state['branches']:
+            # 与 git 相同按名称排序; 撤销后分支在字典中的顺序可能改变
+            for branch in sorted(self._state['branches']):
                 prefix = '*' if branch == self._state['current_branch'] else ' '
                 branches.append(f"{prefix} {branch}")
+            if args:
+                branches.extend(f"  remotes/{ref}" for ref in sorted(self._state['remote_branches']))
             return "\n".join(branches)
+
+        if args[0] in ('-r', '--remotes'):
+            return "\n".join(f"  {ref}" for ref in sorted(self._state['remote_branches']))
+        if args[0] == '--unset-upstream':
+            branch = args[1] if len(args) > 1 else self._state['current_branch']
+            if self._state['upstream'].pop(branch, None) is None:
+                return f"fatal: branch '{branch}' has no upstream information"
+            return ""
+        if args[0] in ('-u', '--set-upstream-to') or args[0].startswith('--set-upstream-to='):
+            upstream = args[0].partition('=')[2] or (args[1] if len(args) > 1 else '')
+            rest = args[1:] if '=' in args[0] else args[2:]
+            branch = rest[0] if rest else self._state['current_branch']
+            if upstream not in self._state['remote_branches']:
+                return f"fatal: the requested upstream branch '{upstream}' does not exist"
+            if branch not in self._state['branches']:
+                return f"fatal: branch '{branch}' does not exist"
+            self._state['upstream'][branch] = upstream
+            return f"branch '{branch}' set up to track '{upstream}'."
         
+        if args[0] in ('-d', '-D') and len(args) < 2:
+            return "fatal: branch name required"
+        if args[0] in ('-d', '-D') and args[1] == self._state['current_branch']:
+            # 强制删除也不能删除 HEAD 指向的分支
+            return f"error: Cannot delete branch '{args[1]}' checked out at '...'"
         if args[0] == '-d':
             # 删除分支
             branch = args[1]
-            if branch == self._state['current_branch']:
-                return f"error: Cannot delete branch '{branch}' checked out at '...'"
             if branch not in self._state['branches']:
                 return f"error: branch '{branch}' not found."
-            self._state['branches'].remove(branch)
+            del self._state['branches'][branch]
+            self._state['upstream'].pop(branch, None)
             return f"Deleted branch {branch}."
         elif args[0] == '-D':
             # 强制删除分支
             branch = args[1]
-            self._state['branches'].remove(branch)
+            if branch not in self._state['branches']:
+                return f"error: branch '{branch}' not found."
+            del self._state['branches'][branch]
+            self._state['upstream'].pop(branch, None)
             return f"Deleted branch {branch} (forced)."
         else:
             # 创建新分支
             new_branch = args[0]
             if new_branch in self._state['branches']:
                 return f"fatal: A branch named '{new_branch}' already exists."
-            self._state['branches'].append(new_branch)
+            start = self._resolve(args[1]) if len(args) > 1 else self._head()
+            if len(args) > 1 and start is None:
+                return f"fatal: not a valid object name: '{args[1]}'."
+            self._state['branches'][new_branch] = start
             return f"Created new branch '{new_branch}'."
 
     def _cmd_checkout(self, args) -> str:
@@ -149,49 +317,192 @@ class VirtualGit:
             new_branch = args[1]
             if new_branch in self._state['branches']:
                 return f"fatal: A branch named '{new_branch}' already exists."
-            self._state['branches'].append(new_branch)
+            old = self._head()
+            start = self._resolve(args[2]) if len(args) > 2 else old
+            if len(args) > 2 and start is None:
+                return f"fatal: '{args[2]}' is not a commit and a branch '{new_branch}' cannot be created from it"
+            self._checkout_commit(old, start)
+            self._state['branches'][new_branch] = start
             self._state['current_branch'] = new_branch
+            if old != start:
+                self._emit('head', old=old, new=start)
             return f"Switched to a new branch '{new_branch}'"
         else:
             # 切换分支
             branch = args[0]
+            tracking = [ref for ref in self._state['remote_branches'] if ref.split('/', 1)[1] == branch]
+            if branch not in self._state['branches'] and len(tracking) == 1:
+                # 只有一个远程有同名分支时, 创建跟踪它的本地分支
+                output = self._cmd_checkout(['-b', branch, tracking[0]])
+                self._state['upstream'][branch] = tracking[0]
+                return f"branch '{branch}' set up to track '{tracking[0]}'.\n{output}"
             if branch not in self._state['branches']:
                 return f"error: pathspec '{branch}' did not match any file(s) known to git."
+            old, new = self._head(), self._state['branches'][branch]
+            self._checkout_commit(old, new)
             self._state['current_branch'] = branch
+            if old != new:
+                self._emit('head', old=old, new=new)
             return f"Switched to branch '{branch}'"
 
     def _cmd_merge(self, args) -> str:
-        if not args:
-            return "fatal: branch name required for merge"
-            
-        branch = args[0]
-        if branch not in self._state['branches']:
-            return f"fatal: branch '{branch}' not found."
-            
-        if self._state['conflict']:
-            return "error: Merging is not possible because you have unmerged files."
-            
         if '--abort' in args:
-            return "Merge aborted."
-            
-        if '--no-ff' in args:
-            # 模拟非快进合并
-            commit_hash = self._generate_commit_hash()
-            merge_msg = f"Merge branch '{branch}' into {self._state['current_branch']}"
-            self._state['commits'].append({
-                'hash': commit_hash,
-                'message': merge_msg,
-                'branch': self._state['current_branch'],
-                'is_merge': True
-            })
-            return f"Merge made by the 'ort' strategy.\n 1 file changed, 1 insertion(+)"
-        else:
-            # 模拟快进合并
-            return f"Updating abc123..def456\nFast-forward"
+            return self._abort_merge()
+        if '--continue' in args:
+            return self._cmd_commit([])
+        if self._state['conflict']:
+            return ("error: Merging is not possible because you have unmerged files.\n"
+                    "hint: Fix them up in the work tree, and then use 'git add/rm <file>'\n"
+                    "hint: as appropriate to mark resolution and make a commit.\n"
+                    "fatal: Exiting because of an unresolved conflict.")
+        if self._state['merge']:
+            return ("fatal: You have not concluded your merge (MERGE_HEAD exists).\n"
+                    "Please, commit your changes before you merge.")
+        if self._state['sequence']:
+            return f"fatal: a {self._state['sequence']['op']} is in progress"
+
+        names = [a for a in args if not a.startswith('-')]
+        if not names:
+            return "fatal: branch name required for merge"
+
+        branch = names[0]
+        theirs = self._resolve(branch)
+        if theirs is None:
+            return f"merge: {branch} - not something we can merge"
+
+        head = self._head()
+        objects = self._state['objects']
+        if head is not None and self._graph.is_ancestor(theirs, head):
+            return "Already up to date."
+        head_tree, their_tree = self._commit_tree(head), self._commit_tree(theirs)
+        blocked = self._overwritten_by(objects.diff_trees(head_tree, their_tree))
+        if blocked:
+            return blocked
+        if head is None or self._graph.is_ancestor(head, theirs) and '--no-ff' not in args:
+            # 快进合并: 只移动分支指针
+            changes = self._apply_changes(head_tree, their_tree)
+            self._update_head(theirs)
+            start = self._short(head) if head else '0' * self._commit_hash_length
+            return f"Updating {start}..{self._short(theirs)}\nFast-forward\n {len(changes)} files changed"
+
+        base = self._graph.merge_base(head, theirs)
+        changes, conflicts = self._merge_trees(self._commit_tree(base), head_tree, their_tree, branch)
+        kind = "remote-tracking branch" if branch in self._state['remote_branches'] else "branch"
+        merge_msg = f"Merge {kind} '{branch}' into {self._state['current_branch']}"
+        if conflicts:
+            self._keep_staged(changes, head_tree)
+            self._state['merge'] = {'head': theirs, 'orig_head': head, 'message': merge_msg,
+                                    'paths': sorted(changes.keys() | self._state['index'].unmerged.keys())}
+            self._set_conflict(True)
+            return "\n".join(conflicts + ["Automatic merge failed; fix conflicts and then commit the result."])
+
+        tree = objects.update_tree(head_tree, changes)
+        self._update_head(self._write_commit(tree, (head, theirs), merge_msg))
+        return f"Merge made by the 'ort' strategy.\n {len(changes)} files changed"
+
+    def _merge_trees(self, base_tree: Optional[str], our_tree: Optional[str],
+                     their_tree: Optional[str], their_label: str) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        """三方合并到工作区和暂存区, 返回 (可以直接提交的变更, 冲突信息)
+
+        只遍历 base -> theirs 中改动过的路径(哈希相同的子树直接跳过), 在 ours 中逐个查找,
+        代价与对方的改动量成正比; 只有两侧都改动过的文件才逐行合并,
+        冲突的文件写入冲突标记并记录为未合并。
+        """
+        objects = self._state['objects']
+        index = self._state['index']
+        working_dir = self._state['working_dir']
+        changes: Dict[str, Optional[str]] = {}
+        conflicts: List[str] = []
+
+        def side(blob):
+            return (blob, objects.read_blob(blob)) if blob else None
+
+        for path, base_blob, their_blob in objects.diff_trees(base_tree, their_tree):
+            our_blob = objects.lookup_path(our_tree, path)
+            if our_blob == base_blob:
+                changes[path] = their_blob
+                continue
+            if our_blob == their_blob:
+                continue
+            if our_blob is None or their_blob is None:
+                # 一侧修改一侧删除: 工作区保留被修改的版本
+                if their_blob is not None:
+                    working_dir[path] = objects.read_blob(their_blob)
+                deleted_by, modified_by = ('HEAD', their_label) if our_blob is None else (their_label, 'HEAD')
+                conflicts.append(f"CONFLICT (modify/delete): {path} deleted in {deleted_by} and modified in "
+                                 f"{modified_by}.  Version {modified_by} of {path} left in tree.")
+            else:
+                merged, count = merge_lines(self._diff, side(base_blob), side(our_blob), side(their_blob),
+                                            'HEAD', their_label)
+                if not count:
+                    changes[path] = objects.write_blob(merged)
+                    continue
+                working_dir[path] = merged
+                kind = 'content' if base_blob else 'add/add'
+                conflicts.append(f"Auto-merging {path}\nCONFLICT ({kind}): Merge conflict in {path}")
+            index.unmerged[path] = (base_blob, our_blob, their_blob)
+
+        for path, blob in changes.items():
+            self._write_file(path, blob)
+        return changes, conflicts
+
+    def _keep_staged(self, changes: Dict[str, Optional[str]], head_tree: Optional[str]) -> None:
+        """出现冲突时, 已经干净合并的路径保持暂存, 解决冲突后随提交一起写入"""
+        index = self._state['index']
+        objects = self._state['objects']
+        for path in changes:
+            index.mark(path, objects.lookup_path(head_tree, path))
+
+    def _overwritten_by(self, incoming, action: str = 'merge') -> Optional[str]:
+        """合并会覆盖未提交的改动时返回错误信息"""
+        index = self._state['index']
+        working_dir = self._state['working_dir']
+        local = index.staged | set(working_dir.dirty)
+        blocked = sorted(path for path, _, _ in incoming
+                         if path in local and (path in index.staged or not index.is_clean(path, working_dir)))
+        if not blocked:
+            return None
+        return "\n".join([f"error: Your local changes to the following files would be overwritten by {action}:"]
+                         + [f"\t{path}" for path in blocked]
+                         + [f"Please commit your changes or stash them before you {action}.", "Aborting"])
+
+    def _abort_merge(self) -> str:
+        merge = self._state['merge']
+        if merge is None:
+            return "fatal: There is no merge to abort (MERGE_HEAD missing)."
+        # 只恢复合并触及的路径, 其他本地改动保持不变
+        head_tree = self._commit_tree(self._head())
+        objects = self._state['objects']
+        for path in merge['paths']:
+            self._write_file(path, objects.lookup_path(head_tree, path))
+        self._state['merge'] = None
+        self._set_conflict(False)
+        return ""
+
+    def _set_conflict(self, value: bool) -> None:
+        if self._state['conflict'] != value:
+            self._state['conflict'] = value
+            self._emit('conflict', value=value)
+
+    def _cmd_merge_base(self, args) -> str:
+        revs = [a for a in args if not a.startswith('-')]
+        if len(revs) != 2:
+            return "usage: git merge-base [--is-ancestor] <commit> <commit>"
+        shas = []
+        for rev in revs:
+            sha = self._resolve(rev)
+            if sha is None:
+                return f"fatal: Not a valid object name {rev}"
+            shas.append(sha)
+        if '--is-ancestor' in args:
+            if self._graph.is_ancestor(*shas):
+                return ""
+            return f"{revs[0]} is not an ancestor of {revs[1]}"
+        return "\n".join(self._graph.merge_bases(*shas))
 
     # ---- 远程操作命令 ----
     def _cmd_remote(self, args) -> str:
-        if not args:
+        if not args or args[0] == '-v':
             remotes = []
             for name, data in self._state['remotes'].items():
                 remotes.append(f"{name}\t{data['url']} (fetch)")
@@ -203,155 +514,826 @@ class VirtualGit:
                 return "usage: git remote add <name> <url>"
             name = args[1]
             url = args[2]
-            self._state['remotes'][name] = {'url': url, 'branches': []}
+            if name in self._state['remotes']:
+                return f"error: remote {name} already exists."
+            self._state['remotes'][name] = {'url': url}
+            return ""
+        elif args[0] in ('remove', 'rm'):
+            if len(args) < 2:
+                return "usage: git remote remove <name>"
+            name = args[1]
+            if self._state['remotes'].pop(name, None) is None:
+                return f"error: No such remote: '{name}'"
+            prefix = f"{name}/"
+            for ref in [ref for ref in self._state['remote_branches'] if ref.startswith(prefix)]:
+                del self._state['remote_branches'][ref]
+            upstream = self._state['upstream']
+            for branch in [b for b, ref in upstream.items() if ref.startswith(prefix)]:
+                del upstream[branch]
             return ""
-        elif args[0] == '-v':
-            remotes = []
-            for name, data in self._state['remotes'].items():
-                remotes.append(f"{name}\t{data['url']} (fetch)")
-                remotes.append(f"{name}\t{data['url']} (push)")
-            return "\n".join(remotes)
         else:
             return f"git remote: '{args[0]}' is not a valid subcommand."
 
     def _cmd_push(self, args) -> str:
+        force = set_upstream = push_tags = False
+        positional = []
+        for arg in args:
+            if arg in ('-f', '--force'):
+                force = True
+            elif arg in ('-u', '--set-upstream'):
+                set_upstream = True
+            elif arg == '--tags':
+                push_tags = True
+            elif arg.startswith('-'):
+                return f"error: unknown option `{arg.lstrip('-')}'"
+            else:
+                positional.append(arg)
         if not self._state['remotes']:
             return "fatal: No configured push destination."
-            
-        remote = 'origin'
-        branch = self._state['current_branch']
-        
-        if '-u' in args:
-            idx = args.index('-u')
-            if len(args) > idx + 2:
-                remote = args[idx+1]
-                branch = args[idx+2]
-            return f"Branch '{branch}' set up to track remote branch '{branch}' from '{remote}'."
-        elif '--force' in args or '-f' in args:
-            return f" + {branch} -> {branch} (forced update)"
+
+        current = self._state['current_branch']
+        upstream = self._state['upstream'].get(current)
+        if positional:
+            name = positional[0]
+        elif upstream:
+            name = upstream.split('/', 1)[0]
         else:
-            return f"Counting objects: 3, done.\nWriting objects: 100% (3/3), 256 bytes | 256.00 KiB/s, done.\nTo github.com:example/repo.git\n   abc123..def456  {branch} -> {branch}"
+            return (f"fatal: The current branch {current} has no upstream branch.\n"
+                    "To push the current branch and set the remote as upstream, use\n\n"
+                    f"    git push --set-upstream origin {current}\n")
+        if name not in self._state['remotes']:
+            return self._no_remote(name)
+        refspecs = positional[1:]
+        if push_tags:
+            refspecs.extend(f"refs/tags/{tag}" for tag in sorted(self._state['tags']))
+        elif not refspecs:
+            # 推送当前分支, 有上游时推到上游分支
+            target = upstream.split('/', 1)[1] if upstream and upstream.startswith(f"{name}/") else current
+            refspecs = [f"{current}:{target}"]
+        return self._push(name, refspecs, force, set_upstream)
 
     def _cmd_pull(self, args) -> str:
-        return "remote: Enumerating objects: 5, done.\nremote: Counting objects: 100% (5/5), done.\nMerge made by the 'ort' strategy."
+        options = [a for a in args if a.startswith('-')]
+        positional = [a for a in args if not a.startswith('-')]
+        if not self._state['repo_initialized']:
+            return "fatal: not a git repository (or any of the parent directories)"
+        upstream = self._state['upstream'].get(self._state['current_branch'])
+        if positional:
+            name = positional[0]
+            if name not in self._state['remotes']:
+                return self._no_remote(name)
+            branch = positional[1] if len(positional) > 1 else (
+                upstream.split('/', 1)[1] if upstream and upstream.startswith(f"{name}/") else None)
+        elif upstream:
+            name, branch = upstream.split('/', 1)
+        else:
+            branch = None
+        if branch is None:
+            return ("There is no tracking information for the current branch.\n"
+                    "Please specify which branch you want to merge with.\n\n"
+                    "    git pull <remote> <branch>\n\n"
+                    "If you wish to set tracking information for this branch you can do so with:\n\n"
+                    f"    git branch --set-upstream-to=origin/<branch> {self._state['current_branch']}\n")
+        fetched = self._cmd_fetch([name])
+        ref = f"{name}/{branch}"
+        if ref not in self._state['remote_branches']:
+            return "\n".join(filter(None, [fetched, f"fatal: couldn't find remote ref {branch}"]))
+        if '--ff-only' in options:
+            head = self._head()
+            theirs = self._state['remote_branches'][ref]
+            if head is not None and not self._graph.is_ancestor(head, theirs):
+                return "\n".join(filter(None, [fetched, "fatal: Not possible to fast-forward, aborting."]))
+        if '--rebase' in options or '-r' in options:
+            merged = self._cmd_rebase([ref])
+        else:
+            merged = self._cmd_merge([ref])
+        return "\n".join(filter(None, [fetched, merged]))
 
     def _cmd_fetch(self, args) -> str:
-        return "remote: Enumerating objects: 5, done.\nremote: Counting objects: 100% (5/5), done."
+        prune = '--prune' in args or '-p' in args
+        positional = [a for a in args if not a.startswith('-')]
+        if '--all' in args:
+            names = list(self._state['remotes'])
+        elif positional:
+            names = positional[:1]
+        else:
+            upstream = self._state['upstream'].get(self._state['current_branch'])
+            names = [upstream.split('/', 1)[0]] if upstream else list(self._state['remotes'])[:1]
+        if not names:
+            return ("fatal: No remote repository specified.  Please, specify either a URL or a\n"
+                    "remote name from which new revisions should be fetched.")
+        output = []
+        for name in names:
+            if name not in self._state['remotes']:
+                return self._no_remote(name)
+            count, updates = self._fetch(name, positional[1:] if len(names) == 1 else (), prune)
+            if updates:
+                output.extend(self._transfer_progress(count, 'Unpacking'))
+                output.append(f"From {self._state['remotes'][name]['url']}")
+                output.extend(updates)
+        return "\n".join(output)
+
+    # ---- 远程仓库 ----
+    def _tracking_status(self) -> List[str]:
+        """git status 中当前分支与上游的领先/落后情况"""
+        upstream = self._state['upstream'].get(self._state['current_branch'])
+        if upstream is None:
+            return []
+        theirs = self._state['remote_branches'].get(upstream)
+        if theirs is None:
+            return [f"Your branch is based on '{upstream}', but the upstream is gone.",
+                    '  (use "git branch --unset-upstream" to fixup)']
+        head = self._head()
+        ahead = len(self._graph.range([theirs], [head])) if head else 0
+        behind = len(self._graph.range([head] if head else [], [theirs]))
+
+        def commits(n):
+            return f"{n} commit{'s' if n != 1 else ''}"
+        if ahead and behind:
+            lines = [f"Your branch and '{upstream}' have diverged,",
+                     f"and have {ahead} and {behind} different commits each, respectively.",
+                     '  (use "git pull" to merge the remote branch into yours)']
+        elif ahead:
+            lines = [f"Your branch is ahead of '{upstream}' by {commits(ahead)}.",
+                     '  (use "git push" to publish your local commits)']
+        elif behind:
+            lines = [f"Your branch is behind '{upstream}' by {commits(behind)}, and can be fast-forwarded.",
+                     '  (use "git pull" to update your local branch)']
+        else:
+            lines = [f"Your branch is up to date with '{upstream}'."]
+        return lines
+
+    def _remote_repo(self, url: str) -> "VirtualGit":
+        """URL 对应的进程内裸仓库, 第一次访问时创建为空仓库"""
+        url = normalize_url(url)
+        repo = self.network.get(url)
+        if repo is None:
+            repo = VirtualGit(network=self.network)
+            repo.state['repo_initialized'] = True
+            repo._pristine = repo.checkpoint(network=False)
+            self.network[url] = repo
+        return repo
+
+    def _no_remote(self, name: str) -> str:
+        return (f"fatal: '{name}' does not appear to be a git repository\n"
+                "fatal: Could not read from remote repository.\n\n"
+                "Please make sure you have the correct access rights\n"
+                "and the repository exists.")
+
+    def _transfer_progress(self, count: int, verb: str) -> List[str]:
+        """传输进度; 推送时由本地统计, 获取时由远程统计(remote: 前缀)"""
+        if not count:
+            return []
+        counted = [f"Enumerating objects: {count}, done.",
+                   f"Total {count} (delta 0), reused 0 (delta 0), pack-reused 0"]
+        received = f"{verb} objects: 100% ({count}/{count}), done."
+        if verb == 'Writing':
+            return [counted[0], received, counted[1]]
+        return [f"remote: {line}" for line in counted] + [received]
+
+    def _ref_update(self, old: Optional[str], new: str, src: str, dst: str,
+                    new_label: str = "new branch") -> str:
+        """push/fetch 输出中的一行引用更新"""
+        if old is None:
+            return f" * {'[' + new_label + ']':<17} {src} -> {dst}"
+        if old in self._state['objects'] and self._graph.is_ancestor(old, new):
+            return f"   {self._short(old)}..{self._short(new)}  {src} -> {dst}"
+        return f" + {self._short(old)}...{self._short(new)} {src} -> {dst} (forced update)"
+
+    def _fetch(self, name: str, branches=(), prune: bool = False) -> Tuple[int, List[str]]:
+        """从远程仓库取得缺少的对象并更新远程跟踪分支, 返回 (对象数, 引用更新)"""
+        theirs = self._remote_repo(self._state['remotes'][name]['url']).state
+        objects = self._state['objects']
+        wanted = {branch: sha for branch, sha in theirs['branches'].items()
+                  if sha and (not branches or branch in branches)}
+        _, count = transfer(theirs['objects'], objects, wanted.values())
+        tracking = self._state['remote_branches']
+        updates = []
+        for branch in sorted(wanted):
+            ref, sha = f"{name}/{branch}", wanted[branch]
+            old = tracking.get(ref)
+            if old != sha:
+                updates.append(self._ref_update(old, sha, branch, ref))
+                tracking[ref] = sha
+        if prune:
+            prefix = f"{name}/"
+            for ref in sorted(ref for ref in tracking if ref.startswith(prefix)
+                              and not theirs['branches'].get(ref[len(prefix):])):
+                del tracking[ref]
+                updates.append(f" - [deleted]         (none)     -> {ref}")
+        # 自动跟随指向已取得提交的标签
+        tags = self._state['tags']
+        for tag, sha in sorted(theirs['tags'].items()):
+            if tag not in tags and sha in objects:
+                tags[tag] = sha
+                updates.append(self._ref_update(None, sha, tag, tag, "new tag"))
+        return count, updates
+
+    def _push(self, name: str, refspecs: List[str], force: bool, set_upstream: bool) -> str:
+        url = self._state['remotes'][name]['url']
+        remote = self._remote_repo(url)
+        theirs = remote.state
+        objects = self._state['objects']
+        updates, rejected, accepted, tracked = [], [], [], []
+        for spec in refspecs:
+            forced = force or spec.startswith('+')
+            src, _, dst = spec.lstrip('+').partition(':')
+            is_tag = src.startswith('refs/tags/') or (src in self._state['tags'] and src not in self._state['branches'])
+            src = src.removeprefix('refs/tags/')
+            dst = (dst or (self._state['current_branch'] if src in ('HEAD', '@') else src)).removeprefix('refs/tags/')
+            refs = theirs['tags'] if is_tag else theirs['branches']
+            old = refs.get(dst)
+            if not src:
+                # ":分支" 删除远程分支
+                if old is None:
+                    return f"error: unable to delete '{dst}': remote ref does not exist"
+                accepted.append((refs, dst, None))
+                updates.append(f" - [deleted]         {dst}")
+                continue
+            sha = self._resolve(src)
+            if sha is None:
+                return f"error: src refspec {src} does not match any"
+            if old == sha:
+                if not is_tag:
+                    tracked.append((src, dst, sha))
+                continue
+            if old is not None and not forced:
+                if is_tag:
+                    reason = "already exists"
+                elif old not in objects:
+                    reason = "fetch first"
+                elif not self._graph.is_ancestor(old, sha):
+                    reason = "non-fast-forward"
+                else:
+                    reason = None
+                if reason:
+                    rejected.append(reason)
+                    updates.append(f" ! [rejected]        {src} -> {dst} ({reason})")
+                    continue
+            label = "new tag" if is_tag else "new branch"
+            updates.append(self._ref_update(old, sha, src, dst, label))
+            accepted.append((refs, dst, sha))
+            if not is_tag:
+                tracked.append((src, dst, sha))
+
+        _, count = transfer(objects, theirs['objects'], [sha for _, _, sha in accepted])
+        for refs, dst, sha in accepted:
+            if sha is None:
+                refs.pop(dst, None)
+                self._state['remote_branches'].pop(f"{name}/{dst}", None)
+            else:
+                refs[dst] = sha
+        output = self._transfer_progress(count, 'Writing')
+        for src, dst, sha in tracked:
+            self._state['remote_branches'][f"{name}/{dst}"] = sha
+        if updates:
+            output.append(f"To {url}")
+            output.extend(updates)
+        elif not rejected:
+            output.append("Everything up-to-date")
+        if set_upstream:
+            for src, dst, _ in tracked:
+                if src in self._state['branches']:
+                    self._state['upstream'][src] = f"{name}/{dst}"
+                    output.append(f"branch '{src}' set up to track '{name}/{dst}'.")
+        if rejected:
+            output.append(f"error: failed to push some refs to '{url}'")
+            if "fetch first" in rejected:
+                output.extend(["hint: Updates were rejected because the remote contains work that you do not",
+                               "hint: have locally. This is usually caused by another repository pushing to",
+                               "hint: the same ref. If you want to integrate the remote changes, use",
+                               "hint: 'git pull' before pushing again."])
+            elif "non-fast-forward" in rejected:
+                output.extend(["hint: Updates were rejected because the tip of your current branch is behind",
+                               "hint: its remote counterpart. If you want to integrate the remote changes,",
+                               "hint: use 'git pull' before pushing again."])
+        return "\n".join(output)
 
     # ---- 提交与日志命令 ----
     def _cmd_add(self, args) -> str:
-        if not args:
-            return "Nothing specified, nothing added."
-            
-        if args[0] == '.':
-            # 暂存所有更改
-            for file in self._state['working_dir']:
-                if file not in self._state['staged_files']:
-                    self._state['staged_files'].append(file)
-            return ""
-        else:
-            # 暂存指定文件
-            for file in args:
-                if file in self._state['working_dir'] and file not in self._state['staged_files']:
-                    self._state['staged_files'].append(file)
-            return ""
+        force = add_all = False
+        specs = []
+        for arg in args:
+            if arg in ('-f', '--force'):
+                force = True
+            elif arg in ('-A', '--all'):
+                add_all = True
+            elif arg == '--':
+                continue
+            elif arg.startswith('-') and len(arg) > 1:
+                return f"error: unknown option `{arg.lstrip('-')}'"
+            else:
+                specs.append(arg)
+        if not specs:
+            if not add_all:
+                return "Nothing specified, nothing added."
+            specs = ['.']
+
+        pathspec = compile_pathspec(tuple(specs))
+        working_dir = self._state['working_dir']
+        index = self._state['index']
+        for spec, root, regex in pathspec.specs:
+            if regex.pattern != '.*' and not any(regex.fullmatch(path) for path, _ in working_dir.tree.walk(root)):
+                return f"fatal: pathspec '{spec}' did not match any files"
+
+        # 只需暂存 pathspec 子树中改动过的路径; 未跟踪且被忽略的文件跳过
+        rules = working_dir.ignore_rules()
+        literal = {spec.rstrip('/') for spec, _, _ in pathspec.specs}
+        skipped = []
+        head_tree = self._commit_tree(self._head())
+        for path, in_ignored_dir in list(self._pathspec_paths(pathspec)):
+            if not force and path not in index and (in_ignored_dir or rules.ignores_file(path)):
+                if path in literal:
+                    skipped.append(path)
+                continue
+            self._stage(path, head_tree)
+        self._set_conflict(bool(index.unmerged))
+        if skipped:
+            return ("The following paths are ignored by one of your .gitignore files:\n"
+                    + "\n".join(sorted(skipped))
+                    + "\nhint: Use -f if you really want to add them.")
+        return ""
+
+    def _pathspec_paths(self, pathspec: Pathspec, dirty_only: bool = True) -> Iterator[Tuple[str, bool]]:
+        """pathspec 选中的工作区路径, 产出 (路径, 是否位于被忽略的目录中); 只遍历各个根所在的子树"""
+        working_dir = self._state['working_dir']
+        rules = working_dir.ignore_rules()
+        for root in pathspec.roots:
+            for path, in_ignored_dir in working_dir.tree.walk(root, dirty_only, rules):
+                if pathspec.match(path):
+                    yield path, in_ignored_dir
+
+    def _is_pathspec(self, arg: str) -> bool:
+        """参数能否作为路径: 工作区或暂存区中的文件/目录, 或者通配符与 pathspec 魔法前缀"""
+        if arg.startswith(':') or any(c in arg for c in '*?['):
+            return True
+        path = arg.rstrip('/')
+        while path.startswith('./'):
+            path = path[2:]
+        if path in ('', '.'):
+            return True
+        return self._state['working_dir'].tree.find(path) is not None or path in self._state['index']
 
     def _cmd_commit(self, args) -> str:
-        if not self._state['staged_files']:
+        index = self._state['index']
+        merge = self._state['merge']
+        if index.unmerged:
+            return ("error: Committing is not possible because you have unmerged files.\n"
+                    "hint: Fix them up in the work tree, and then use 'git add/rm <file>'\n"
+                    "hint: as appropriate to mark resolution and make a commit.\n"
+                    "fatal: Exiting because of an unresolved conflict.")
+        if not index.staged and not merge:
             return "nothing to commit, working tree clean"
             
-        message = "Update files"
+        message = merge['message'] if merge else "Update files"
         if '-m' in args:
             idx = args.index('-m')
             if len(args) > idx + 1:
                 message = args[idx+1]
-                
-        commit_hash = self._generate_commit_hash()
-        self._state['commits'].append({
-            'hash': commit_hash,
-            'message': message,
-            'files': self._state['staged_files'].copy(),
-            'branch': self._state['current_branch'],
-            'timestamp': datetime.now()
-        })
-        self._state['staged_files'] = []
+
+        objects = self._state['objects']
+        head = self._head()
+        changes = {file: index.blob(file) for file in index.staged}
+        tree = objects.update_tree(self._commit_tree(head), changes)
+
+        parents = (head, merge['head']) if merge else (head,) if head else ()
+        commit_hash = self._write_commit(tree, parents, message)
+        self._state['merge'] = None
+        self._update_head(commit_hash)
+        index.staged.clear()
         
-        changed = len(self._state['commits'][-1]['files'])
-        return f"[{self._state['current_branch']} {commit_hash}] {message}\n {changed} files changed"
+        return f"[{self._state['current_branch']} {self._short(commit_hash)}] {message}\n {len(changes)} files changed"
 
     def _cmd_log(self, args) -> str:
-        if not self._state['commits']:
-            return "fatal: your current branch 'main' does not have any commits yet"
-            
-        log_entries = []
-        for commit in reversed(self._state['commits']):
-            time_str = commit['timestamp'].strftime("%a %b %d %H:%M:%S %Y")
-            entry = f"commit {commit['hash']}\nAuthor: User <user@example.com>\nDate:   {time_str}\n\n    {commit['message']}"
-            log_entries.append(entry)
-            
-        if '--oneline' in args:
-            return "\n".join([
-                f"{c['hash'][:7]} {c['message']}" 
-                for c in reversed(self._state['commits'])
-            ])
-        return "\n\n".join(log_entries)
+        return "\n".join(self.iter_log(args))
+
+    def iter_log(self, args) -> Iterator[str]:
+        """按需遍历提交图并逐条格式化日志, 跳过的和超出 -n 的提交不会被格式化"""
+        options = self._parse_log_args(args)
+        if isinstance(options, str):
+            yield options
+            return
+        oneline, max_count, skip, rev = options
+        stop = skip + max_count if max_count is not None else None
+        try:
+            commits = self._log_commits(rev, skip, stop)
+        except AmbiguousRevision as exc:
+            yield self._ambiguous_error(exc)
+            return
+        if isinstance(commits, str):
+            yield commits
+            return
+
+        for i, (sha, commit) in enumerate(commits):
+            if oneline:
+                yield f"{self._short(sha)} {commit.message.splitlines()[0]}"
+                continue
+            time_str = datetime.fromtimestamp(commit.timestamp).strftime("%a %b %d %H:%M:%S %Y")
+            message = textwrap.indent(commit.message, '    ')
+            entry = f"commit {sha}\nAuthor: {commit.author}\nDate:   {time_str}\n\n{message}"
+            # 条目之间空一行
+            yield entry if i == 0 else "\n" + entry
+
+    def _log_commits(self, rev: str, skip: int, stop: Optional[int]):
+        """解析起始版本, 返回 (哈希, Commit) 的惰性序列; 无法解析时返回错误信息"""
+        if '..' in rev:
+            # A..B: 只显示 B 可达而 A 不可达的提交
+            exclude, include = (self._resolve(r or 'HEAD') for r in rev.split('..', 1))
+            if exclude is None or include is None:
+                return f"fatal: ambiguous argument '{rev}': unknown revision or path not in the working tree."
+            objects = self._state['objects']
+            shas = self._graph.range([exclude], [include])
+            return ((sha, objects.get(sha)) for sha in itertools.islice(shas, skip, stop))
+        start = self._resolve(rev)
+        if start is None:
+            if rev == 'HEAD':
+                return f"fatal: your current branch '{self._state['current_branch']}' does not have any commits yet"
+            return f"fatal: ambiguous argument '{rev}': unknown revision or path not in the working tree."
+        return itertools.islice(self.iter_commits(start), skip, stop)
+
+    def _parse_log_args(self, args):
+        """解析 --oneline, -n/--max-count, --skip 和起始版本; 出错时返回错误信息"""
+        oneline, max_count, skip, rev = False, None, 0, 'HEAD'
+        args = iter(args)
+        try:
+            for arg in args:
+                if arg == '--oneline':
+                    oneline = True
+                elif arg in ('-n', '--max-count'):
+                    max_count = int(next(args, ''))
+                elif arg.startswith('--max-count='):
+                    max_count = int(arg.split('=', 1)[1])
+                elif arg.startswith('-n'):
+                    max_count = int(arg[2:])
+                elif arg == '--skip':
+                    skip = int(next(args, ''))
+                elif arg.startswith('--skip='):
+                    skip = int(arg.split('=', 1)[1])
+                elif arg[:1] == '-' and arg[1:].isdigit():
+                    max_count = int(arg[1:])
+                elif arg.startswith('-'):
+                    return f"fatal: unrecognized argument: {arg}"
+                else:
+                    rev = arg
+        except ValueError:
+            return "fatal: option requires a numeric value"
+        if max_count is not None and max_count < 0:
+            max_count = None
+        return oneline, max_count, max(skip, 0), rev
 
     def _cmd_status(self, args) -> str:
         if not self._state['repo_initialized']:
             return "fatal: not a git repository (or any of the parent directories)"
             
         output = [f"On branch {self._state['current_branch']}"]
+        output.extend(self._tracking_status())
+        header = len(output)
+        index = self._state['index']
+        seq = self._state['sequence']
+        if seq:
+            output.extend(self._sequence_status(seq))
+        elif index.unmerged:
+            output.append("You have unmerged paths.")
+            output.append('  (fix conflicts and run "git commit")')
+            output.append('  (use "git merge --abort" to abort the merge)')
+        elif self._state['merge']:
+            output.append("All conflicts fixed but you are still merging.")
+            output.append('  (use "git commit" to conclude merge)')
         
-        # 暂存区状态
-        if self._state['staged_files']:
-            output.append("Changes to be committed:")
+        pathspec = compile_pathspec(tuple(arg for arg in args if not arg.startswith('-')) or ('.',))
+        # 暂存区状态: 只检查与 HEAD 不一致的路径
+        staged = sorted(f for f in index.staged if pathspec.match(f))
+        if staged:
+            head_tree = self._commit_tree(self._head())
+            objects = self._state['objects']
+            output.append("\nChanges to be committed:" if len(output) > 1 else "Changes to be committed:")
             output.append('  (use "git restore --staged <file>..." to unstage)')
-            output.extend(f"\tnew file:   {f}" for f in self._state['staged_files'])
+            for f in staged:
+                if f not in index:
+                    output.append(f"\tdeleted:    {f}")
+                elif objects.lookup_path(head_tree, f) is None:
+                    output.append(f"\tnew file:   {f}")
+                else:
+                    output.append(f"\tmodified:   {f}")
         
-        # 工作区状态
-        unstaged = [
-            f for f in self._state['working_dir'] 
-            if f not in self._state['staged_files']
-        ]
-        if unstaged:
+        # 未解决的冲突
+        unmerged = sorted(f for f in index.unmerged if pathspec.match(f))
+        if unmerged:
+            output.append("\nUnmerged paths:")
+            output.append('  (use "git add <file>..." to mark resolution)')
+            for f in unmerged:
+                base, ours, theirs = index.unmerged[f]
+                if ours is None:
+                    state = "deleted by us:"
+                elif theirs is None:
+                    state = "deleted by them:"
+                else:
+                    state = "both modified:" if base else "both added:"
+                output.append(f"\t{state:<17}{f}")
+
+        # 工作区状态: 只检查 pathspec 子树中被改动过的路径, 未跟踪的文件按 .gitignore 过滤
+        candidates = list(self._pathspec_paths(pathspec))
+        in_ignored_dir = {path for path, ignored in candidates if ignored}
+        rules = self._state['working_dir'].ignore_rules()
+        modified, deleted, untracked = index.classify(
+            self._state['working_dir'], [path for path, _ in candidates])
+        modified = [f for f in modified if f not in index.unmerged]
+        deleted = [f for f in deleted if f not in index.unmerged]
+        untracked = [f for f in untracked if f not in index.unmerged
+                     and f not in in_ignored_dir and not rules.ignores_file(f)]
+        if modified or deleted:
             output.append("\nChanges not staged for commit:")
             output.append('  (use "git add <file>..." to update what will be committed)')
-            output.extend(f"\tmodified:   {f}" for f in unstaged)
+            output.extend(f"\tmodified:   {f}" for f in modified)
+            output.extend(f"\tdeleted:    {f}" for f in deleted)
         
         # 未跟踪文件
-        untracked = [
-            f for f in self._state['working_dir'] 
-            if f not in self._state['staged_files'] and f not in unstaged
-        ]
         if untracked:
             output.append("\nUntracked files:")
             output.append('  (use "git add <file>..." to include in what will be committed)')
             output.extend(f"\t{f}" for f in untracked)
+
+        if len(output) == header:
+            output.append("\nnothing to commit, working tree clean" if header > 1
+                          else "nothing to commit, working tree clean")
         
         return "\n".join(output)
 
+    # ---- 差异比较 ----
+    def _cmd_diff(self, args) -> str:
+        return "\n".join(self.iter_diff(args))
+
+    def iter_diff(self, args) -> Iterator[str]:
+        """逐个文件、逐个 hunk 惰性产生 diff 输出"""
+        options = self._parse_diff_args(args)
+        if isinstance(options, str):
+            yield options
+            return
+        cached, stat, algorithm, revs, paths = options
+        try:
+            changes = self._diff_changes(cached, revs, compile_pathspec(tuple(paths)) if paths else None)
+        except AmbiguousRevision as exc:
+            yield self._ambiguous_error(exc)
+            return
+        if isinstance(changes, str):
+            yield changes
+            return
+        if stat:
+            yield from self._diff_stat(changes, algorithm)
+            return
+        for path, old, new in changes:
+            yield from self._diff_file(path, old, new, algorithm)
+
+    def _parse_diff_args(self, args):
+        """解析 --cached/--staged, --stat, 算法选项, 版本和 -- 之后的路径; 出错时返回错误信息"""
+        cached, stat, algorithm, revs, pathspec = False, False, 'myers', [], []
+        args = list(args)
+        paths = []
+        if '--' in args:
+            paths = args[args.index('--') + 1:]
+            args = args[:args.index('--')]
+        for arg in args:
+            if arg in ('--cached', '--staged'):
+                cached = True
+            elif arg == '--stat':
+                stat = True
+            elif arg in ('--patience', '--histogram', '--minimal'):
+                algorithm = 'myers' if arg == '--minimal' else arg[2:]
+            elif arg.startswith('--diff-algorithm='):
+                algorithm = arg.split('=', 1)[1]
+                if algorithm == 'default':
+                    algorithm = 'myers'
+                if algorithm not in ALGORITHMS:
+                    return "error: option diff-algorithm accepts \"myers\", \"minimal\", \"patience\" and \"histogram\""
+            elif arg.startswith('-'):
+                return f"error: invalid option: {arg}"
+            elif '..' in arg:
+                revs.extend(r or 'HEAD' for r in arg.split('..', 1))
+            elif not pathspec and self._resolve(arg) is not None:
+                revs.append(arg)
+            elif self._is_pathspec(arg):
+                # 第一个路径之后的参数都按路径处理
+                pathspec.append(arg)
+            else:
+                return (f"fatal: ambiguous argument '{arg}': unknown revision or path not in the working tree.\n"
+                        "Use '--' to separate paths from revisions, like this:\n"
+                        "'git <command> [<revision>...] -- [<file>...]'")
+        if len(revs) > 2 or (cached and len(revs) > 1):
+            return "usage: git diff [<options>] [<commit>] [--] [<path>...]"
+        return cached, stat, algorithm, revs, pathspec + paths
+
+    def _diff_changes(self, cached: bool, revs: List[str], pathspec: Optional[Pathspec] = None):
+        """待比较的文件列表 [(路径, 旧版本, 新版本)], 版本为 (blob哈希, 内容) 或 None
+
+        给出 pathspec 时只读取其根路径下的子树和工作区路径。
+        """
+        if not self._state['repo_initialized']:
+            return "fatal: not a git repository (or any of the parent directories): .git"
+        objects = self._state['objects']
+        index = self._state['index']
+        working_dir = self._state['working_dir']
+
+        def blob_side(sha):
+            return (sha, objects.read_blob(sha)) if sha else None
+
+        def worktree_side(path):
+            # 与索引一致的文件直接使用索引中的 blob 哈希, 不必重新计算
+            if path not in working_dir or path not in index:
+                return None
+            content = working_dir[path]
+            if index.is_clean(path, working_dir):
+                return index.blob(path), content
+            return hash_object(Blob(content)), content
+
+        shas = [self._resolve(rev) for rev in revs]
+        for rev, sha in zip(revs, shas):
+            if sha is None:
+                return f"fatal: bad revision '{rev}'"
+        changes = []
+        if len(shas) == 2:
+            # 两个提交之间: 哈希相同的子树直接跳过
+            for path, old, new in self._diff_trees(self._commit_tree(shas[0]), self._commit_tree(shas[1]), pathspec):
+                changes.append((path, blob_side(old), blob_side(new)))
+            return changes
+
+        head = self._head()
+        if cached or shas:
+            base = shas[0] if shas else head
+            base_tree = self._commit_tree(base)
+            if base == head:
+                # 与 HEAD 比较时只需检查已暂存和工作区中改动过的路径
+                candidates = {p for p in index.staged if pathspec is None or pathspec.match(p)}
+                if not cached:
+                    dirty = working_dir.dirty if pathspec is None else (
+                        p for p, _ in self._pathspec_paths(pathspec))
+                    candidates |= {p for p in dirty if p in index or p in index.staged}
+                base_files = {p: objects.lookup_path(base_tree, p) for p in candidates}
+            else:
+                base_files = dict(self._tree_files(base_tree, pathspec))
+                candidates = base_files.keys() | {
+                    p for p in index.entries if pathspec is None or pathspec.match(p)}
+            for path in sorted(candidates):
+                old = blob_side(base_files.get(path))
+                new = blob_side(index.blob(path)) if cached else worktree_side(path)
+                if (old and old[0]) != (new and new[0]):
+                    changes.append((path, old, new))
+            return changes
+
+        # 默认: 暂存区与工作区
+        modified, deleted, _ = index.classify(working_dir, None if pathspec is None else (
+            p for p, _ in self._pathspec_paths(pathspec)))
+        for path in sorted(modified + deleted):
+            changes.append((path, blob_side(index.blob(path)), worktree_side(path)))
+        return changes
+
+    def _diff_trees(self, old_tree: Optional[str], new_tree: Optional[str],
+                    pathspec: Optional[Pathspec] = None) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """两棵目录树的差异; 有 pathspec 时只比较各个根路径对应的子树"""
+        objects = self._state['objects']
+        if pathspec is None:
+            return list(objects.diff_trees(old_tree, new_tree))
+        changes = []
+        for root in pathspec.roots:
+            if not root:
+                changes.extend(objects.diff_trees(old_tree, new_tree))
+                continue
+            old_entry = objects.lookup_entry(old_tree, root)
+            new_entry = objects.lookup_entry(new_tree, root)
+            old_kind, old_sha = old_entry or (None, None)
+            new_kind, new_sha = new_entry or (None, None)
+            changes.extend(objects.diff_trees(old_sha if old_kind == 'tree' else None,
+                                              new_sha if new_kind == 'tree' else None, root + '/'))
+            old_blob = old_sha if old_kind == 'blob' else None
+            new_blob = new_sha if new_kind == 'blob' else None
+            if old_blob != new_blob:
+                changes.append((root, old_blob, new_blob))
+        return sorted((c for c in changes if pathspec.match(c[0])), key=lambda c: c[0])
+
+    def _tree_files(self, tree: Optional[str], pathspec: Optional[Pathspec] = None) -> Iterator[Tuple[str, str]]:
+        """目录树中 pathspec 选中的文件 (路径, blob哈希)"""
+        objects = self._state['objects']
+        for root in pathspec.roots if pathspec else ['']:
+            kind, sha = objects.lookup_entry(tree, root) or (None, None)
+            if kind == 'tree':
+                files = objects.iter_tree(sha, root + '/' if root else '')
+            elif kind == 'blob':
+                files = [(root, sha)]
+            else:
+                continue
+            yield from (f for f in files if pathspec is None or pathspec.match(f[0]))
+
+    def _diff_file(self, path: str, old, new, algorithm: str) -> Iterator[str]:
+        old_key, old_text = old or (None, None)
+        new_key, new_text = new or (None, None)
+        header = [f"diff --git a/{path} b/{path}"]
+        if old is None:
+            header.append("new file mode 100644")
+        elif new is None:
+            header.append("deleted file mode 100644")
+        mode = " 100644" if old and new else ""
+        header.append(f"index {(old_key or '0' * 40)[:7]}..{(new_key or '0' * 40)[:7]}{mode}")
+        header.append(f"--- a/{path}" if old else "--- /dev/null")
+        header.append(f"+++ b/{path}" if new else "+++ /dev/null")
+        yield "\n".join(header)
+        yield from self._diff.hunks(old_key, old_text, new_key, new_text, algorithm)
+
+    def _diff_stat(self, changes, algorithm: str, width: int = 50) -> Iterator[str]:
+        rows = []
+        for path, old, new in changes:
+            old_key, old_text = old or (None, None)
+            new_key, new_text = new or (None, None)
+            rows.append((path, *self._diff.stat(old_key, old_text, new_key, new_text, algorithm)))
+        if not rows:
+            return
+        name_width = max(len(path) for path, _, _ in rows)
+        most = max(added + deleted for _, added, deleted in rows)
+        count_width = len(str(most))
+        for path, added, deleted in rows:
+            plus, minus = added, deleted
+            if most > width:
+                # 按比例缩放, 有改动的一侧至少显示一个符号
+                plus = -(-added * width // most)
+                minus = -(-deleted * width // most)
+            yield f" {path:<{name_width}} | {added + deleted:>{count_width}} {'+' * plus}{'-' * minus}"
+        insertions = sum(r[1] for r in rows)
+        deletions = sum(r[2] for r in rows)
+        summary = f" {len(rows)} file{'s' if len(rows) != 1 else ''} changed"
+        if insertions:
+            summary += f", {insertions} insertion{'s' if insertions != 1 else ''}(+)"
+        if deletions:
+            summary += f", {deletions} deletion{'s' if deletions != 1 else ''}(-)"
+        yield summary
+
     # ---- 撤销与回退命令 ----
     def _cmd_reset(self, args) -> str:
         if not args:
             return "fatal: option required"
-            
-        if args[0] == '--hard':
-            if len(args) > 1 and args[1] == 'HEAD~1':
-                if len(self._state['commits']) > 0:
-                    self._state['commits'].pop()
-                    return "HEAD is now at abc123 Previous commit message"
-            return "HEAD is now at abc123"
-        elif args[0] == '--soft':
-            return "Reset to previous commit (changes staged)"
-        else:
+
+        mode = '--mixed'
+        if args[0] in ('--hard', '--soft', '--mixed'):
+            mode, args = args[0], args[1:]
+        elif args[0].startswith('-'):
             return f"git reset: '{args[0]}' is not a valid option"
 
+        rev = args[0] if args else 'HEAD'
+        target = self._resolve(rev)
+        if target is None:
+            return f"fatal: ambiguous argument '{rev}': unknown revision or path not in the working tree."
+
+        objects = self._state['objects']
+        index = self._state['index']
+        working_dir = self._state['working_dir']
+        target_tree = self._commit_tree(target)
+        # 受影响的路径: 两次提交之间的差异 + 已暂存的路径
+        paths = {p for p, _, _ in objects.diff_trees(self._commit_tree(self._head()), target_tree)}
+        paths |= index.staged
+        self._update_head(target)
+
+        if mode == '--soft':
+            # 保留两次提交之间的差异为已暂存
+            for path in paths:
+                index.mark(path, objects.lookup_path(target_tree, path))
+            return ""
+
+        for path in paths:
+            index.set(path, objects.lookup_path(target_tree, path))
+            working_dir.dirty.add(path)
+        index.staged.clear()
+        if mode == '--mixed':
+            return ""
+
+        # --hard 同时丢弃工作区中被跟踪文件的修改
+        paths |= {p for p in working_dir.dirty if p in index}
+        for path in paths:
+            self._write_file(path, objects.lookup_path(target_tree, path))
+        message = objects.get(target).message.splitlines()[0]
+        return f"HEAD is now at {self._short(target)} {message}"
+
     def _cmd_revert(self, args) -> str:
-        if not args:
-            return "fatal: commit id required"
-            
-        commit_id = args[0]
-        return f"[{self._state['current_branch']} abc123] Revert \"{commit_id}\"\n 1 file changed, 1 deletion(-)"
+        return self._cmd_pick('revert', args)
+
+    # ---- 配置 ----
+    def _cmd_config(self, args) -> str:
+        """git config [--global | --local] <键> [<值>], 以及 --unset <键> 和 --list"""
+        args = [arg for arg in args if arg not in ('--global', '--local')]
+        config = self._state['config']
+        if args in (['--list'], ['-l']):
+            return "\n".join(f"{key}={value}" for key, value in sorted(config.items()))
+        if len(args) == 2 and args[0] == '--unset':
+            config.pop(args[1], None)
+            return ""
+        if not args or len(args) > 2 or args[0].startswith('-'):
+            return "usage: git config [--global | --local] <name> [<value>]"
+        key = args[0]
+        if '.' not in key.strip('.'):
+            return f"error: key does not contain a section: {key}"
+        if len(args) == 1:
+            return config.get(key, "")
+        config[key] = args[1]
+        return ""
+
+    def config_value(self, key: str) -> Optional[str]:
+        return self._state['config'].get(key)
 
     # ---- 标签管理命令 ----
     def _cmd_tag(self, args) -> str:
@@ -359,97 +1341,769 @@ class VirtualGit:
             return "\n".join(self._state['tags'].keys())
             
         tag_name = args[0]
-        self._state['tags'][tag_name] = {
-            'commit': self._get_latest_commit_hash(),
-            'timestamp': datetime.now()
-        }
+        rev = args[1] if len(args) > 1 else 'HEAD'
+        target = self._resolve(rev)
+        if target is None:
+            return f"fatal: Failed to resolve '{rev}' as a valid ref."
+        self._state['tags'][tag_name] = target
         return f"Created tag '{tag_name}'"
 
     # ---- 高级命令 ----
     def _cmd_rebase(self, args) -> str:
-        if not args:
+        control = self._sequence_control('rebase', args)
+        if control is not None:
+            return control
+        if '--edit-todo' in args:
+            return self._edit_todo(" ".join(a for a in args if a != '--edit-todo'))
+        busy = self._sequence_busy()
+        if busy:
+            return busy
+
+        names = [a for a in args if not a.startswith('-')]
+        if not names:
             return "fatal: branch name required for rebase"
-            
-        if '--abort' in args:
-            return "Rebase aborted."
-            
-        if '--continue' in args:
-            return "Successfully rebased and updated refs/heads/main."
-            
-        if '-i' in args:
-            return textwrap.dedent("""
-            pick abc123 First commit
-            pick def456 Second commit
-            
-            # Rebase xyz789 onto abc123 (2 commands)
-            #
-            # Commands:
-            # p, pick <commit> = use commit
-            # r, reword <commit> = use commit, but edit the commit message
-            # e, edit <commit> = use commit, but stop for amending
-            # s, squash <commit> = use commit, but meld into previous commit
-            # f, fixup <commit> = like "squash", but discard this commit's log message
-            # x, exec <command> = run command (the rest of the line) using shell
-            # b, break = stop here (continue rebase later with 'git rebase --continue')
-            # d, drop <commit> = remove commit
-            # l, label <label> = label current HEAD with a name
-            # t, reset <label> = reset HEAD to a label
-            # m, merge [-C <commit> | -c <commit>] <label> [# <oneline>]
-            """)
-            
-        branch = args[0]
-        return f"Successfully rebased and updated refs/heads/{branch}."
+        upstream = names[0]
+        onto = self._resolve(upstream)
+        if onto is None:
+            return f"fatal: invalid upstream '{upstream}'"
+        head = self._head()
+        if head is None:
+            return "fatal: your current branch does not have any commits yet"
+        index = self._state['index']
+        modified, deleted, _ = index.classify(self._state['working_dir'])
+        if index.staged or modified or deleted:
+            return "error: cannot rebase: You have unstaged changes.\nerror: Please commit or stash them."
+
+        interactive = '-i' in args or '--interactive' in args
+        branch = self._state['current_branch']
+        if not interactive:
+            if self._graph.is_ancestor(onto, head):
+                return f"Current branch {branch} is up to date."
+            if self._graph.is_ancestor(head, onto):
+                self._move_head(onto)
+                return f"Successfully rebased and updated refs/heads/{branch}."
+
+        # 待重放的提交: upstream..HEAD, 从旧到新, 合并提交默认被丢弃
+        objects = self._state['objects']
+        todo = [sha for sha in reversed(self._graph.range([onto], [head]))
+                if len(objects.get(sha).parents) <= 1]
+        # 上游已经包含的等价改动(补丁指纹相同)不再重放
+        notes, steps = [], []
+        upstream_ids = set()
+        if todo:
+            upstream_ids = {self._patch_id(sha) for sha in self._graph.range([head], [onto])
+                            if len(objects.get(sha).parents) <= 1}
+        for sha in todo:
+            if self._patch_id(sha) in upstream_ids:
+                notes.append(f"warning: skipped previously applied commit {self._short(sha)}")
+            else:
+                steps.append(Step('pick', sha))
+
+        self._start_sequence('rebase', steps, onto, interactive)
+        if interactive:
+            self._state['sequence']['editing'] = True
+            header = (f"# Rebase {self._short(onto)}..{self._short(head)} onto {self._short(onto)} "
+                      f"({len(steps)} commands)\n#")
+            return "\n".join(notes + [self._format_todo(steps), "", header + TODO_HELP])
+        self._move_head(onto)
+        return self._run_sequence(notes)
 
     def _cmd_stash(self, args) -> str:
-        if not args:
-            # 默认stash save
-            stash_id = f"stash@{{{len(self._state['stashes'])}}}"
-            self._state['stashes'].append({
-                'id': stash_id,
-                'branch': self._state['current_branch'],
-                'files': self._state['working_dir'].keys()
-            })
-            return f"Saved working directory and index state WIP on {self._state['current_branch']}: abc123 Commit message"
-            
-        if args[0] == 'list':
-            return "\n".join([
-                f"{s['id']}: WIP on {s['branch']}: abc123 Commit message" 
-                for s in self._state['stashes']
-            ])
-        elif args[0] == 'apply':
-            return "On branch main\nChanges not staged for commit:\n\tmodified:   file.txt"
-        elif args[0] == 'drop':
-            return "Dropped refs/stash@{0}"
+        """贮藏栈: 每个贮藏是一个 WIP 提交, 父提交为 (HEAD, 索引提交[, 未跟踪文件提交])
+
+        目录树都基于 HEAD/索引增量构建, 与 HEAD 相同的子树直接共享,
+        所以贮藏占用的空间只与改动的内容成正比。栈顶是 stash@{0}。
+        """
+        if not self._state['repo_initialized']:
+            return "fatal: not a git repository (or any of the parent directories): .git"
+        sub, rest = ('push', args) if not args or args[0].startswith('-') else (args[0], args[1:])
+        handlers = {
+            'push': self._stash_push,
+            'save': lambda rest: self._stash_push([], message=' '.join(rest) or None),
+            'list': self._stash_list,
+            'show': self._stash_show,
+            'apply': self._stash_apply,
+            'pop': lambda rest: self._stash_apply(rest, drop=True),
+            'drop': self._stash_drop,
+            'clear': self._stash_clear,
+        }
+        handler = handlers.get(sub)
+        if handler is None:
+            return f"git stash: '{sub}' is not a valid subcommand"
+        return handler(rest)
+
+    def _stash_push(self, args, message: Optional[str] = None) -> str:
+        include_untracked = False
+        args = list(args)
+        while args:
+            arg = args.pop(0)
+            if arg in ('-u', '--include-untracked'):
+                include_untracked = True
+            elif arg in ('-m', '--message') and args:
+                message = args.pop(0)
+            elif arg.startswith('--message='):
+                message = arg[len('--message='):]
+            elif arg not in ('-q', '--quiet'):
+                return f"error: unknown option for 'stash push': {arg}"
+
+        head = self._head()
+        if head is None:
+            return "You do not have the initial commit yet"
+        objects = self._state['objects']
+        index = self._state['index']
+        working_dir = self._state['working_dir']
+        if index.unmerged:
+            return "\n".join([f"{path}: needs merge" for path in sorted(index.unmerged)]
+                             + ["error: could not write index"])
+
+        head_tree = self._commit_tree(head)
+        index_tree = index.snapshot(objects)
+        modified, deleted, untracked = index.classify(working_dir)
+        worktree_changes: Dict[str, Optional[str]] = {path: objects.write_blob(working_dir[path]) for path in modified}
+        worktree_changes.update(dict.fromkeys(deleted))
+        if include_untracked:
+            rules = working_dir.ignore_rules()
+            untracked = [path for path in untracked if not rules.ignores(path)]
         else:
-            return f"git stash: '{args[0]}' is not a valid subcommand"
+            untracked = []
+        if index_tree == head_tree and not worktree_changes and not untracked:
+            return "No local changes to save"
+
+        branch = self._state['current_branch'] or '(no branch)'
+        subject = objects.get(head).message.splitlines()[0]
+        base = f"{branch}: {self._short(head)} {subject}"
+        parents = [head, self._write_commit(index_tree, (head,), f"index on {base}")]
+        if untracked:
+            untracked_tree = objects.write_tree({path: objects.write_blob(working_dir[path]) for path in untracked})
+            parents.append(self._write_commit(untracked_tree, (), f"untracked files on {base}"))
+        title = f"On {branch}: {message}" if message else f"WIP on {base}"
+        worktree_tree = objects.update_tree(index_tree, worktree_changes)
+        self._state['stashes'].append(self._write_commit(worktree_tree, tuple(parents), title))
+
+        # 回到 HEAD: 只需恢复已暂存和工作区中改动过的路径
+        for path in sorted(index.staged | worktree_changes.keys()):
+            self._write_file(path, objects.lookup_path(head_tree, path))
+        for path in untracked:
+            working_dir.pop(path)
+        return f"Saved working directory and index state {title}"
+
+    def _stash_list(self, args) -> str:
+        objects = self._state['objects']
+        return "\n".join(f"stash@{{{n}}}: {objects.get(sha).message}"
+                         for n, sha in enumerate(reversed(self._state['stashes'])))
+
+    def _stash_entry(self, args) -> Tuple[Optional[str], str]:
+        """参数中的贮藏(stash@{n}、n 或默认的栈顶), 返回 (提交哈希, 名称); 找不到时哈希为 None, 名称为错误信息"""
+        refs = [arg for arg in args if not arg.startswith('-')]
+        if not self._state['stashes']:
+            return None, "No stash entries found."
+        ref = refs[0] if refs else 'stash@{0}'
+        if ref.isdigit():
+            ref = f"stash@{{{ref}}}"
+        sha = self._stash_commit(ref)
+        if sha is None:
+            return None, f"error: {ref} is not a valid reference"
+        return sha, ref if refs else 'refs/stash@{0}'
+
+    def _stash_commit(self, ref: str) -> Optional[str]:
+        """stash 或 stash@{n} 对应的贮藏提交"""
+        stashes = self._state['stashes']
+        match = _STASH_REF.fullmatch(ref)
+        n = int(match.group(1)) if match else 0 if ref == 'stash' else None
+        if n is None or n >= len(stashes):
+            return None
+        return stashes[len(stashes) - 1 - n]
+
+    def _stash_show(self, args) -> str:
+        sha, ref = self._stash_entry(args)
+        if sha is None:
+            return ref
+        objects = self._state['objects']
+        commit = objects.get(sha)
+
+        def blob_side(blob):
+            return (blob, objects.read_blob(blob)) if blob else None
+
+        changes = [(path, blob_side(old), blob_side(new))
+                   for path, old, new in objects.diff_trees(self._commit_tree(commit.parents[0]), commit.tree)]
+        if '-p' in args or '--patch' in args:
+            return "\n".join(line for path, old, new in changes
+                             for line in self._diff_file(path, old, new, 'myers'))
+        return "\n".join(self._diff_stat(changes, 'myers'))
+
+    def _stash_apply(self, args, drop: bool = False) -> str:
+        sha, ref = self._stash_entry(args)
+        if sha is None:
+            return ref
+        if self._state['conflict'] or self._state['merge'] or self._state['sequence']:
+            return "error: Cannot apply a stash in the middle of a merge"
+        objects = self._state['objects']
+        index = self._state['index']
+        working_dir = self._state['working_dir']
+        commit = objects.get(sha)
+        base_tree, index_tree = self._commit_tree(commit.parents[0]), self._commit_tree(commit.parents[1])
+        head_tree = self._commit_tree(self._head())
+
+        blocked = self._overwritten_by(objects.diff_trees(base_tree, commit.tree))
+        if blocked:
+            return blocked
+        untracked = list(objects.iter_tree(self._commit_tree(commit.parents[2]))) if len(commit.parents) > 2 else []
+        existing = [path for path, _ in untracked if path in working_dir]
+        if existing:
+            return "\n".join([f"{path} already exists, no checkout" for path in existing]
+                             + ["error: could not restore untracked files from stash"])
+        restore_index = '--index' in args
+        index_changes = list(objects.diff_trees(base_tree, index_tree)) if restore_index else []
+        if base_tree != head_tree and any(objects.lookup_path(head_tree, path) != old
+                                          for path, old, _ in index_changes):
+            return "Conflicts in index. Try without --index."
+
+        changes, conflicts = self._merge_trees(base_tree, head_tree, commit.tree, 'Stashed changes')
+        # 与 git 相同, 合并结果只留在工作区, 只有新增的文件保持暂存
+        for path in changes:
+            head_blob = objects.lookup_path(head_tree, path)
+            if head_blob is not None:
+                index.set(path, head_blob)
+                working_dir.dirty.add(path)
+            index.mark(path, head_blob)
+        for path, _, blob in index_changes:
+            index.set(path, blob)
+            working_dir.dirty.add(path)
+            index.mark(path, objects.lookup_path(head_tree, path))
+        for path, blob in untracked:
+            working_dir[path] = objects.read_blob(blob)
+
+        output = conflicts + [self._cmd_status([])]
+        if conflicts:
+            self._set_conflict(True)
+            if drop:
+                output.append("The stash entry is kept in case you need it again.")
+        elif drop:
+            output.append(self._stash_drop(args))
+        return "\n".join(output)
+
+    def _stash_drop(self, args) -> str:
+        sha, ref = self._stash_entry(args)
+        if sha is None:
+            return ref
+        self._state['stashes'].remove(sha)
+        return f"Dropped {ref} ({sha})"
+
+    def _stash_clear(self, args) -> str:
+        self._state['stashes'] = []
+        return ""
 
     def _cmd_cherry_pick(self, args) -> str:
+        return self._cmd_pick('cherry-pick', args)
+
+    # ---- 重放: rebase / cherry-pick / revert ----
+    def _cmd_pick(self, op: str, args) -> str:
+        """cherry-pick 与 revert: 依次把提交(或其反向改动)三方合并到 HEAD 上"""
+        control = self._sequence_control(op, args)
+        if control is not None:
+            return control
         if not args:
             return "fatal: commit id required"
-            
-        commit_id = args[0]
-        return f"[{self._state['current_branch']} abc123] {commit_id}\n 1 file changed, 1 insertion(+)"
+        busy = self._sequence_busy()
+        if busy:
+            return busy
+
+        objects = self._state['objects']
+        commits = []
+        for rev in (a for a in args if not a.startswith('-')):
+            if '..' in rev:
+                exclude, include = (self._resolve(r or 'HEAD') for r in rev.split('..', 1))
+                if exclude is None or include is None:
+                    return f"fatal: bad revision '{rev}'"
+                shas = self._graph.range([exclude], [include])
+                # cherry-pick 从旧到新, revert 从新到旧
+                commits.extend(shas if op == 'revert' else reversed(shas))
+            else:
+                sha = self._resolve(rev)
+                if sha is None:
+                    return f"fatal: bad revision '{rev}'"
+                commits.append(sha)
+        for sha in commits:
+            if len(objects.get(sha).parents) > 1:
+                return f"error: commit {sha} is a merge but no -m option was given.\nfatal: {op} failed"
+        if not commits:
+            return "error: empty commit set passed\nfatal: " + op + " failed"
+
+        self._start_sequence(op, [Step('pick', sha) for sha in commits])
+        return self._run_sequence()
+
+    def _sequence_status(self, seq) -> List[str]:
+        op = seq['op']
+        if op == 'rebase':
+            kind = "interactive rebase" if seq['interactive'] else "rebase"
+            lines = [f"{kind} in progress; onto {self._short(seq['onto'])}"]
+            if seq['editing']:
+                lines.append('  (use "git rebase --edit-todo" to view and edit the todo list, '
+                             'then "git rebase --continue")')
+                return lines
+        else:
+            verb = 'reverting' if op == 'revert' else 'cherry-picking'
+            step = seq['current']
+            lines = [f"You are currently {verb} commit {self._short(step.commit)}." if step
+                     else f"{op.capitalize()} currently in progress."]
+        if self._state['index'].unmerged:
+            lines.append(f'  (fix conflicts and then run "git {op} --continue")')
+        else:
+            lines.append(f'  (all conflicts fixed: run "git {op} --continue")')
+        lines.append(f'  (use "git {op} --skip" to skip this patch)')
+        lines.append(f'  (use "git {op} --abort" to cancel the {op} operation)')
+        return lines
+
+    def _sequence_control(self, op: str, args) -> Optional[str]:
+        """处理 --continue/--abort/--skip, 不是这些选项时返回 None"""
+        handlers = {'--continue': self._sequence_continue,
+                    '--abort': self._sequence_abort,
+                    '--skip': self._sequence_skip}
+        for flag, handler in handlers.items():
+            if flag in args:
+                seq = self._state['sequence']
+                if seq is None or seq['op'] != op:
+                    return "fatal: No rebase in progress?" if op == 'rebase' else f"error: no {op} in progress"
+                return handler()
+        return None
+
+    def _sequence_busy(self) -> Optional[str]:
+        if self._state['merge']:
+            return ("fatal: You have not concluded your merge (MERGE_HEAD exists).\n"
+                    "Please, commit your changes before you merge.")
+        seq = self._state['sequence']
+        if seq:
+            return (f"error: a {seq['op']} is already in progress\n"
+                    f"hint: try \"git {seq['op']} (--continue | --abort | --skip)\"")
+        return None
+
+    def _start_sequence(self, op: str, steps: List[Step], onto: Optional[str] = None,
+                        interactive: bool = False) -> None:
+        self._state['sequence'] = {
+            'op': op,
+            'todo': deque(steps),
+            'orig_head': self._head(),
+            'onto': onto,
+            'interactive': interactive,
+            'editing': False,  # rebase -i: 等待编辑 todo 列表
+            'current': None,  # 因冲突停下的那一步
+            'paths': [],  # 冲突时被改动的路径, --abort/--skip 时恢复
+        }
+
+    def _run_sequence(self, output: Optional[List[str]] = None) -> str:
+        """执行 todo 中剩余的步骤, 遇到冲突或 break 时停下"""
+        seq = self._state['sequence']
+        output = list(output or [])
+        while seq['todo']:
+            step = seq['todo'].popleft()
+            if step.action == 'drop':
+                continue
+            if step.action == 'break':
+                output.append("Stopped at HEAD\nYou can continue with 'git rebase --continue'")
+                return "\n".join(output)
+            error = self._replay(step)
+            if error:
+                output.append(error)
+                return "\n".join(output)
+            if seq['op'] != 'rebase':
+                output.append(self._commit_summary(self._head()))
+        self._state['sequence'] = None
+        if seq['op'] == 'rebase':
+            output.append(f"Successfully rebased and updated refs/heads/{self._state['current_branch']}.")
+        return "\n".join(output)
+
+    def _replay(self, step: Step) -> Optional[str]:
+        """把一步重放到 HEAD 上; 出现冲突时返回错误信息, 序列停在这一步"""
+        seq = self._state['sequence']
+        objects = self._state['objects']
+        commit = objects.get(step.commit)
+        short, subject = self._short(step.commit), commit.message.splitlines()[0]
+        parent_tree = self._commit_tree(commit.parents[0]) if commit.parents else None
+        if seq['op'] == 'revert':
+            base, theirs, label = commit.tree, parent_tree, f"parent of {short} ({subject})"
+        else:
+            base, theirs, label = parent_tree, commit.tree, f"{short} ({subject})"
+
+        blocked = self._overwritten_by(objects.diff_trees(base, theirs), seq['op'])
+        if blocked:
+            seq['todo'].appendleft(step)
+            return blocked
+        head_tree = self._commit_tree(self._head())
+        changes, conflicts = self._merge_trees(base, head_tree, theirs, label)
+        if conflicts:
+            self._keep_staged(changes, head_tree)
+            seq['current'] = step
+            seq['paths'] = sorted(changes.keys() | self._state['index'].unmerged.keys())
+            self._set_conflict(True)
+            op = seq['op']
+            hint = (['hint: Resolve all conflicts manually, mark them as resolved with',
+                     'hint: "git add/rm <conflicted_files>", then run "git rebase --continue".',
+                     'hint: You can instead skip this commit: run "git rebase --skip".',
+                     'hint: To abort and get back to the state before "git rebase", run "git rebase --abort".']
+                    if op == 'rebase' else
+                    ["hint: After resolving the conflicts, mark them with",
+                     'hint: "git add/rm <pathspec>", then run',
+                     f'hint: "git {op} --continue".',
+                     f'hint: You can instead skip this commit with "git {op} --skip".',
+                     f'hint: To abort and get back to the state before "git {op}",',
+                     f'hint: run "git {op} --abort".'])
+            return "\n".join(conflicts + [f"error: could not {'revert' if op == 'revert' else 'apply'} "
+                                          f"{short}... {subject}"] + hint)
+        self._commit_step(step, objects.update_tree(head_tree, changes))
+        return None
+
+    def _commit_step(self, step: Step, tree: str) -> Optional[str]:
+        """按这一步的动作提交 tree; 改动已经存在(空提交)时跳过, 返回新提交哈希"""
+        seq = self._state['sequence']
+        objects = self._state['objects']
+        commit = objects.get(step.commit)
+        head = self._head()
+        # rebase 保留原提交的作者和时间, cherry-pick 只保留作者
+        author = commit.author
+        timestamp = commit.timestamp if seq['op'] == 'rebase' else None
+        if seq['op'] == 'revert':
+            author = AUTHOR
+            message = f"Revert \"{commit.message.splitlines()[0]}\"\n\nThis reverts commit {step.commit}."
+        else:
+            message = step.message or commit.message
+        parents = (head,) if head else ()
+        if step.action in ('squash', 'fixup'):
+            # 与上一个提交合并为一个
+            previous = objects.get(head)
+            parents = previous.parents
+            author, timestamp = previous.author, previous.timestamp
+            message = previous.message + ("\n\n" + message if step.action == 'squash' else "")
+        elif tree == self._commit_tree(head):
+            return None
+        new_hash = self._write_commit(tree, parents, message, author, timestamp)
+        self._update_head(new_hash)
+        return new_hash
+
+    def _sequence_continue(self) -> str:
+        seq = self._state['sequence']
+        index = self._state['index']
+        if index.unmerged:
+            return ("error: you must edit all merge conflicts and then\n"
+                    "mark them as resolved using git add")
+        output = []
+        if seq['editing']:
+            seq['editing'] = False
+            self._move_head(seq['onto'])
+        step = seq['current']
+        if step is not None:
+            # 提交解决冲突后的结果; 用户已经自己提交过时暂存区为空
+            seq['current'] = None
+            seq['paths'] = []
+            if index.staged:
+                objects = self._state['objects']
+                changes = {path: index.blob(path) for path in index.staged}
+                tree = objects.update_tree(self._commit_tree(self._head()), changes)
+                index.staged.clear()
+                if self._commit_step(step, tree) and seq['op'] != 'rebase':
+                    output.append(self._commit_summary(self._head()))
+        return self._run_sequence(output)
+
+    def _sequence_abort(self) -> str:
+        seq = self._state['sequence']
+        self._reset_sequence_paths()
+        self._move_head(seq['orig_head'])
+        self._state['sequence'] = None
+        return ""
+
+    def _sequence_skip(self) -> str:
+        seq = self._state['sequence']
+        self._reset_sequence_paths()
+        seq['current'] = None
+        return self._run_sequence()
+
+    def _reset_sequence_paths(self) -> None:
+        """把冲突时改动过的路径恢复为 HEAD 中的版本"""
+        seq = self._state['sequence']
+        objects = self._state['objects']
+        head_tree = self._commit_tree(self._head())
+        for path in seq['paths']:
+            self._write_file(path, objects.lookup_path(head_tree, path))
+        seq['paths'] = []
+        self._set_conflict(False)
+
+    def _move_head(self, target: Optional[str]) -> None:
+        """当前分支连同工作区一起移动到 target"""
+        self._checkout_commit(self._head(), target)
+        self._update_head(target)
+
+    def _edit_todo(self, text: str) -> str:
+        seq = self._state['sequence']
+        if seq is None or seq['op'] != 'rebase':
+            return "fatal: No rebase in progress?"
+        if text.strip():
+            steps = parse_todo(text, self._resolve)
+            if isinstance(steps, str):
+                return steps
+            seq['todo'] = deque(steps)
+        return self._format_todo(seq['todo'])
+
+    def _format_todo(self, steps) -> str:
+        objects = self._state['objects']
+        lines = []
+        for step in steps:
+            if step.commit is None:
+                lines.append(step.action)
+                continue
+            subject = step.message or objects.get(step.commit).message.splitlines()[0]
+            lines.append(f"{step.action} {self._short(step.commit)} {subject}")
+        return "\n".join(lines) if lines else "noop"
+
+    def _patch_id(self, sha: str) -> str:
+        """提交的补丁指纹; 提交不可变, 计算一次后缓存"""
+        pid = self._patch_ids.get(sha)
+        if pid is None:
+            objects = self._state['objects']
+            commit = objects.get(sha)
+            parent_tree = self._commit_tree(commit.parents[0]) if commit.parents else None
+            pid = patch_id(objects, self._diff, parent_tree, commit.tree)
+            self._patch_ids[sha] = pid
+        return pid
+
+    def _commit_summary(self, sha: str) -> str:
+        subject = self._state['objects'].get(sha).message.splitlines()[0]
+        return f"[{self._state['current_branch']} {self._short(sha)}] {subject}"
+
+    # ---- 检查点 ----
+    def checkpoint(self, network: bool = True) -> RepoState:
+        """当前状态的不可变快照; 只写入上次快照以来改动过的路径和引用, 其余部分与之前的快照共享
+
+        network 时连同模拟的远程仓库一起快照(远程仓库自己的快照不再递归)。
+        """
+        state = self._state
+        objects = state['objects']
+        index = state['index']
+        return RepoState(
+            worktree=state['working_dir'].snapshot(objects),
+            index=index.snapshot(objects),
+            unmerged=tuple(sorted(index.unmerged.items())),
+            repo_initialized=state['repo_initialized'],
+            current_branch=state['current_branch'],
+            branches=state['branches'].snapshot(),
+            tags=state['tags'].snapshot(),
+            remotes=self._frozen('remotes'),
+            stashes=tuple(state['stashes']),
+            conflict=state['conflict'],
+            merge=self._frozen('merge'),
+            sequence=self._frozen('sequence'),
+            remote_branches=state['remote_branches'].snapshot(),
+            upstream=self._frozen('upstream'),
+            config=self._frozen('config'),
+            network=tuple((url, repo.checkpoint(network=False))
+                          for url, repo in sorted(self.network.items())) if network and self.network else (),
+        )
+
+    def _frozen(self, key: str):
+        """很少变化的小状态在检查点之间共享同一份副本, 内容变了才重新复制"""
+        value = self._state[key]
+        if key not in self._frozen_cache or self._frozen_cache[key] != value:
+            self._frozen_cache[key] = copy.deepcopy(value)
+        return self._frozen_cache[key]
+
+    def restore(self, target: RepoState, network: bool = True) -> None:
+        """回到检查点; 只改动与当前状态不同的文件、索引项和引用, network 时远程仓库一起回退"""
+        state = self._state
+        objects = state['objects']
+        working_dir, index = state['working_dir'], state['index']
+        working_dir.restore(objects, target.worktree)
+        # 索引项变化的路径需要重新与工作区比较
+        working_dir.dirty.update(index.restore(objects, target.index))
+        index.unmerged = dict(target.unmerged)
+
+        old_head, was_initialized = self._head(), state['repo_initialized']
+        state['repo_initialized'] = target.repo_initialized
+        state['current_branch'] = target.current_branch
+        state['branches'].restore(target.branches)
+        state['tags'].restore(target.tags)
+        state['remote_branches'].restore(target.remote_branches)
+        for key in ('remotes', 'merge', 'sequence', 'upstream', 'config'):
+            value = getattr(target, key)
+            if key in ('upstream', 'config') and value is None:
+                value = {}
+            self._frozen_cache[key] = value
+            state[key] = copy.deepcopy(value)
+        # 检查点之后才创建的远程仓库回到创建时的空状态(对象库只增不减, 不能删除)
+        saved = dict(target.network)
+        for url, repo in self.network.items() if network else ():
+            if url in saved:
+                repo.restore(saved[url], network=False)
+            elif repo._pristine is not None:
+                repo.restore(repo._pristine, network=False)
+        state['stashes'] = list(target.stashes)
+        # 已暂存 = 暂存区与 HEAD 不同的路径
+        head_tree = self._commit_tree(self._head())
+        index.staged = {path for path, _, _ in objects.diff_trees(head_tree, target.index)}
+
+        if state['repo_initialized'] != was_initialized:
+            self._emit('init')
+        if self._head() != old_head:
+            self._emit('head', old=old_head, new=self._head())
+        self._set_conflict(target.conflict)
 
     # ---- 辅助方法 ----
-    def _generate_commit_hash(self) -> str:
-        """生成随机的commit hash"""
-        import random
-        import string
-        return ''.join(random.choices('0123456789abcdef', k=self._commit_hash_length))
-
-    def _get_latest_commit_hash(self) -> str:
-        """获取最新的commit hash"""
-        if self._state['commits']:
-            return self._state['commits'][-1]['hash']
-        return '0' * self._commit_hash_length
+    def _head(self) -> Optional[str]:
+        """当前分支指向的提交哈希"""
+        return self._state['branches'].get(self._state['current_branch'])
+
+    def _update_head(self, commit_hash: Optional[str]) -> None:
+        old = self._head()
+        self._state['branches'][self._state['current_branch']] = commit_hash
+        if old != commit_hash:
+            self._emit('head', old=old, new=commit_hash)
+
+    def _short(self, sha: str) -> str:
+        """最短的无歧义缩写, 至少 _commit_hash_length 位"""
+        objects = self._state['objects']
+        length = self._commit_hash_length
+        while length < len(sha) and len(objects.find_prefix(sha[:length])) > 1:
+            length += 1
+        return sha[:length]
+
+    def _commit_tree(self, commit_hash: Optional[str]) -> Optional[str]:
+        """提交对应的目录树哈希"""
+        if commit_hash is None:
+            return None
+        return self._state['objects'].get(commit_hash).tree
+
+    def _write_commit(self, tree: str, parents, message: str,
+                      author: str = AUTHOR, timestamp: Optional[int] = None) -> str:
+        if timestamp is None:
+            timestamp = self.frozen_time if self.frozen_time is not None else int(datetime.now().timestamp())
+        commit_hash = self._state['objects'].write_commit(tree, parents, message, author, timestamp)
+        self._graph.add(commit_hash)
+        return commit_hash
+
+    def _resolve(self, rev: str) -> Optional[str]:
+        """把 HEAD/分支/标签/stash@{n}/(缩写)哈希 以及 ~n、^n 后缀解析为提交哈希
+
+        缩写哈希对应多个提交时抛出 AmbiguousRevision。
+        """
+        match = _REV.fullmatch(rev)
+        if match is None:
+            return None
+        name, steps = match.groups()
+        if name in ('HEAD', '@'):
+            sha = self._head()
+        elif name in self._state['branches']:
+            sha = self._state['branches'][name]
+        elif name in self._state['tags']:
+            sha = self._state['tags'][name]
+        elif name in self._state['remote_branches']:
+            sha = self._state['remote_branches'][name]
+        elif name == 'stash' or _STASH_REF.fullmatch(name):
+            sha = self._stash_commit(name)
+        else:
+            sha = self._find_commit(name)
+        objects = self._state['objects']
+        for op, num in _REV_STEP.findall(steps):
+            count = int(num) if num else 1
+            if op == '~':
+                # ~n: 沿第一父提交后退 n 步
+                for _ in range(count):
+                    if sha is None:
+                        return None
+                    parents = objects.get(sha).parents
+                    sha = parents[0] if parents else None
+            elif count and sha is not None:
+                # ^n: 第 n 个父提交, ^0 为提交本身
+                parents = objects.get(sha).parents
+                sha = parents[count - 1] if count <= len(parents) else None
+            if sha is None:
+                return None
+        return sha
+
+    def _find_commit(self, prefix: str) -> Optional[str]:
+        """按(缩写)哈希查找提交, 至少 4 位"""
+        prefix = prefix.lower()
+        if not _HEX.fullmatch(prefix):
+            return None
+        objects = self._state['objects']
+        commits = [sha for sha in objects.find_prefix(prefix)
+                   if objects.get(sha).type == 'commit']
+        if len(commits) > 1:
+            raise AmbiguousRevision(prefix, commits)
+        return commits[0] if commits else None
+
+    def _ambiguous_error(self, exc: AmbiguousRevision) -> str:
+        objects = self._state['objects']
+        lines = [f"error: short object ID {exc.prefix} is ambiguous", "hint: The candidates are:"]
+        for sha in exc.candidates:
+            commit = objects.get(sha)
+            date = datetime.fromtimestamp(commit.timestamp).strftime("%Y-%m-%d")
+            lines.append(f"hint:   {self._short(sha)} commit {date} - {commit.message.splitlines()[0]}")
+        lines.append(f"fatal: ambiguous argument '{exc.prefix}': unknown revision or path not in the working tree.")
+        return "\n".join(lines)
+
+    def _stage(self, path: str, head_tree: Optional[str]) -> None:
+        """把工作区中的文件(或删除)写入暂存区; head_tree 为 HEAD 的目录树, 批量暂存时只需查一次"""
+        working_dir = self._state['working_dir']
+        index = self._state['index']
+        if path in working_dir:
+            content = working_dir[path]
+            index.set(path, self._state['objects'].write_blob(content), content)
+        else:
+            index.set(path, None)
+        working_dir.dirty.discard(path)
+        index.mark(path, self._state['objects'].lookup_path(head_tree, path))
+
+    def _write_file(self, path: str, blob: Optional[str]) -> None:
+        """把 blob 写入工作区和暂存区, 两者保持一致"""
+        working_dir = self._state['working_dir']
+        index = self._state['index']
+        if blob is None:
+            working_dir.pop(path, None)
+            index.set(path, None)
+        else:
+            content = self._state['objects'].read_blob(blob)
+            working_dir[path] = content
+            index.set(path, blob, content)
+        working_dir.dirty.discard(path)
+        index.staged.discard(path)
+
+    def _apply_changes(self, old_tree: Optional[str], new_tree: Optional[str]) -> Dict[str, Optional[str]]:
+        """把 old_tree -> new_tree 的差异应用到工作区和暂存区, 返回 {路径: blob哈希}"""
+        changes = {}
+        for path, _, blob in self._state['objects'].diff_trees(old_tree, new_tree):
+            changes[path] = blob
+            self._write_file(path, blob)
+        return changes
+
+    def _commit_changes(self, changes: Dict[str, Optional[str]], message: str) -> str:
+        """基于 HEAD 的目录树写入变更并提交"""
+        head = self._head()
+        tree = self._state['objects'].update_tree(self._commit_tree(head), changes)
+        commit_hash = self._write_commit(tree, (head,) if head else (), message)
+        self._update_head(commit_hash)
+        return commit_hash
+
+    def _checkout_commit(self, old: Optional[str], new: Optional[str]) -> None:
+        """把工作区中被跟踪的文件从 old 切换到 new 的版本"""
+        self._apply_changes(self._commit_tree(old), self._commit_tree(new))
+
+    def iter_commits(self, rev: str = 'HEAD') -> Iterator[tuple]:
+        """按时间倒序遍历 rev 可达的所有提交, 产出 (哈希, Commit)"""
+        objects = self._state['objects']
+        start = self._resolve(rev)
+        if start is None:
+            return
+        seen = {start}
+        queue = [(-objects.get(start).timestamp, 0, start)]
+        counter = 1
+        while queue:
+            _, _, sha = heapq.heappop(queue)
+            commit: Commit = objects.get(sha)
+            yield sha, commit
+            for parent in commit.parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(queue, (-objects.get(parent).timestamp, counter, parent))
+                    counter += 1
 
     # ---- 暂未实现的命令 ----
-    def _cmd_diff(self, args) -> str:
-        pass
-        
-    def _cmd_config(self, args) -> str:
-        pass
-        
     def _cmd_show(self, args) -> str:
         pass
         
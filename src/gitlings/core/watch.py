@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Set
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from .catalog import Catalog
+
+# 练习目录中影响显示内容的文件
+EXERCISE_FILES = ("meta.toml", "exercise.md", "hint.md")
+# .git 中与验证条件有关的文件: HEAD、引用以及表示进行中的合并等操作的标记
+_GIT_STATE_FILES = ("HEAD", "packed-refs", "MERGE_HEAD", "CHERRY_PICK_HEAD", "REVERT_HEAD")
+
+
+class Coalescer:
+    """把一连串触发合并为一次回调
+
+    最后一次触发后 delay 秒内没有新的触发才调用 callback(items);
+    持续不断的触发最多推迟 max_delay 秒。callback 在定时器线程中调用。
+    """
+
+    def __init__(self, delay: float, callback: Callable[[Set], None],
+                 max_delay: Optional[float] = None):
+        self.delay = delay
+        self.max_delay = max_delay if max_delay is not None else delay * 10
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._pending: Set = set()
+        self._first = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, item) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if not self._pending:
+                self._first = now
+            self._pending.add(item)
+            if self._timer is not None:
+                self._timer.cancel()
+            delay = min(self.delay, max(self._first + self.max_delay - now, 0))
+            self._timer = threading.Timer(delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self) -> None:
+        with self._lock:
+            items, self._pending = self._pending, set()
+            self._timer = None
+        if items:
+            self.callback(items)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+            self._pending = set()
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, on_path: Callable[[str], None]):
+        self.on_path = on_path
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        self.on_path(os.fsdecode(event.src_path))
+        dest = getattr(event, 'dest_path', '')
+        if dest:
+            # 编辑器和 git 都是先写临时文件再改名
+            self.on_path(os.fsdecode(dest))
+
+
+class ExerciseWatcher:
+    """监视练习目录, 只重新加载改动过的练习
+
+    meta.toml 改动时由 Catalog.refresh 重新解析; 说明或提示改动时丢弃已加载的内容。
+    on_change(keys) 在定时器线程中调用, keys 为内容确实发生变化的练习。
+    """
+
+    def __init__(self, catalog: Catalog, on_change: Callable[[Set[str]], None],
+                 delay: float = 0.2):
+        self.catalog = catalog
+        self.on_change = on_change
+        self._coalescer = Coalescer(delay, self._reload)
+        self._observer = None
+
+    def start(self) -> None:
+        self._observer = Observer()
+        self._observer.schedule(_Handler(self._on_path), str(self.catalog.root), recursive=True)
+        self._observer.start()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._coalescer.cancel()
+
+    def _on_path(self, path: str) -> None:
+        try:
+            parts = Path(path).relative_to(self.catalog.root).parts
+        except ValueError:
+            return
+        # 分类/练习 目录本身(新增、删除、改名)或其中的练习文件
+        if len(parts) == 2 or (len(parts) == 3 and parts[2] in EXERCISE_FILES):
+            self._coalescer.add((f"{parts[0]}/{parts[1]}", parts[2] if len(parts) == 3 else None))
+
+    def _reload(self, items: Set) -> None:
+        changed = set()
+        for key, name in items:
+            if name in (None, "meta.toml"):
+                if self.catalog.refresh(key):
+                    changed.add(key)
+            elif key in self.catalog:
+                self.catalog.invalidate(key)
+                changed.add(key)
+        if changed:
+            self.on_change(changed)
+
+
+class RepoWatcher:
+    """监视真实仓库的 .git 目录, 引用或合并状态变化时调用 on_change()
+
+    对象库、日志和锁文件的变化被忽略; 一次 git 命令产生的一串事件只触发一次回调。
+    仓库尚未初始化时先监视沙箱目录本身, 等 .git 出现后再开始监视。
+    """
+
+    def __init__(self, repo_path: Path, on_change: Callable[[], None], delay: float = 0.2):
+        self.path = Path(repo_path)
+        self.git_dir = self.path / ".git"
+        self.on_change = on_change
+        self._coalescer = Coalescer(delay, lambda items: self.on_change())
+        self._handler = _Handler(self._on_path)
+        self._observer = None
+        self._watching_git_dir = False
+
+    def start(self) -> None:
+        self._observer = Observer()
+        self._observer.schedule(self._handler, str(self.path), recursive=False)
+        self._observer.start()
+        self._watch_git_dir()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._coalescer.cancel()
+
+    def _watch_git_dir(self) -> None:
+        if not self._watching_git_dir and self.git_dir.is_dir():
+            self._watching_git_dir = True
+            self._observer.schedule(self._handler, str(self.git_dir), recursive=True)
+
+    def _on_path(self, path: str) -> None:
+        path = Path(path)
+        if path == self.git_dir:
+            self._watch_git_dir()
+            self._coalescer.add(None)
+            return
+        try:
+            rel = path.relative_to(self.git_dir).as_posix()
+        except ValueError:
+            return
+        if rel.endswith(".lock"):
+            return
+        if rel in _GIT_STATE_FILES or rel.startswith("refs/"):
+            self._coalescer.add(None)
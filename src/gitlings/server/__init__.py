@@ -0,0 +1,2 @@
+from .host import SessionBusy, SessionHost
+from .replay import ReplayReport, load_transcripts, replay
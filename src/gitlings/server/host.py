@@ -0,0 +1,196 @@
+import asyncio
+import json
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..core.journal import SessionJournal
+from ..core.runner import ExerciseRunner
+
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_.-]{0,63}$')
+
+
+class SessionBusy(Exception):
+    """会话的命令队列已满, 调用方应稍后重试"""
+
+
+class Session:
+    """一个学员的会话: 独立的 ExerciseRunner、按顺序执行的命令队列和预写日志"""
+
+    def __init__(self, session_id: str, runner: ExerciseRunner,
+                 journal: SessionJournal, queue_size: int):
+        self.id = session_id
+        self.runner = runner
+        self.journal = journal
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_active = time.monotonic()
+        self.worker: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            op, arg, future = await self.queue.get()
+            try:
+                if not future.done():
+                    future.set_result(self._dispatch(op, arg))
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            finally:
+                self.last_active = time.monotonic()
+                self.queue.task_done()
+            # 每条命令之后让出事件循环, 避免单个会话独占
+            await asyncio.sleep(0)
+
+    def _dispatch(self, op: str, arg: Any) -> Any:
+        if op == 'execute':
+            return self.journal.execute(self.runner, arg)
+        if op == 'verify':
+            return self.runner.verify()
+        if op == 'next':
+            return self.journal.next(self.runner)
+        raise ValueError(f"unknown op: {op}")
+
+
+class SessionHost:
+    """在一个进程内托管大量 ExerciseRunner/VirtualGit 会话
+
+    - 每个会话一个命令队列, 同一会话的命令按顺序执行
+    - 队列满时抛出 SessionBusy (背压)
+    - 空闲或超出 max_sessions 的会话被换出到 spill_dir, 下次访问时再换入
+    - 每条命令先写入会话日志, 进程崩溃后也能从快照 + 日志恢复
+    """
+
+    def __init__(self, exercises_dir: Path, spill_dir: Optional[Path] = None,
+                 max_sessions: int = 1000, queue_size: int = 16,
+                 idle_timeout: float = 300.0):
+        self.exercises_dir = exercises_dir
+        self.exercises = ExerciseRunner(exercises_dir).exercises
+        self.spill_dir = Path(spill_dir or tempfile.mkdtemp(prefix="gitlings-sessions-"))
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ---- 会话管理 ----
+    def _load_session(self, session_id: str) -> Session:
+        runner = ExerciseRunner(self.exercises_dir, self.exercises)
+        journal = SessionJournal(self.spill_dir / session_id)
+        journal.resume(runner)
+        return Session(session_id, runner, journal, self.queue_size)
+
+    def _get_session(self, session_id: str) -> Session:
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"invalid session id: {session_id!r}")
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            return session
+
+        self._evict_overflow()
+        session = self._load_session(session_id)
+        session.worker = asyncio.get_running_loop().create_task(session.run())
+        self._sessions[session_id] = session
+        return session
+
+    def _evict_overflow(self) -> None:
+        """为新会话腾出位置: 按最近最少使用换出空闲会话"""
+        for session_id in list(self._sessions):
+            if len(self._sessions) < self.max_sessions:
+                break
+            if self._sessions[session_id].queue.empty():
+                self.evict(session_id)
+
+    def evict(self, session_id: str) -> bool:
+        """把会话写入磁盘并从内存中移除"""
+        session = self._sessions.get(session_id)
+        if session is None or not session.queue.empty():
+            return False
+        del self._sessions[session_id]
+        if session.worker is not None:
+            session.worker.cancel()
+        session.journal.checkpoint(session.runner)
+        session.journal.close()
+        return True
+
+    def evict_idle(self) -> int:
+        deadline = time.monotonic() - self.idle_timeout
+        idle = [sid for sid, s in self._sessions.items() if s.last_active < deadline]
+        return sum(self.evict(sid) for sid in idle)
+
+    async def run_evictor(self, interval: float = 30.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    async def close(self) -> None:
+        """换出所有会话, 以便下次启动时恢复"""
+        for session_id in list(self._sessions):
+            await self._sessions[session_id].queue.join()
+            self.evict(session_id)
+
+    # ---- 命令接口 ----
+    async def submit(self, session_id: str, op: str, arg: Any = None) -> Any:
+        session = self._get_session(session_id)
+        future = asyncio.get_running_loop().create_future()
+        try:
+            session.queue.put_nowait((op, arg, future))
+        except asyncio.QueueFull:
+            raise SessionBusy(session_id)
+        session.last_active = time.monotonic()
+        return await future
+
+    async def execute(self, session_id: str, command: str) -> str:
+        return await self.submit(session_id, 'execute', command)
+
+    async def verify(self, session_id: str) -> Dict[str, bool]:
+        return await self.submit(session_id, 'verify')
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """处理一条请求: {"session": id, "op": "execute"|"verify"|"next", "command": ...}"""
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'request must be a JSON object'}
+        op = request.get('op', 'execute')
+        command = request.get('command')
+        if 'session' not in request:
+            return {'ok': False, 'error': 'missing field: session'}
+        if op == 'execute' and not isinstance(command, str):
+            return {'ok': False, 'error': 'command must be a string'}
+        try:
+            result = await self.submit(str(request['session']), op, command)
+            return {'ok': True, 'result': result}
+        except SessionBusy:
+            return {'ok': False, 'error': 'busy'}
+        except ValueError as exc:
+            return {'ok': False, 'error': str(exc)}
+        except Exception as exc:
+            # 命令实现中的意外异常不能让连接断开
+            return {'ok': False, 'error': f"{type(exc).__name__}: {exc}"}
+
+    # ---- 网络协议: 每行一个 JSON 请求/响应 ----
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    response = {'ok': False, 'error': 'invalid json'}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def serve_unix(self, path: str) -> asyncio.AbstractServer:
+        return await asyncio.start_unix_server(self.handle_connection, path)
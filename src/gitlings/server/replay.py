@@ -0,0 +1,121 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from ..core.journal import JOURNAL_FILE, SNAPSHOT_FILE, dump_snapshot, read_history
+from ..core.runner import ExerciseRunner
+from .host import SessionBusy, SessionHost
+
+
+def load_transcripts(path: Path) -> List[List[str]]:
+    """读取录制的命令序列
+
+    - 会话目录(含 snapshot.bin/journal.bin)或其上级目录: 每个会话一份
+    - .json: 命令列表, 或命令列表的列表
+    - 其他文本文件: 每行一条命令, 空行和 # 开头的行忽略
+    """
+    path = Path(path)
+    if path.is_dir():
+        directories = [path] if _is_session_dir(path) else sorted(
+            child for child in path.iterdir() if child.is_dir() and _is_session_dir(child))
+        return [history for history in map(read_history, directories) if history]
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        data = json.loads(text)
+        if data and all(isinstance(item, str) for item in data):
+            return [data]
+        return [list(item) for item in data if item]
+    commands = [line.strip() for line in text.splitlines()]
+    return [[c for c in commands if c and not c.startswith("#")]]
+
+
+def _is_session_dir(path: Path) -> bool:
+    return any((path / name).exists() for name in (SNAPSHOT_FILE, JOURNAL_FILE))
+
+
+@dataclass
+class ReplayReport:
+    sessions: int
+    commands: int
+    elapsed: float
+    latencies: List[float] = field(repr=False)
+    busy: int = 0  # 因队列已满被拒绝的请求
+
+    @property
+    def throughput(self) -> float:
+        return self.commands / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def summary(self) -> dict:
+        return {
+            'sessions': self.sessions,
+            'commands': self.commands,
+            'busy': self.busy,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'p999': self.percentile(0.999),
+            'max': max(self.latencies, default=0.0),
+        }
+
+
+async def _drive(host: SessionHost, session_id: str, commands: List[str], verify: bool,
+                 latencies: List[float], report: ReplayReport) -> None:
+    for command in commands:
+        start = time.perf_counter()
+        try:
+            await host.execute(session_id, command)
+            if verify:
+                await host.verify(session_id)
+        except SessionBusy:
+            report.busy += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def replay(exercises_dir: Path, transcripts: List[List[str]], sessions: int,
+                 verify: bool = False, seed_git=None, spill_dir: Optional[Path] = None,
+                 max_sessions: int = 1000) -> ReplayReport:
+    """在一个 SessionHost 中并发运行 sessions 个会话, 第 i 个会话重放 transcripts[i % n]
+
+    给出 seed_git 时每个会话都从该仓库状态的副本开始。延迟从提交命令到收到结果,
+    包括排队、写日志和换入换出的时间。
+    """
+    own_dir = spill_dir is None
+    spill_dir = Path(spill_dir or tempfile.mkdtemp(prefix="gitlings-replay-"))
+    host = SessionHost(exercises_dir, spill_dir, max_sessions=max_sessions)
+    session_ids = [f"replay-{n}" for n in range(sessions)]
+    if seed_git is not None:
+        # 会话第一次被访问时从快照恢复, 与换出后再换入的会话走同一条路径
+        snapshot = dump_snapshot(ExerciseRunner(exercises_dir, host.exercises, git=seed_git))
+        for session_id in session_ids:
+            (spill_dir / session_id).mkdir(parents=True, exist_ok=True)
+            (spill_dir / session_id / SNAPSHOT_FILE).write_bytes(snapshot)
+
+    latencies: List[float] = []
+    report = ReplayReport(sessions, 0, 0.0, latencies)
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            _drive(host, session_id, transcripts[n % len(transcripts)], verify, latencies, report)
+            for n, session_id in enumerate(session_ids)
+        ))
+        report.elapsed = time.perf_counter() - start
+        report.commands = len(latencies)
+    finally:
+        await host.close()
+        if own_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+    return report
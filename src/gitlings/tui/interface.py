@@ -1,44 +1,83 @@
 # src/gitlings/tui/interface.py
+import threading
+from typing import Callable, Dict, List, Optional
+
+from textual import work
 from textual.app import App, ComposeResult
-from textual.widgets import Header, Footer, Static, Input, Button
-from textual.containers import Container, VerticalScroll
-from textual.reactive import reactive
-from rich.syntax import Syntax
+from textual.binding import Binding
+from textual.worker import get_current_worker
+from textual.widgets import Header, Footer, Static, Input
+from textual.containers import Container
 from rich.panel import Panel
 from rich.text import Text
 from rich.table import Table
+from gitlings.core.history import CommandHistory
+from .jobs import CommandJob
+from .scrollback import Scrollback
 
 class GitTerminal(Static):
     """自定义终端模拟器"""
-    content = reactive("")
     
-    def __init__(self, executor, *args, **kwargs):
+    def __init__(self, executor, *args, max_lines: int = 5000, **kwargs):
         super().__init__(*args, **kwargs)
         self.executor = executor
-        self.history = []
-        self.history_index = 0
         self.current_dir = "~/git-practice"
+        self.scrollback = Scrollback(max_lines)
+        # 从底部向上滚动的行数
+        self.view_offset = 0
+        # 后台命令输出满一页后暂停, 等待翻页
+        self.paging = False
         
     def on_mount(self) -> None:
         self.update_content("$ git status\nfatal: not a git repository (or any of the parent directories)")
     
+    @property
+    def content(self) -> str:
+        return self.scrollback.text()
+
+    @property
+    def view_height(self) -> int:
+        return max(self.size.height - 2, 1)
+
     def update_content(self, new_text: str) -> None:
-        self.content += "\n" + new_text
+        self.scrollback.append(new_text)
+        self.view_offset = 0
         self.refresh()
-    
+
+    def scroll_lines(self, delta: int) -> None:
+        """正数向上翻看历史, 负数向下"""
+        limit = max(len(self.scrollback) - self.view_height, 0)
+        self.view_offset = min(max(self.view_offset + delta, 0), limit)
+        self.refresh()
+
+    def on_mouse_scroll_up(self, event) -> None:
+        self.scroll_lines(3)
+
+    def on_mouse_scroll_down(self, event) -> None:
+        self.scroll_lines(-3)
+
+    @property
+    def page_size(self) -> int:
+        # 去掉面板上下边框
+        return max(self.size.height - 2, 10)
+
+    def show_output(self, text: str, paused: bool = False) -> None:
+        """追加后台命令的一段输出, paused 表示满一页后等待翻页"""
+        self.paging = paused
+        self.update_content(text)
+
+    def end_paging(self) -> None:
+        self.paging = False
+        self.refresh()
+
     def render(self) -> Panel:
-        syntax = Syntax(
-            self.content, 
-            "bash", 
-            theme="monokai", 
-            line_numbers=False,
-            word_wrap=True
-        )
+        # 只渲染可见窗口内的行, 每个输出块的高亮结果会被缓存
+        lines = self.scrollback.window(self.view_height, self.view_offset)
         return Panel(
-            syntax,
+            Text("\n").join(lines),
             title=f"Git Terminal - {self.current_dir}",
             border_style="blue",
-            subtitle="Press ↑/↓ for history"
+            subtitle="-- More -- (Enter: next page, q: quit)" if self.paging else "Press ↑/↓ for history"
         )
 
 class ExercisePanel(Static):
@@ -46,6 +85,17 @@ class ExercisePanel(Static):
     def __init__(self, exercise, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.exercise = exercise
+        # 最近一次后台验证的结果: 描述 -> 是否通过
+        self.results: Dict[str, bool] = {}
+
+    def show_exercise(self, exercise) -> None:
+        """练习被修改后重新显示"""
+        self.exercise = exercise
+        self.refresh()
+
+    def show_results(self, results: Dict[str, bool]) -> None:
+        self.results = results
+        self.refresh()
     
     def render(self) -> Panel:
         table = Table.grid(padding=(0, 2))
@@ -54,6 +104,8 @@ class ExercisePanel(Static):
         
         table.add_row("Exercise:", self.exercise['name'])
         table.add_row("Objective:", Text(self.exercise['description'], style="green"))
+        for desc, passed in self.results.items():
+            table.add_row("", Text(f"✓ {desc}", style="green") if passed else Text(f"◻ {desc}", style="cyan"))
         
         return Panel(
             table,
@@ -62,6 +114,11 @@ class ExercisePanel(Static):
         )
 
 class GitlingsApp(App):
+    # 仅在有命令执行时生效(见 check_action), 否则 Ctrl-C 仍按 Textual 默认处理
+    BINDINGS = [Binding("ctrl+c", "cancel_command", "Cancel", priority=True)]
+    # 最后一条命令结束后等待多久再在后台重新验证
+    VERIFY_DELAY = 0.3
+
     CSS = """
     Screen {
         layout: grid;
@@ -94,10 +151,22 @@ class GitlingsApp(App):
     }
     """
 
-    def __init__(self, git_executor, exercise_data):
+    def __init__(self, git_executor, exercise_data, history: CommandHistory = None,
+                 verifier: Optional[Callable[[], Dict[str, bool]]] = None, watchers=()):
         super().__init__()
         self.git_executor = git_executor
         self.exercise_data = exercise_data
+        self.history = history if history is not None else CommandHistory()
+        self.verifier = verifier
+        # 命令和验证都在工作线程中执行, 共用一把锁串行访问 git 状态
+        self._lock = threading.Lock()
+        self._jobs: List[CommandJob] = []
+        self._verify_timer = None
+        # 文件监视器(core.watch), 随界面启动和停止
+        self.watchers = list(watchers)
+        self._navigating = False
+        # 反向搜索状态: [查询, 匹配位置, 匹配的命令], 不在搜索时为 None
+        self._search = None
     
     def compose(self) -> ComposeResult:
         yield Header()
@@ -109,17 +178,176 @@ class GitlingsApp(App):
         yield Footer()
     
     async def on_input_submitted(self, event: Input.Submitted) -> None:
-        if event.value:
-            terminal = self.query_one(GitTerminal)
-            result = self.git_executor(event.value)
-            terminal.update_content(f"$ {event.value}\n{result}")
+        terminal = self.query_one(GitTerminal)
+        value = event.value
+        self._navigating = False
+        if self._search is not None:
+            # 回车执行搜索到的命令
+            value = self._search[2] or ""
+            self._end_search()
+        if terminal.paging and value in ("", "q"):
+            # 分页中: 回车翻页, q 退出
+            if value:
+                self._cancel_jobs()
+            else:
+                self._next_page()
             self.query_one(Input).value = ""
             terminal.scroll_end()
+            return
+        if value:
+            if terminal.paging:
+                # 分页中输入新命令时结束上一条
+                self._cancel_jobs()
+            self.history.append(value)
+            terminal.update_content(f"$ {value}")
+            job = CommandJob(self.git_executor, value, self._lock,
+                             self._on_job_output, terminal.page_size)
+            self._jobs.append(job)
+            self._run_job(job)
+            self.query_one(Input).value = ""
+            terminal.scroll_end()
+
+    # ---- 后台命令 ----
+    @work(thread=True, group="commands")
+    def _run_job(self, job: CommandJob) -> None:
+        completed = job.run()
+        self.call_from_thread(self._job_finished, job, completed)
+
+    def _on_job_output(self, text: str, paused: bool) -> None:
+        # 在工作线程中调用, 查找组件也要回到事件循环中进行
+        self.call_from_thread(self._show_job_output, text, paused)
+
+    def _show_job_output(self, text: str, paused: bool) -> None:
+        self.query_one(GitTerminal).show_output(text, paused)
+
+    def _job_finished(self, job: CommandJob, completed: bool) -> None:
+        if job in self._jobs:
+            self._jobs.remove(job)
+        self.refresh_bindings()
+        if completed:
+            self._schedule_verify()
+
+    def _next_page(self) -> None:
+        self.query_one(GitTerminal).end_paging()
+        for job in self._jobs:
+            if job.paused:
+                job.more()
+
+    def _cancel_jobs(self) -> None:
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+        self.query_one(GitTerminal).end_paging()
+        self.refresh_bindings()
+
+    def check_action(self, action: str, parameters) -> Optional[bool]:
+        if action == "cancel_command":
+            return bool(self._jobs)
+        return True
+
+    def action_cancel_command(self) -> None:
+        self._cancel_jobs()
+        self.query_one(GitTerminal).update_content("^C")
+
+    def on_mount(self) -> None:
+        for watcher in self.watchers:
+            watcher.start()
+
+    def on_unmount(self) -> None:
+        for watcher in self.watchers:
+            watcher.stop()
+        # 退出时释放等待翻页的工作线程
+        for job in self._jobs:
+            job.cancel()
+
+    # ---- 后台验证 ----
+    def _schedule_verify(self) -> None:
+        """每条命令结束后重新计时, 连续输入命令时只在最后验证一次"""
+        if self.verifier is None:
+            return
+        if self._verify_timer is not None:
+            self._verify_timer.stop()
+        self._verify_timer = self.set_timer(self.VERIFY_DELAY, self._verify)
+
+    def _verify(self) -> None:
+        self._verify_timer = None
+        self._run_verify()
+
+    @work(thread=True, exclusive=True, group="verify")
+    def _run_verify(self) -> None:
+        with self._lock:
+            results = self.verifier()
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(self._show_results, results)
+
+    # ---- 外部改动 ----
+    def show_exercise(self, exercise_data) -> None:
+        self.exercise_data = exercise_data
+        self.query_one(ExercisePanel).show_exercise(exercise_data)
+
+    def external_change(self, apply: Callable[[], Optional[Dict[str, bool]]]) -> None:
+        """由文件监视线程调用: 在工作线程中持锁执行 apply(同步状态, 返回验证结果)"""
+        self.call_from_thread(self._run_external, apply)
+
+    @work(thread=True, group="external")
+    def _run_external(self, apply: Callable[[], Optional[Dict[str, bool]]]) -> None:
+        with self._lock:
+            results = apply()
+        if results is not None:
+            self.call_from_thread(self._show_results, results)
+
+    def _show_results(self, results: Dict[str, bool]) -> None:
+        self.query_one(ExercisePanel).show_results(results)
+        if results and all(results.values()):
+            self.notify("All checks passed!")
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if self._search is not None and event.value != self._search[0]:
+            self._search = [event.value, None, None]
+            self._search_step()
+
+    def _search_step(self) -> None:
+        """从上一个匹配处继续向旧的方向搜索, 跳过相同的命令"""
+        query, before, current = self._search
+        found = self.history.search(query, before)
+        while found and found[1] == current:
+            found = self.history.search(query, found[0])
+        if found:
+            self._search = [query, found[0], found[1]]
+        self.sub_title = f"(reverse-i-search)`{query}': {self._search[2] or ''}"
+
+    def _end_search(self) -> None:
+        self._search = None
+        self.sub_title = ""
+
+    def _show_history_entry(self, entry) -> None:
+        if entry is None:
+            return
+        input_widget = self.query_one(Input)
+        input_widget.value = entry
+        input_widget.cursor_position = len(entry)
     
     def on_key(self, event):
         terminal = self.query_one(GitTerminal)
-        if event.key == "up":
-            # 实现命令历史记录导航
-            pass
-        elif event.key == "down":
-            pass
+        if event.key == "ctrl+r":
+            if self._search is None:
+                self._search = [self.query_one(Input).value, None, None]
+            self._search_step()
+            event.stop()
+        elif event.key == "escape" and self._search is not None:
+            self._end_search()
+            self.query_one(Input).value = ""
+        elif event.key == "pagedown" and terminal.paging:
+            self._next_page()
+        elif event.key == "pageup":
+            terminal.scroll_lines(terminal.view_height)
+        elif event.key == "pagedown":
+            terminal.scroll_lines(-terminal.view_height)
+        elif event.key == "up":
+            # 以开始导航时已输入的内容作为前缀
+            if not self._navigating:
+                self.history.reset(self.query_one(Input).value)
+                self._navigating = True
+            self._show_history_entry(self.history.previous())
+        elif event.key == "down" and self._navigating:
+            self._show_history_entry(self.history.next())
@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Callable, Iterator, List, Union
+
+Executor = Callable[[str], Union[str, Iterator[str]]]
+
+
+class CommandJob:
+    """在后台线程中执行的一条命令, 输出逐页交给界面
+
+    - 所有命令共用同一把锁, 模拟器的状态不会被两个线程同时修改
+    - 输出块累积满一页, 或距上次刷新超过 flush_interval 时交给 on_output;
+      满一页后暂停, 直到界面调用 more() (分页)
+    - cancel() 之后在下一个输出块处停止并关闭迭代器(RealGit 会因此终止 git 进程);
+      已经开始的单次 run_command 无法中断, 它的输出会被丢弃
+    on_output(text, paused) 在工作线程中调用, 由界面负责转回事件循环。
+    """
+
+    def __init__(self, executor: Executor, command: str, lock: threading.Lock,
+                 on_output: Callable[[str, bool], None], page_size: int = 40,
+                 flush_interval: float = 0.05):
+        self.executor = executor
+        self.command = command
+        self.lock = lock
+        self.on_output = on_output
+        self.page_size = max(page_size, 1)
+        self.flush_interval = flush_interval
+        self.paused = False
+        self._cancelled = threading.Event()
+        self._more = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self._more.set()
+
+    def more(self) -> None:
+        """显示下一页"""
+        self._more.set()
+
+    def run(self) -> bool:
+        """在工作线程中执行, 返回命令是否完整结束(未被取消)"""
+        with self.lock:
+            if self.cancelled:
+                return False
+            result = self.executor(self.command)
+            chunks = iter([result]) if isinstance(result, str) else result
+            try:
+                return self._pump(chunks)
+            finally:
+                close = getattr(chunks, 'close', None)
+                if close is not None:
+                    close()
+
+    def _pump(self, chunks: Iterator[str]) -> bool:
+        page = 0  # 当前页已经显示的行数
+        pending: List[str] = []
+        flushed = time.monotonic()
+        for chunk in chunks:
+            if self.cancelled:
+                return False
+            pending.extend(chunk.split("\n"))
+            while page + len(pending) >= self.page_size:
+                take = self.page_size - page
+                self._emit(pending[:take], paused=True)
+                pending, page = pending[take:], 0
+                if not self._wait_more():
+                    return False
+                flushed = time.monotonic()
+            if pending and time.monotonic() - flushed >= self.flush_interval:
+                self._emit(pending, paused=False)
+                page += len(pending)
+                pending, flushed = [], time.monotonic()
+        if self.cancelled:
+            return False
+        if pending:
+            self._emit(pending, paused=False)
+        return True
+
+    def _emit(self, lines: List[str], paused: bool) -> None:
+        if not self.cancelled:
+            self.paused = paused
+            self.on_output("\n".join(lines), paused)
+
+    def _wait_more(self) -> bool:
+        self._more.wait()
+        self._more.clear()
+        self.paused = False
+        return not self.cancelled
@@ -1,12 +1,24 @@
+import sys
+import threading
+from textual import work
 from textual.app import App, ComposeResult
+from textual.binding import Binding
 from textual.containers import Container, ScrollableContainer
-from textual.widgets import Header, Footer, Static, Button, Input
+from textual.message import Message
+from textual.widgets import Static, Button, Input
+from textual.worker import get_current_worker
 from rich.panel import Panel
 from rich.table import Table
-from rich.text import Text
-from typing import Dict
+from typing import Dict, List, Optional
+
+from .jobs import CommandJob
 
 class ExerciseScreen(ScrollableContainer):
+
+    class CheckChanged(Message):
+        def __init__(self, check) -> None:
+            super().__init__()
+            self.check = check
     
     def __init__(self, runner, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -23,13 +35,10 @@ class ExerciseScreen(ScrollableContainer):
             )
         )
         
-        table = Table.grid(padding=(0, 2))
-        table.add_column("验证条件", style="cyan")
-        for check in exercise.checks:
-            _, desc = check.split("@")
-            table.add_row(f"◻ {desc.strip()}")
-        
-        yield Static(Panel.fit(table, title="验证条件"))
+        # 验证条件随每条命令实时更新
+        yield Static("[b]验证条件[/b]")
+        for i, check in enumerate(self.runner.checks.checks):
+            yield Static(self._check_label(check), id=f"check-{i}")
         
         yield Static("\n输入Git命令或选择操作:", classes="prompt")
         yield Input(placeholder="输入git命令...", id="command_input")
@@ -42,7 +51,32 @@ class ExerciseScreen(ScrollableContainer):
         
         yield Static(id="output", markup=False)
 
+    def on_mount(self) -> None:
+        self.runner.checks.on_change.append(self._on_check_change)
+
+    def on_unmount(self) -> None:
+        if self._on_check_change in self.runner.checks.on_change:
+            self.runner.checks.on_change.remove(self._on_check_change)
+
+    def _check_label(self, check) -> str:
+        if check.passed:
+            return f"[green]✓[/] {check.desc}"
+        return f"[cyan]◻ {check.desc}[/]"
+
+    def _on_check_change(self, check) -> None:
+        # 命令在工作线程中执行, 通过消息回到事件循环再更新界面
+        self.post_message(self.CheckChanged(check))
+
+    def on_exercise_screen_check_changed(self, message: "ExerciseScreen.CheckChanged") -> None:
+        check = message.check
+        index = self.runner.checks.checks.index(check)
+        self.query_one(f"#check-{index}", Static).update(self._check_label(check))
+
 class GitlingsApp(App):
+    # 仅在有命令执行时生效(见 check_action)
+    BINDINGS = [Binding("ctrl+c", "cancel_command", "Cancel", priority=True)]
+    # 最后一条命令结束后等待多久再在后台重新验证
+    VERIFY_DELAY = 0.3
     
     CSS = """
     Screen {
@@ -63,42 +97,130 @@ class GitlingsApp(App):
     def __init__(self, runner):
         super().__init__()
         self.runner = runner
+        # 命令和验证在工作线程中执行, 共用一把锁串行访问练习状态
+        self._lock = threading.Lock()
+        self._jobs: List[CommandJob] = []
+        self._verify_timer = None
+        self._all_passed = False
     
     def on_mount(self) -> None:
-        self.push_screen(ExerciseScreen(self.runner))
+        self.mount(ExerciseScreen(self.runner))
+
+    def on_unmount(self) -> None:
+        # 退出时通知仍在执行的命令停止
+        for job in self._jobs:
+            job.cancel()
     
     async def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "verify":
-            await self._run_verification()
+            self._run_verify(show=True)
         elif event.button.id == "hint":
             await self._show_hint()
         elif event.button.id == "next":
-            if self.runner.next():
-                self.push_screen(ExerciseScreen(self.runner))
-            else:
-                self.notify("🎉 恭喜完成所有练习!", severity="success")
+            self._cancel_jobs()
+            event.button.disabled = True
+            self._run_next()
     
     async def on_input_submitted(self, event: Input.Submitted) -> None:
         if event.value:
-            output = self.runner.execute(event.value)
-            await self.query_one("#output").update(output)
+            output = self.query_one("#output", Static)
+            lines = [f"$ {event.value}"]
+
+            def on_output(text: str, paused: bool) -> None:
+                # 在工作线程中调用
+                lines.append(text)
+                self.call_from_thread(output.update, "\n".join(lines))
+
+            # 输出区域不分页
+            job = CommandJob(self.runner.execute, event.value, self._lock, on_output,
+                             page_size=sys.maxsize)
+            self._jobs.append(job)
+            output.update(lines[0])
+            self._run_job(job)
             event.input.value = ""
-    
-    async def _run_verification(self):
-        results = self.runner.verify()
-        exercise = self.runner.current_exercise
-        
+
+    # ---- 后台命令 ----
+    @work(thread=True, group="commands")
+    def _run_job(self, job: CommandJob) -> None:
+        completed = job.run()
+        self.call_from_thread(self._job_finished, job, completed)
+
+    def _job_finished(self, job: CommandJob, completed: bool) -> None:
+        if job in self._jobs:
+            self._jobs.remove(job)
+        self.refresh_bindings()
+        if completed:
+            self._schedule_verify()
+
+    def _cancel_jobs(self) -> None:
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+        self.refresh_bindings()
+
+    def check_action(self, action: str, parameters) -> Optional[bool]:
+        if action == "cancel_command":
+            return bool(self._jobs)
+        return True
+
+    def action_cancel_command(self) -> None:
+        # 正在执行的单条模拟器命令无法中断, 取消后丢弃它的输出
+        self._cancel_jobs()
+        self.query_one("#output", Static).update("^C")
+
+    @work(thread=True, group="next")
+    def _run_next(self) -> None:
+        # 被取消的命令可能还没执行完, 在工作线程中等锁, 不阻塞界面
+        with self._lock:
+            more = self.runner.next()
+        self.call_from_thread(self._next_finished, more)
+
+    async def _next_finished(self, more: bool) -> None:
+        if more:
+            self._all_passed = False
+            await self.query_one(ExerciseScreen).remove()
+            await self.mount(ExerciseScreen(self.runner))
+        else:
+            self.query_one("#next", Button).disabled = False
+            self.notify("🎉 恭喜完成所有练习!", severity="success")
+
+    # ---- 后台验证 ----
+    def _schedule_verify(self) -> None:
+        """每条命令结束后重新计时, 连续输入命令时只在最后验证一次"""
+        if self._verify_timer is not None:
+            self._verify_timer.stop()
+        self._verify_timer = self.set_timer(self.VERIFY_DELAY, self._verify)
+
+    def _verify(self) -> None:
+        self._verify_timer = None
+        self._run_verify()
+
+    @work(thread=True, exclusive=True, group="verify")
+    def _run_verify(self, show: bool = False) -> None:
+        # 完整求值会补上事件没有覆盖到的改动, 验证条件标签通过 CheckChanged 更新
+        with self._lock:
+            results = self.runner.verify(full=True)
+        if not get_current_worker().is_cancelled:
+            self.call_from_thread(self._verified, results, show)
+
+    def _verified(self, results: Dict[str, bool], show: bool) -> None:
+        if show:
+            self._show_verification(results)
+        passed = bool(results) and all(results.values())
+        if passed and not self._all_passed:
+            self.notify("✓ 所有验证条件都已满足, 按「下一个」继续", severity="information")
+        self._all_passed = passed
+
+    def _show_verification(self, results: Dict[str, bool]) -> None:
         table = Table.grid(padding=(0, 2))
         table.add_column("验证结果", style="bold")
         
-        for check in exercise.checks:
-            _, desc = check.split("@")
-            desc = desc.strip()
-            status = "✓" if results.get(desc, False) else "✗"
+        for desc, passed in results.items():
+            status = "✓" if passed else "✗"
             color = "green" if status == "✓" else "red"
             table.add_row(f"[{color}]{status}[/] {desc}")
         
-        await self.query_one("#output").update(
+        self.query_one("#output", Static).update(
             Panel.fit(table, title="验证结果")
         )
     
@@ -106,6 +228,6 @@ class GitlingsApp(App):
         exercise = self.runner.current_exercise
         if exercise.hints:
             hint = exercise.hints[0]  # 简化版：只显示第一个提示
-            await self.query_one("#output").update(
+            self.query_one("#output", Static).update(
                 Panel.fit(f"[yellow]💡 提示:[/]\n\n{hint}", title="帮助")
             )
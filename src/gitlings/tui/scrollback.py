@@ -0,0 +1,81 @@
+from collections import deque
+from typing import Deque, List, Optional
+
+from rich.syntax import Syntax
+from rich.text import Text
+
+
+class Chunk:
+    """一次追加的输出(通常是一条命令及其结果), 高亮结果按需计算并缓存"""
+    __slots__ = ('lines', '_rendered')
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self._rendered: Optional[List[Text]] = None
+
+    def rendered(self, theme: str) -> List[Text]:
+        if self._rendered is None:
+            source = "\n".join(self.lines)
+            highlighted = Syntax(source, "bash", theme=theme).highlight(source)
+            # 每个源行对应一个渲染行, 末尾的空行也要保留
+            rendered = highlighted.split("\n", allow_blank=True)[:len(self.lines)]
+            rendered += [Text() for _ in range(len(self.lines) - len(rendered))]
+            self._rendered = rendered
+        return self._rendered
+
+    def trim(self, count: int) -> None:
+        """丢弃最前面的 count 行"""
+        self.lines = self.lines[count:]
+        if self._rendered is not None:
+            self._rendered = self._rendered[count:]
+
+
+class Scrollback:
+    """按行计数、有上限的回滚缓冲区
+
+    超出 max_lines 时丢弃最旧的行; 每个块只高亮一次,
+    渲染时只取可见窗口内的行。
+    """
+
+    def __init__(self, max_lines: int = 5000, theme: str = "monokai"):
+        self.max_lines = max_lines
+        self.theme = theme
+        self._chunks: Deque[Chunk] = deque()
+        self._line_count = 0
+
+    def __len__(self) -> int:
+        return self._line_count
+
+    def append(self, text: str) -> None:
+        lines = text.split("\n")
+        if len(lines) > self.max_lines:
+            lines = lines[-self.max_lines:]
+        self._chunks.append(Chunk(lines))
+        self._line_count += len(lines)
+        while self._line_count > self.max_lines:
+            oldest = self._chunks[0]
+            excess = self._line_count - self.max_lines
+            if excess >= len(oldest.lines):
+                self._chunks.popleft()
+                self._line_count -= len(oldest.lines)
+            else:
+                oldest.trim(excess)
+                self._line_count -= excess
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._line_count = 0
+
+    def window(self, height: int, offset: int = 0) -> List[Text]:
+        """从底部向上偏移 offset 行后, 可见的 height 行"""
+        need = height + offset
+        collected: List[Text] = []
+        for chunk in reversed(self._chunks):
+            collected[:0] = chunk.rendered(self.theme)
+            if len(collected) >= need:
+                break
+        end = len(collected) - offset
+        return collected[max(end - height, 0):max(end, 0)]
+
+    def text(self) -> str:
+        return "\n".join("\n".join(chunk.lines) for chunk in self._chunks)
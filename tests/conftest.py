@@ -0,0 +1,10 @@
+from pathlib import Path
+
+import pytest
+
+EXERCISES_DIR = Path(__file__).resolve().parent.parent / "src" / "exercises"
+
+
+@pytest.fixture
+def exercises_dir() -> Path:
+    return EXERCISES_DIR
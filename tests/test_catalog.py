@@ -0,0 +1,114 @@
+import json
+import os
+from pathlib import Path
+
+from gitlings.core.catalog import CATALOG_VERSION, Catalog
+
+PAST = 1_000_000_000
+
+
+def write_exercise(root: Path, key: str, name: str) -> None:
+    exercise = root / key
+    exercise.mkdir(parents=True, exist_ok=True)
+    (exercise / "meta.toml").write_text(
+        f'[exercise]\nname = "{name}"\ndifficulty = 1\n\n'
+        '[verification]\nchecks = ["repo_initialized @ 初始化"]\n',
+        encoding="utf-8",
+    )
+
+
+def age(root: Path) -> None:
+    """把目录和文件的 mtime 调到过去, 之后的改动一定能被察觉"""
+    for path in [root, *root.rglob("*")]:
+        os.utime(path, ns=(PAST, PAST))
+
+
+def catalog_root(tmp_path: Path) -> Path:
+    root = tmp_path / "exercises"
+    write_exercise(root, "basic/01_init", "Init")
+    write_exercise(root, "basic/02_commit", "Commit")
+    age(root)
+    return root
+
+
+def test_warm_load_uses_cache_without_stat(tmp_path, monkeypatch):
+    root = catalog_root(tmp_path)
+    Catalog(root, tmp_path / "cache")
+    stat = Path.stat
+
+    def no_meta_stat(self, *args, **kwargs):
+        assert self.name != "meta.toml"
+        return stat(self, *args, **kwargs)
+    monkeypatch.setattr(Path, "stat", no_meta_stat)
+    catalog = Catalog(root, tmp_path / "cache")
+    assert catalog.keys() == ["basic/01_init", "basic/02_commit"]
+    assert catalog.get("basic/01_init").name == "Init"
+
+
+def test_added_and_removed_exercises_are_detected(tmp_path):
+    root = catalog_root(tmp_path)
+    Catalog(root, tmp_path / "cache")
+    write_exercise(root, "basic/03_branch", "Branch")
+    write_exercise(root, "advanced/01_rebase", "Rebase")
+    assert Catalog(root, tmp_path / "cache").keys() == [
+        "advanced/01_rebase", "basic/01_init", "basic/02_commit", "basic/03_branch",
+    ]
+    age(root)
+    (root / "basic/02_commit/meta.toml").unlink()
+    (root / "basic/02_commit").rmdir()
+    assert "basic/02_commit" not in Catalog(root, tmp_path / "cache")
+
+
+def test_in_place_edit_needs_scan_or_refresh(tmp_path):
+    root = catalog_root(tmp_path)
+    Catalog(root, tmp_path / "cache")
+    write_exercise(root, "basic/01_init", "Init (edited)")
+    # 目录的 mtime 没变, 默认沿用缓存
+    assert Catalog(root, tmp_path / "cache").get("basic/01_init").name == "Init"
+    assert Catalog(root, tmp_path / "cache", scan=True).get("basic/01_init").name == "Init (edited)"
+
+    write_exercise(root, "basic/02_commit", "Commit (edited)")
+    catalog = Catalog(root, tmp_path / "cache")
+    assert catalog.refresh("basic/02_commit")
+    assert catalog.get("basic/02_commit").name == "Commit (edited)"
+    assert Catalog(root, tmp_path / "cache").get("basic/02_commit").name == "Commit (edited)"
+
+
+def test_only_changed_exercises_are_parsed(tmp_path, monkeypatch):
+    root = catalog_root(tmp_path)
+    Catalog(root, tmp_path / "cache")
+    write_exercise(root, "basic/02_commit", "Commit (edited)")
+    write_exercise(root, "basic/03_branch", "Branch")
+    parsed = []
+    parse = Catalog._parse
+
+    def recording_parse(self, key, mtime):
+        parsed.append(key)
+        return parse(self, key, mtime)
+    monkeypatch.setattr(Catalog, "_parse", recording_parse)
+    catalog = Catalog(root, tmp_path / "cache")
+    assert sorted(parsed) == ["basic/02_commit", "basic/03_branch"]
+    assert catalog.get("basic/02_commit").name == "Commit (edited)"
+
+
+def test_unusable_cache_is_rebuilt(tmp_path):
+    root = catalog_root(tmp_path)
+    catalog = Catalog(root, tmp_path / "cache")
+    for content in ("not json", '{"version": 1, "exercises": {}}'):
+        catalog.cache_path.write_text(content, encoding="utf-8")
+        assert Catalog(root, tmp_path / "cache").keys() == ["basic/01_init", "basic/02_commit"]
+        assert json.loads(catalog.cache_path.read_text(encoding="utf-8"))['version'] == CATALOG_VERSION
+
+
+def test_details_are_loaded_lazily(tmp_path):
+    root = catalog_root(tmp_path)
+    description = root / "basic/01_init/exercise.md"
+    catalog = Catalog(root, tmp_path / "cache")
+    # 说明在第一次访问时才读取
+    description.write_text("# Init\n", encoding="utf-8")
+    exercise = catalog.get("basic/01_init")
+    assert exercise.description == "# Init\n"
+    description.write_text("# Init (edited)\n", encoding="utf-8")
+    assert catalog.get("basic/01_init").description == "# Init\n"
+    catalog.invalidate("basic/01_init")
+    assert catalog.get("basic/01_init").description == "# Init (edited)\n"
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from gitlings.core.checks import CheckEngine, ConfigSet, compile_check
+from gitlings.core.exercise import Exercise
+from gitlings.core.virtual_git import VirtualGit
+
+SPECS = [
+    "repo_initialized @ init",
+    "file_exists:a.txt @ a.txt",
+    "branch_exists:topic @ topic",
+    "tag_exists:v1 @ v1",
+    "on_branch:topic @ on topic",
+    "command:merge @ merged",
+    "conflict_resolved @ resolved",
+    "commit_count:3 @ three commits",
+    "commit_message:feat: @ feat",
+    "merge_commit @ merge commit",
+    "config_set:user.name @ name",
+]
+
+BRANCHES = ["main", "topic", "dev"]
+MESSAGES = ["feat: add", "fix: bug", "chore"]
+
+
+def random_command(rng: random.Random) -> str:
+    branch = rng.choice(BRANCHES)
+    # (权重, 命令); 提交、切换分支和合并多一些, 才能走到合并提交和冲突
+    choices = [
+        (6, lambda: "git add ."),
+        (6, lambda: f"git commit -m '{rng.choice(MESSAGES)}'"),
+        (2, lambda: f"git branch {branch}"),
+        (1, lambda: f"git branch -{rng.choice('dD')} {branch}"),
+        (3, lambda: f"git checkout {branch}"),
+        (1, lambda: f"git checkout -b {branch}"),
+        (3, lambda: f"git merge {branch}"),
+        (1, lambda: "git merge --abort"),
+        (1, lambda: f"git rebase {branch}"),
+        (1, lambda: "git rebase --abort"),
+        (1, lambda: f"git cherry-pick {branch}"),
+        (1, lambda: "git cherry-pick --abort"),
+        (1, lambda: "git revert HEAD"),
+        (1, lambda: "git reset --hard HEAD~1"),
+        (1, lambda: "git tag v1"),
+        (1, lambda: "git stash"),
+        (1, lambda: "git stash pop"),
+        (1, lambda: "git config user.name Ann"),
+        (1, lambda: "git config --unset user.name"),
+    ]
+    weights, commands = zip(*choices)
+    return rng.choices(commands, weights)[0]()
+
+
+def edit(rng: random.Random, git: VirtualGit) -> None:
+    path = rng.choice(["a.txt", "b.txt"])
+    git.state['working_dir'][path] = f"line {rng.randrange(3)}\n"
+    if rng.random() < 0.5:
+        # 同时提交, 让分支之间出现分叉和冲突
+        git.run_command("git add .")
+        git.run_command(f"git commit -m '{rng.choice(MESSAGES)}'")
+
+
+def test_compile_known_predicates():
+    for spec in SPECS:
+        compile_check(spec)
+    assert isinstance(compile_check("config_set:user.name"), ConfigSet)
+
+
+def test_unknown_predicate_fails_loudly():
+    with pytest.raises(ValueError, match="unknown check predicate 'config user.name'"):
+        compile_check("config user.name @ 检查用户配置")
+
+
+def test_unknown_predicate_fails_at_load(tmp_path):
+    (tmp_path / "meta.toml").write_text('[verification]\nchecks = ["no_such_check @ x"]\n',
+                                        encoding="utf-8")
+    with pytest.raises(ValueError, match="no_such_check"):
+        Exercise.load(tmp_path)
+
+
+def test_catalog_checks_compile(exercises_dir):
+    from gitlings.core.runner import ExerciseRunner
+    for exercise in ExerciseRunner(exercises_dir).exercises:
+        for spec in exercise.checks:
+            compile_check(spec)
+
+
+def test_config_set():
+    git = VirtualGit()
+    engine = CheckEngine(["config_set:user.name @ name"], git)
+    git.run_command("git config user.email ann@example.com")
+    assert engine.results() == {"name": False}
+    git.run_command("git config --global user.name Ann")
+    assert engine.results() == {"name": True}
+    assert git.run_command("git config user.name") == "Ann"
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_incremental_matches_reevaluate(seed):
+    rng = random.Random(seed)
+    git = VirtualGit()
+    # incremental 只靠事件更新; full 每步都完整求值
+    incremental = CheckEngine(SPECS, git)
+    full = CheckEngine(SPECS, git)
+    git.run_command("git init")
+    for step in range(80):
+        if rng.random() < 0.4:
+            # 直接编辑文件不产生事件, 执行一条命令后再比较
+            edit(rng, git)
+        command = random_command(rng)
+        git.run_command(command)
+        assert incremental.results() == full.reevaluate(), f"seed {seed}, step {step}: {command}"
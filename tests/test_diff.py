@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from gitlings.core.diff import ALGORITHMS, DiffEngine, matching_blocks, opcodes
+
+
+def lcs_length(a, b) -> int:
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = 0
+        for j, y in enumerate(b):
+            prev, row[j + 1] = row[j + 1], prev + 1 if x == y else max(row[j + 1], row[j])
+    return row[-1]
+
+
+def random_pair(rng: random.Random):
+    a = [rng.randrange(5) for _ in range(rng.randrange(30))]
+    b = list(a)
+    for _ in range(rng.randrange(8)):
+        i = rng.randrange(len(b) + 1)
+        if b and rng.random() < 0.5:
+            del b[min(i, len(b) - 1)]
+        else:
+            b.insert(i, rng.randrange(7))
+    return a, b
+
+
+def apply(codes, a, b):
+    out = []
+    for tag, i1, i2, j1, j2 in codes:
+        out.extend(a[i1:i2] if tag == 'equal' else b[j1:j2])
+    return out
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_round_trip(algorithm):
+    rng = random.Random(algorithm)
+    for _ in range(300):
+        a, b = random_pair(rng)
+        blocks = matching_blocks(a, b, algorithm)
+        for i, j, size in blocks:
+            assert size > 0 and a[i:i + size] == b[j:j + size]
+        # 匹配块在两侧都严格递增且互不重叠
+        for (i, j, size), (i2, j2, _) in zip(blocks, blocks[1:]):
+            assert i + size <= i2 and j + size <= j2
+        codes = opcodes(blocks, len(a), len(b))
+        assert apply(codes, a, b) == b
+        assert [x for tag, i1, i2, _, _ in codes if tag != 'insert' for x in a[i1:i2]] == a
+
+
+def test_myers_is_minimal():
+    rng = random.Random(0)
+    for _ in range(300):
+        a, b = random_pair(rng)
+        matched = sum(size for _, _, size in matching_blocks(a, b, 'myers'))
+        assert matched == lcs_length(a, b)
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_identical_and_empty(algorithm):
+    assert matching_blocks([1, 2, 3], [1, 2, 3], algorithm) == [(0, 0, 3)]
+    assert matching_blocks([], [1, 2], algorithm) == []
+    assert opcodes([], 0, 2) == [('insert', 0, 0, 0, 2)]
+    assert opcodes([], 2, 0) == [('delete', 0, 2, 0, 0)]
+
+
+def test_engine_hunks_and_stat():
+    engine = DiffEngine()
+    old = "".join(f"{n}\n" for n in range(10))
+    new = old.replace("5\n", "five\n") + "10"
+    hunk, = engine.hunks("old", old, "new", new)
+    assert hunk.splitlines() == [
+        "@@ -3,8 +3,9 @@", " 2", " 3", " 4", "-5", "+five", " 6", " 7", " 8", " 9",
+        "+10", "\\ No newline at end of file",
+    ]
+    assert engine.stat("old", old, "new", new) == (2, 1)
+    assert list(engine.hunks("old", old, "old", old)) == []
+    assert engine.stat(None, None, "new", new) == (11, 0)
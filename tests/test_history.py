@@ -0,0 +1,130 @@
+import pytest
+
+from gitlings.core.history import CommandHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = CommandHistory(tmp_path / "history")
+    for command in ["git init", "git add a.txt", "git commit -m first",
+                    "git status", "git add b.txt", "git log --oneline"]:
+        history.append(command)
+    return history
+
+
+def test_append_skips_blank_and_repeated(history):
+    history.append("   ")
+    history.append("git log --oneline")
+    assert len(history) == 6
+    assert history.entries[-1] == "git log --oneline"
+
+
+def test_previous_and_next(history):
+    assert history.previous() == "git log --oneline"
+    assert history.previous() == "git add b.txt"
+    assert history.next() == "git log --oneline"
+    # 越过最新一条时回到输入的前缀
+    assert history.next() == ""
+
+
+def test_prefix_navigation(history):
+    history.reset("git add")
+    assert history.previous() == "git add b.txt"
+    assert history.previous() == "git add a.txt"
+    assert history.previous() is None
+    assert history.next() == "git add b.txt"
+    assert history.next() == "git add"
+
+
+def test_prefix_without_match(history):
+    history.reset("svn")
+    assert history.previous() is None
+    assert history.next() == "svn"
+
+
+def test_search_substring(history):
+    assert history.search("add") == (4, "git add b.txt")
+    assert history.search("add", 4) == (1, "git add a.txt")
+    assert history.search("add", 1) is None
+
+
+def test_search_fuzzy(history):
+    # 没有子串匹配时按字符顺序模糊匹配
+    assert history.search("gcmf") == (2, "git commit -m first")
+    assert history.search("zz") is None
+
+
+def test_search_empty_query(history):
+    assert history.search("") == (5, "git log --oneline")
+    assert history.search("", 0) is None
+
+
+def test_search_after_append(history):
+    assert history.search("push") is None
+    history.append("git push origin main")
+    assert history.search("push") == (6, "git push origin main")
+    history.reset("git p")
+    assert history.previous() == "git push origin main"
+
+
+def test_many_matches(tmp_path):
+    history = CommandHistory(tmp_path / "history")
+    for n in range(2000):
+        history.append(f"git commit -m 'change {n}'")
+        history.append("git status")
+    assert history.search("change 7'") == (14, "git commit -m 'change 7'")
+    assert history.search("change", 14) == (12, "git commit -m 'change 6'")
+    history.reset("git commit")
+    assert history.previous() == "git commit -m 'change 1999'"
+    assert history.previous() == "git commit -m 'change 1998'"
+    history.reset("git commit -m 'change 5'")
+    assert history.previous() == "git commit -m 'change 5'"
+
+
+def test_persisted_across_sessions(history):
+    again = CommandHistory(history.path)
+    assert again.entries == history.entries
+    assert again.search("commit") == (2, "git commit -m first")
+
+
+def test_max_entries_in_memory(tmp_path):
+    history = CommandHistory(tmp_path / "history", max_entries=3)
+    for n in range(5):
+        history.append(f"cmd {n}")
+    history.append("cmd 1")
+    assert history.entries == ["cmd 3", "cmd 4", "cmd 1"]
+    assert history.search("cmd 1") == (2, "cmd 1")
+    assert history.search("cmd 1", 2) is None
+    history.reset("cmd")
+    assert [history.previous() for _ in range(4)] == ["cmd 1", "cmd 4", "cmd 3", None]
+
+
+def test_reads_tail_and_compacts(tmp_path):
+    path = tmp_path / "history"
+    path.write_text("".join(f"cmd {n}\n" for n in range(10_000)), encoding="utf-8")
+    history = CommandHistory(path, max_entries=100)
+    assert history.entries == [f"cmd {n}" for n in range(9_900, 10_000)]
+    # 文件远大于保留的部分时被重写
+    assert path.read_text(encoding="utf-8").splitlines() == history.entries
+
+
+def test_small_file_not_rewritten(tmp_path):
+    path = tmp_path / "history"
+    path.write_text("a\n\nb\nc\n", encoding="utf-8")
+    history = CommandHistory(path, max_entries=2)
+    assert history.entries == ["b", "c"]
+    assert path.read_text(encoding="utf-8") == "a\n\nb\nc\n"
+
+
+def test_index_bounded_by_max_entries(tmp_path):
+    history = CommandHistory(tmp_path / "history", max_entries=10)
+    for n in range(1000):
+        history.append(f"cmd {n}")
+    assert history.entries == [f"cmd {n}" for n in range(990, 1000)]
+    # 被丢弃的命令最终也从索引中移除
+    assert len(history._commands) < 15
+    assert len(history._text) < 15 * len("cmd 999\n")
+    assert history.search("cmd 99") == (9, "cmd 999")
+    assert history.search("cmd 500") is None
+    history.reset("cmd 99")
+    assert [history.previous() for _ in range(3)] == ["cmd 999", "cmd 998", "cmd 997"]
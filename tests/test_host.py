@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from gitlings.core.virtual_git import VirtualGit
+from gitlings.server import SessionHost
+
+
+@pytest.fixture
+def host(exercises_dir, tmp_path):
+    return SessionHost(exercises_dir, spill_dir=tmp_path)
+
+
+def request(host, payload):
+    async def main():
+        try:
+            return await host.handle_request(payload)
+        finally:
+            await host.close()
+    return asyncio.run(main())
+
+
+def test_execute(host):
+    response = request(host, {'session': 'a', 'command': 'git init'})
+    assert response['ok']
+    assert "Initialized" in response['result']
+
+
+@pytest.mark.parametrize("payload", [[1, 2], "git status", 42, None])
+def test_request_not_an_object(host, payload):
+    assert request(host, payload) == {'ok': False, 'error': 'request must be a JSON object'}
+
+
+@pytest.mark.parametrize("command", [None, 42, ["git", "status"]])
+def test_command_not_a_string(host, command):
+    payload = {'session': 'a', 'op': 'execute', 'command': command}
+    assert request(host, payload) == {'ok': False, 'error': 'command must be a string'}
+
+
+def test_missing_command(host):
+    assert request(host, {'session': 'a'}) == {'ok': False, 'error': 'command must be a string'}
+
+
+def test_missing_session(host):
+    assert request(host, {'command': 'git status'}) == {'ok': False, 'error': 'missing field: session'}
+
+
+def test_invalid_session_id(host):
+    response = request(host, {'session': '../x', 'command': 'git status'})
+    assert not response['ok']
+    assert "invalid session id" in response['error']
+
+
+def test_unknown_op(host):
+    response = request(host, {'session': 'a', 'op': 'rebase'})
+    assert response == {'ok': False, 'error': 'unknown op: rebase'}
+
+
+def test_command_raising_is_reported(host, monkeypatch):
+    def fail(self, args):
+        raise RuntimeError("bug in git tag")
+    monkeypatch.setattr(VirtualGit, "_cmd_tag", fail)
+
+    async def main():
+        await host.handle_request({'session': 'a', 'command': 'git init'})
+        failed = await host.handle_request({'session': 'a', 'command': 'git tag v1'})
+        # 会话在异常之后仍然可用
+        status = await host.handle_request({'session': 'a', 'command': 'git status'})
+        await host.close()
+        return failed, status
+
+    failed, status = asyncio.run(main())
+    assert failed['ok'] is False
+    assert failed['error'] == "RuntimeError: bug in git tag"
+    assert status['ok']
+
+
+def test_connection_malformed_lines(host, tmp_path):
+    lines = [b"not json\n", b"[1, 2]\n", json.dumps({'session': 'a'}).encode() + b"\n",
+             json.dumps({'session': 'a', 'command': 'git init'}).encode() + b"\n"]
+
+    async def main():
+        server = await host.serve_unix(str(tmp_path / "host.sock"))
+        reader, writer = await asyncio.open_unix_connection(str(tmp_path / "host.sock"))
+        responses = []
+        for line in lines:
+            writer.write(line)
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        await host.close()
+        return responses
+
+    responses = asyncio.run(main())
+    assert [r['ok'] for r in responses] == [False, False, False, True]
+    assert responses[0]['error'] == 'invalid json'
+
+
+def test_branch_delete_without_name(host):
+    async def main():
+        await host.handle_request({'session': 'a', 'command': 'git init'})
+        responses = [await host.handle_request({'session': 'a', 'command': f'git branch {flag}'})
+                     for flag in ('-d', '-D')]
+        await host.close()
+        return responses
+
+    assert asyncio.run(main()) == [{'ok': True, 'result': "fatal: branch name required"}] * 2
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from gitlings.core.journal import OP_EXECUTE, SessionJournal, read_history
+from gitlings.core.runner import ExerciseRunner
+from gitlings.core.virtual_git import VirtualGit
+from gitlings.server import SessionHost
+
+
+@pytest.fixture
+def runner(exercises_dir):
+    return ExerciseRunner(exercises_dir)
+
+
+def new_runner(runner):
+    return ExerciseRunner(None, runner.exercises)
+
+
+def run(journal, runner, commands):
+    for command in commands:
+        journal.execute(runner, command)
+
+
+def test_checkpoint_and_resume(runner, tmp_path):
+    journal = SessionJournal(tmp_path, checkpoint_interval=2)
+    run(journal, runner, ["git init", "git checkout -b dev", "git branch feature"])
+    # 两条命令进入快照, 最后一条还在日志中
+    assert journal.snapshot_path.exists()
+    assert [arg for _, _, arg in journal.records()] == ["git branch feature"]
+    journal.close()
+
+    restored = new_runner(runner)
+    assert SessionJournal(tmp_path).resume(restored) == 1
+    assert restored.history == runner.history
+    assert restored.git.run_command("git branch") == runner.git.run_command("git branch")
+    assert read_history(tmp_path) == runner.history
+
+
+def test_crash_replays_journal(runner, tmp_path):
+    journal = SessionJournal(tmp_path)
+    run(journal, runner, ["git init", "git checkout -b dev"])
+    # 不调用 close/checkpoint, 模拟进程崩溃
+    restored = new_runner(runner)
+    assert SessionJournal(tmp_path).resume(restored) == 2
+    assert restored.git.run_command("git branch") == runner.git.run_command("git branch")
+
+
+def test_truncated_tail_is_dropped(runner, tmp_path):
+    journal = SessionJournal(tmp_path)
+    run(journal, runner, ["git init", "git checkout -b dev"])
+    journal.close()
+    data = journal.journal_path.read_bytes()
+    journal.journal_path.write_bytes(data[:-3])
+
+    restored = new_runner(runner)
+    assert SessionJournal(tmp_path).resume(restored) == 1
+    assert restored.history == ["git init"]
+
+
+@pytest.fixture
+def broken_tag(monkeypatch):
+    # 模拟命令实现中的缺陷: 执行和重放时都会抛出异常
+    def fail(self, args):
+        raise RuntimeError("bug in git tag")
+    monkeypatch.setattr(VirtualGit, "_cmd_tag", fail)
+
+
+def test_raising_command_replays(runner, tmp_path, broken_tag, caplog):
+    journal = SessionJournal(tmp_path)
+    run(journal, runner, ["git init"])
+    with pytest.raises(RuntimeError):
+        journal.execute(runner, "git tag v1")
+    run(journal, runner, ["git checkout -b dev"])
+    assert [op for op, _, _ in journal.records()] == [OP_EXECUTE] * 3
+
+    restored = new_runner(runner)
+    resumed = SessionJournal(tmp_path)
+    assert resumed.resume(restored) == 3
+    assert resumed.skipped == ["git tag v1"]
+    assert "git tag v1" in caplog.text
+    assert restored.history == runner.history == ["git init", "git checkout -b dev"]
+    assert restored.git.run_command("git branch") == runner.git.run_command("git branch")
+
+
+def test_host_recovers_after_raising_command(exercises_dir, tmp_path, broken_tag):
+    async def crash():
+        host = SessionHost(exercises_dir, spill_dir=tmp_path)
+        await host.execute('a', 'git init')
+        response = await host.handle_request({'session': 'a', 'command': 'git tag v1'})
+        # 进程崩溃: 不换出会话, 只留下日志
+        return response
+
+    async def restart():
+        host = SessionHost(exercises_dir, spill_dir=tmp_path)
+        try:
+            return await host.handle_request({'session': 'a', 'command': 'git status'})
+        finally:
+            await host.close()
+
+    assert asyncio.run(crash())['ok'] is False
+    response = asyncio.run(restart())
+    assert response['ok']
+    assert "On branch" in response['result']
@@ -0,0 +1,58 @@
+import random
+
+from gitlings.core.diff import DiffEngine
+from gitlings.core.merge import merge_lines
+from gitlings.core.objects import Blob, hash_object
+
+
+def side(text):
+    return (hash_object(Blob(text)), text) if text is not None else None
+
+
+def merge(base, ours, theirs):
+    return merge_lines(DiffEngine(), side(base), side(ours), side(theirs), "ours", "theirs")
+
+
+def random_text(rng: random.Random) -> str:
+    return "".join(f"{rng.choice('abcde')}\n" for _ in range(rng.randrange(12)))
+
+
+def edited(rng: random.Random, text: str) -> str:
+    lines = text.splitlines(keepends=True)
+    for _ in range(rng.randrange(4)):
+        i = rng.randrange(len(lines) + 1)
+        if lines and rng.random() < 0.5:
+            del lines[min(i, len(lines) - 1)]
+        else:
+            lines.insert(i, f"{rng.choice('vwxyz')}\n")
+    return "".join(lines)
+
+
+def test_one_sided_changes_merge_cleanly():
+    rng = random.Random(0)
+    for _ in range(500):
+        base = random_text(rng)
+        changed = edited(rng, base)
+        assert merge(base, base, changed) == (changed, 0)
+        assert merge(base, changed, base) == (changed, 0)
+        assert merge(base, changed, changed) == (changed, 0)
+
+
+def test_missing_sides():
+    assert merge(None, None, "new\n") == ("new\n", 0)
+    assert merge("old\n", "old\n", None) == ("", 0)
+
+
+def test_non_overlapping_changes():
+    base = "1\n2\n3\n4\n5\n"
+    ours = "one\n2\n3\n4\n5\n"
+    theirs = "1\n2\n3\n4\nfive\n"
+    assert merge(base, ours, theirs) == ("one\n2\n3\n4\nfive\n", 0)
+
+
+def test_conflict_markers():
+    assert merge("a\nb\nc\n", "a\nours\nc\n", "a\ntheirs\nc\n") == (
+        "a\n<<<<<<< ours\nours\n=======\ntheirs\n>>>>>>> theirs\nc\n", 1)
+    # 冲突标记总是独占一行
+    assert merge("x\n", "ours", "theirs") == (
+        "<<<<<<< ours\nours\n=======\ntheirs\n>>>>>>> theirs\n", 1)
@@ -0,0 +1,75 @@
+from gitlings.core.objects import Blob, ObjectStore, hash_object
+
+
+def test_hashes_match_git():
+    store = ObjectStore()
+    assert store.write_blob("hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+    assert store.empty_tree() == "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+    assert hash_object(Blob("")) == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+def test_identical_content_is_stored_once():
+    store = ObjectStore()
+    first = store.write_blob("same\n")
+    assert store.write_blob("same\n") == first
+    assert len(store) == 1
+    assert store.read_blob(first) == "same\n"
+
+
+def test_write_and_read_nested_tree():
+    store = ObjectStore()
+    files = {
+        "README": store.write_blob("readme\n"),
+        "src/a.py": store.write_blob("a\n"),
+        "src/pkg/b.py": store.write_blob("b\n"),
+    }
+    tree = store.write_tree(files)
+    assert store.read_tree(tree) == files
+    assert store.lookup_path(tree, "src/pkg/b.py") == files["src/pkg/b.py"]
+    assert store.lookup_path(tree, "src/pkg") is None
+    assert store.lookup_entry(tree, "src/pkg")[0] == "tree"
+    assert store.lookup_path(tree, "missing/b.py") is None
+
+
+def test_tree_entries_use_git_order():
+    # git 把子目录按 "name/" 排序, 所以 a.b 在目录 a 之前, a0 在之后
+    store = ObjectStore()
+    blob = store.write_blob("x\n")
+    tree = store.write_tree({"a/x": blob, "a.b": blob, "a0": blob})
+    assert [name for name, _, _ in store.get(tree).entries] == ["a.b", "a", "a0"]
+
+
+def test_update_tree_rewrites_only_changed_subtrees():
+    store = ObjectStore()
+    one, two = store.write_blob("1\n"), store.write_blob("2\n")
+    base = store.write_tree({"keep/x": one, "edit/y": one, "gone/z": one})
+    new = store.update_tree(base, {"edit/y": two, "gone/z": None, "add": two})
+    assert store.read_tree(new) == {"add": two, "edit/y": two, "keep/x": one}
+    # 未修改的子树沿用同一个哈希, 空目录被删除
+    assert store.lookup_entry(new, "keep") == store.lookup_entry(base, "keep")
+    assert store.lookup_entry(new, "gone") is None
+    # 同样的内容总是得到同样的树
+    assert new == store.write_tree({"add": two, "edit/y": two, "keep/x": one})
+
+
+def test_diff_trees():
+    store = ObjectStore()
+    one, two = store.write_blob("1\n"), store.write_blob("2\n")
+    old = store.write_tree({"a": one, "dir/b": one, "dir/c": one})
+    new = store.write_tree({"a": one, "dir/b": two, "d": one})
+    assert sorted(store.diff_trees(old, new)) == [
+        ("d", None, one), ("dir/b", one, two), ("dir/c", one, None),
+    ]
+    assert list(store.diff_trees(old, old)) == []
+    assert sorted(store.diff_trees(None, old)) == [
+        ("a", None, one), ("dir/b", None, one), ("dir/c", None, one),
+    ]
+
+
+def test_find_prefix_across_pending_buffer():
+    store = ObjectStore()
+    shas = [store.write_blob(f"{n}\n") for n in range(1000)]
+    for sha in shas[::97] + [shas[-1]]:
+        assert sha in store.find_prefix(sha[:6])
+    assert store.find_prefix("") == sorted(shas)
+    assert store.find_prefix("zz") == []
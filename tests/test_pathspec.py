@@ -0,0 +1,86 @@
+from gitlings.core.pathspec import IgnoreRules, Pathspec
+from gitlings.core.trie import PathTrie
+
+PATHS = ["README.md", "src/a.py", "src/b.txt", "src/pkg/c.py", "docs/a.md", "srcx/d.py"]
+
+
+def matches(*specs):
+    pathspec = Pathspec(specs)
+    return [path for path in PATHS if pathspec.match(path)]
+
+
+def test_pathspec_directories_and_globs():
+    assert matches(".") == PATHS
+    assert matches("src") == ["src/a.py", "src/b.txt", "src/pkg/c.py"]
+    assert matches("src/") == ["src/a.py", "src/b.txt", "src/pkg/c.py"]
+    assert matches("./src/a.py") == ["src/a.py"]
+    # 与 git 相同, * 可以跨目录
+    assert matches("*.py") == ["src/a.py", "src/pkg/c.py", "srcx/d.py"]
+    assert matches("src/*.py") == ["src/a.py", "src/pkg/c.py"]
+    assert matches("src/?.txt") == ["src/b.txt"]
+    assert matches("[dR]*") == ["README.md", "docs/a.md"]
+
+
+def test_pathspec_excludes_and_roots():
+    assert matches("src", ":!src/pkg") == ["src/a.py", "src/b.txt"]
+    assert matches(":^*.py") == ["README.md", "src/b.txt", "docs/a.md"]
+    assert matches(":(exclude)src") == ["README.md", "docs/a.md", "srcx/d.py"]
+    assert Pathspec(["src/pkg", "src", "docs/*.md"]).roots == ["docs", "src"]
+    assert Pathspec(["src/*.py"]).roots == ["src"]
+
+
+def test_ignore_rules():
+    rules = IgnoreRules([
+        ("", "*.log\nbuild/\n/root.txt\n!keep.log\n# comment\n"),
+        ("src", "generated\n"),
+    ])
+    assert rules.ignores("a.log")
+    assert rules.ignores("deep/dir/b.log")
+    assert not rules.ignores("keep.log")
+    assert rules.ignores("build/out.o")
+    assert not rules.ignores_file("build")  # 只以 / 结尾的规则只匹配目录
+    assert rules.ignores("root.txt")
+    assert not rules.ignores("sub/root.txt")
+    assert rules.ignores("src/generated")
+    assert rules.ignores("src/x/generated/y.py")
+    assert not rules.ignores("generated")
+    assert not IgnoreRules([])
+
+
+def test_ignored_directory_cannot_be_unignored():
+    rules = IgnoreRules([("", "build/\n!build/keep.txt\n")])
+    assert rules.ignores("build/keep.txt")
+
+
+def test_trie_counts():
+    trie = PathTrie()
+    for path in PATHS:
+        trie.set_file(path, True)
+    trie.set_dirty("src/a.py", True)
+    trie.set_dirty("src/pkg/c.py", True)
+    trie.set_dirty("gone.txt", True)  # 已删除的文件也算改动
+    assert trie.count() == len(PATHS)
+    assert trie.count("src") == 3
+    assert trie.dirty_count() == 3
+    assert trie.dirty_count("src/pkg") == 1
+    assert trie.is_dir("src") and not trie.is_dir("src/a.py")
+
+    trie.set_file("src/pkg/c.py", False)
+    trie.set_dirty("src/pkg/c.py", False)
+    # 子树变空后被删除
+    assert trie.find("src/pkg") is None
+    assert trie.count("src") == 2
+
+
+def test_trie_walk():
+    trie = PathTrie()
+    for path in PATHS:
+        trie.set_file(path, True)
+    trie.set_dirty("src/b.txt", True)
+    trie.set_dirty("build/out.o", True)
+    assert sorted(path for path, _ in trie.walk("src")) == ["src/a.py", "src/b.txt", "src/pkg/c.py"]
+    rules = IgnoreRules([("", "build/\n")])
+    assert sorted(trie.walk(dirty_only=True, rules=rules)) == [
+        ("build/out.o", True), ("src/b.txt", False),
+    ]
+    assert list(trie.walk("missing")) == []
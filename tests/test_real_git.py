@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gitlings.core.objects import hash_object
+from gitlings.core.real_git import GitProcessPool, RealGit, RepoObjects
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+ENV = {
+    **os.environ,
+    'GIT_AUTHOR_NAME': "User", 'GIT_AUTHOR_EMAIL': "user@example.com",
+    'GIT_COMMITTER_NAME': "User", 'GIT_COMMITTER_EMAIL': "user@example.com",
+    'GIT_AUTHOR_DATE': "1700000000 +0000", 'GIT_COMMITTER_DATE': "1700000000 +0000",
+    'GIT_CONFIG_GLOBAL': os.devnull, 'GIT_CONFIG_NOSYSTEM': "1",
+}
+
+
+def git(repo, *args) -> str:
+    return subprocess.run(["git", *args], cwd=repo, env=ENV, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q", "-b", "main")
+    (tmp_path / "dir").mkdir()
+    for n in range(3):
+        (tmp_path / "a.txt").write_text(f"version {n}\n")
+        (tmp_path / "dir" / "b.txt").write_text("b\n")
+        git(tmp_path, "add", ".")
+        git(tmp_path, "commit", "-q", "-m", f"commit {n}")
+    return tmp_path
+
+
+@pytest.fixture
+def pool(repo):
+    pool = GitProcessPool(repo, size=2)
+    yield pool
+    pool.close()
+
+
+def test_read_objects(repo, pool):
+    head = git(repo, "rev-parse", "HEAD")
+    sha, kind, data = pool.read("HEAD")
+    assert (sha, kind) == (head, "commit")
+    assert data.startswith(b"tree ")
+    assert pool.read("HEAD:a.txt")[2] == b"version 2\n"
+    assert pool.read("no-such-ref") is None
+    assert pool.read("HEAD two") is None
+    assert pool.read("") is None
+
+
+def test_processes_are_reused(pool):
+    for _ in range(20):
+        pool.read("HEAD")
+    assert pool._started == 1
+
+
+def test_concurrent_reads_stay_within_size(repo, pool):
+    expected = {f"HEAD~{n}": git(repo, "rev-parse", f"HEAD~{n}") for n in range(3)}
+    revs = list(expected) * 50
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda rev: pool.read(rev)[0], revs))
+    assert results == [expected[rev] for rev in revs]
+    assert 1 <= pool._started <= 2
+
+
+def test_dead_process_is_replaced(pool):
+    with pool.reader() as cat:
+        pass
+    cat._proc.kill()
+    cat._proc.wait()
+    assert pool.read("HEAD")[1] == "commit"
+    assert pool._started == 1
+    assert cat not in pool._all
+
+
+def test_error_inside_reader_discards_process(pool):
+    with pytest.raises(RuntimeError):
+        with pool.reader() as cat:
+            raise RuntimeError("pipe state unknown")
+    assert not cat.alive
+    assert pool._started == 0
+    assert pool.read("HEAD") is not None
+
+
+def test_repo_objects_parse_like_object_store(repo):
+    objects = RepoObjects(repo)
+    try:
+        head = objects.resolve("main")
+        commit = objects.get(head)
+        assert commit.message == "commit 2"
+        assert commit.timestamp == 1700000000
+        assert len(commit.parents) == 1
+        # 解析出的对象按 ObjectStore 的格式序列化后哈希不变
+        for sha in (head, commit.tree, git(repo, "rev-parse", "HEAD:dir")):
+            assert hash_object(objects.get(sha)) == sha
+        assert objects.get(git(repo, "rev-parse", "HEAD:a.txt")).data == "version 2\n"
+        assert "0" * 40 not in objects
+        assert objects.resolve("HEAD:a.txt") is None
+    finally:
+        objects.close()
+
+
+def test_real_git_reads_refs_and_history(repo):
+    real = RealGit(repo)
+    try:
+        assert real.state['current_branch'] == "main"
+        assert real.state['branches']['main'] == git(repo, "rev-parse", "HEAD")
+        assert [commit.message for _, commit in real.iter_commits()] == ["commit 2", "commit 1", "commit 0"]
+        assert "dir/b.txt" in real.state['working_dir']
+    finally:
+        real.close()
@@ -0,0 +1,46 @@
+import pytest
+
+from gitlings.core.runner import ExerciseRunner
+
+
+@pytest.fixture
+def runner(exercises_dir):
+    return ExerciseRunner(exercises_dir)
+
+
+def test_undo_redo(runner):
+    runner.execute("git init")
+    runner.execute("git checkout -b dev")
+    assert runner.execute("gitlings undo") == "Undid 'git checkout -b dev'"
+    assert runner.git.state['current_branch'] == "main"
+    assert runner.execute("gitlings redo") == "Redid 'git checkout -b dev'"
+    assert runner.git.state['current_branch'] == "dev"
+    assert runner.execute("gitlings redo") == "Nothing to redo."
+
+
+def test_read_only_commands_are_not_checkpointed(runner):
+    runner.execute("git init")
+    runner.execute("git status")
+    assert runner.execute("gitlings undo") == "Undid 'git init'"
+    assert runner.execute("gitlings undo") == "Nothing to undo."
+
+
+def test_reset_is_undoable(runner):
+    runner.execute("git init")
+    runner.execute("git branch feature")
+    assert runner.execute("gitlings reset").startswith("Exercise reset")
+    assert not runner.git.state['repo_initialized']
+    assert runner.execute("gitlings reset") == "Already at the start of the exercise."
+    assert runner.execute("gitlings undo") == "Undid 'gitlings reset'"
+    assert "feature" in runner.git.state['branches']
+
+
+def test_stream_command(runner):
+    assert runner.stream_command("git init").startswith("Initialized")
+    runner.git.state['working_dir']['a.txt'] = "a\n"
+    runner.stream_command("git add a.txt")
+    runner.stream_command("git commit -m first")
+    # log 惰性输出, 不产生检查点
+    assert "first" in "\n".join(runner.stream_command("git log"))
+    assert runner.stream_command("gitlings undo") == "Undid 'git commit -m first'"
+    assert runner.history == ["git init", "git add a.txt", "git commit -m first", "git log", "gitlings undo"]
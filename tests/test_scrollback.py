@@ -0,0 +1,27 @@
+from gitlings.tui.scrollback import Scrollback
+
+
+def test_trailing_blank_lines_are_rendered():
+    scrollback = Scrollback()
+    scrollback.append("fatal: x\n\n    git push --set-upstream origin main\n\n")
+    assert len(scrollback) == 5
+    rows = scrollback.window(10)
+    assert [row.plain for row in rows] == [
+        "fatal: x", "", "    git push --set-upstream origin main", "", "",
+    ]
+
+
+def test_window_offset_counts_blank_lines():
+    scrollback = Scrollback()
+    scrollback.append("a\n\n")
+    scrollback.append("b")
+    assert [row.plain for row in scrollback.window(2)] == ["", "b"]
+    assert [row.plain for row in scrollback.window(2, offset=2)] == ["a", ""]
+
+
+def test_trim_keeps_lines_and_rows_aligned():
+    scrollback = Scrollback(max_lines=3)
+    scrollback.append("one\n\n")
+    scrollback.append("two\n")
+    assert len(scrollback) == 3
+    assert [row.plain for row in scrollback.window(5)] == ["", "two", ""]
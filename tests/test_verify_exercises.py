@@ -0,0 +1,54 @@
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "verify_exercises.py"
+
+
+@pytest.fixture(scope="module")
+def verify():
+    spec = importlib.util.spec_from_file_location("verify_exercises", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def exercise(tmp_path: Path, command: str) -> Path:
+    path = tmp_path / "basic" / "01_init"
+    path.mkdir(parents=True)
+    (path / "meta.toml").write_text(f"verify = {command!r}\n", encoding="utf-8")
+    return path
+
+
+def test_passed_and_failed(verify, tmp_path):
+    assert verify.verify_exercise(exercise(tmp_path / "a", "echo ok")).passed
+    result = verify.verify_exercise(exercise(tmp_path / "b", "echo bad >&2; exit 3"))
+    assert result.status == "failed"
+    assert result.output == "bad\n"
+
+
+def alive(pid: int) -> bool:
+    try:
+        state = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0]
+    except OSError:
+        return False
+    # 被杀掉但还没被回收的进程是僵尸状态
+    return state != "Z"
+
+
+@pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="needs /proc")
+def test_timeout_kills_the_whole_process_group(verify, tmp_path):
+    # shell 派生的 sleep 不会随 shell 一起被杀掉
+    pidfile = tmp_path / "sleep.pid"
+    result = verify.verify_exercise(
+        exercise(tmp_path, f"sleep 30 & echo $! > {pidfile}; wait"), timeout=1
+    )
+    assert result.status == "timeout"
+    assert result.duration < 10
+    pid = int(pidfile.read_text())
+    deadline = time.monotonic() + 5
+    while alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not alive(pid)
@@ -0,0 +1,205 @@
+import pytest
+
+from gitlings.core.virtual_git import VirtualGit
+
+
+@pytest.fixture
+def git():
+    git = VirtualGit()
+    git.run_command("git init")
+    git.state['working_dir']['a.txt'] = "a\n"
+    git.run_command("git add a.txt")
+    git.run_command("git commit -m first")
+    return git
+
+
+@pytest.mark.parametrize("flag", ["-d", "-D"])
+def test_cannot_delete_current_branch(git, flag):
+    assert git.run_command(f"git branch {flag} main") == "error: Cannot delete branch 'main' checked out at '...'"
+    assert "main" in git.state['branches']
+
+
+@pytest.mark.parametrize("flag", ["-d", "-D"])
+def test_delete_branch(git, flag):
+    git.run_command("git branch topic")
+    assert git.run_command(f"git branch {flag} topic").startswith("Deleted branch topic")
+    assert "topic" not in git.state['branches']
+
+
+URL = "https://github.com/example/repo.git"
+
+
+def commit(git, message, **files):
+    for path, content in files.items():
+        git.state['working_dir'][path.replace("__", "/")] = content
+    git.run_command("git add .")
+    return git.run_command(f"git commit -m '{message}'")
+
+
+def log(git):
+    """当前分支的提交说明, 最新的在前"""
+    return [line.split(" ", 1)[1] for line in git.run_command("git log --oneline").splitlines()]
+
+
+@pytest.fixture
+def diverged(git):
+    """main 与 topic 都修改了 a.txt 的同一行"""
+    commit(git, "base", **{"a.txt": "1\n2\n3\n"})
+    git.run_command("git checkout -b topic")
+    commit(git, "t1", **{"a.txt": "1\ntopic\n3\n"})
+    commit(git, "t2", **{"b.txt": "b\n"})
+    git.run_command("git checkout main")
+    commit(git, "m1", **{"a.txt": "1\nmain\n3\n"})
+    return git
+
+
+# ---- 变基、拣选与还原 ----
+def test_rebase_conflict_continue(diverged):
+    git = diverged
+    git.run_command("git checkout topic")
+    output = git.run_command("git rebase main")
+    assert "CONFLICT (content): Merge conflict in a.txt" in output
+    assert git.state['conflict']
+    assert "<<<<<<< HEAD\nmain\n=======\ntopic\n>>>>>>>" in git.state['working_dir']['a.txt']
+    assert "rebase in progress" in git.run_command("git status")
+
+    git.state['working_dir']['a.txt'] = "1\nboth\n3\n"
+    git.run_command("git add a.txt")
+    assert git.run_command("git rebase --continue") == "Successfully rebased and updated refs/heads/topic."
+    assert log(git) == ["t2", "t1", "m1", "base", "first"]
+    assert git.state['working_dir']['a.txt'] == "1\nboth\n3\n"
+    assert git.state['sequence'] is None and not git.state['conflict']
+
+
+def test_rebase_abort_restores_branch(diverged):
+    git = diverged
+    git.run_command("git checkout topic")
+    before = git.state['branches']['topic']
+    git.run_command("git rebase main")
+    assert git.run_command("git rebase --abort") == ""
+    assert git.state['branches']['topic'] == before
+    assert git.state['current_branch'] == "topic"
+    assert git.state['working_dir']['a.txt'] == "1\ntopic\n3\n"
+    assert git.run_command("git rebase --abort").startswith("fatal: No rebase in progress?")
+
+
+def test_rebase_skips_already_applied_commits(diverged):
+    git = diverged
+    git.run_command("git cherry-pick topic")
+    git.run_command("git checkout topic")
+    git.run_command("git rebase main")
+    assert git.state['sequence'] is not None
+    # 跳过冲突的 t1; t2 已经拣选到 main 上, 按补丁 ID 直接丢弃
+    git.run_command("git rebase --skip")
+    assert log(git) == ["t2", "m1", "base", "first"]
+
+
+def test_cherry_pick_and_revert(diverged):
+    git = diverged
+    assert git.run_command("git cherry-pick topic").endswith("t2")
+    assert git.state['working_dir']['b.txt'] == "b\n"
+    assert log(git)[:2] == ["t2", "m1"]
+    assert git.run_command("git revert HEAD").endswith('Revert "t2"')
+    assert "b.txt" not in git.state['working_dir']
+    assert log(git)[:3] == ['Revert "t2"', "t2", "m1"]
+
+
+def test_cherry_pick_conflict_abort(diverged):
+    git = diverged
+    head = git.state['branches']['main']
+    assert "CONFLICT" in git.run_command("git cherry-pick topic~1")
+    assert git.run_command("git cherry-pick --abort") == ""
+    assert git.state['branches']['main'] == head
+    assert git.state['working_dir']['a.txt'] == "1\nmain\n3\n"
+
+
+# ---- 贮藏 ----
+def test_stash_push_and_pop(git):
+    git.state['working_dir']['a.txt'] = "changed\n"
+    git.state['working_dir']['new.txt'] = "new\n"
+    git.run_command("git add new.txt")
+    assert git.run_command("git stash").startswith("Saved working directory and index state WIP on main")
+    assert git.state['working_dir']['a.txt'] == "a\n"
+    assert "new.txt" not in git.state['working_dir']
+    assert git.run_command("git stash list") == "stash@{0}: WIP on main: " + git.run_command("git log --oneline -n 1")
+
+    assert "Dropped refs/stash@{0}" in git.run_command("git stash pop")
+    assert git.state['working_dir']['a.txt'] == "changed\n"
+    assert git.state['working_dir']['new.txt'] == "new\n"
+    assert git.run_command("git stash list") == ""
+
+
+def test_stash_apply_keeps_entry_and_drop(git):
+    git.state['working_dir']['a.txt'] = "one\n"
+    git.run_command("git stash push -m first")
+    git.state['working_dir']['a.txt'] = "two\n"
+    git.run_command("git stash")
+    assert git.run_command("git stash list").splitlines()[1] == "stash@{1}: On main: first"
+    git.run_command("git stash apply stash@{1}")
+    assert git.state['working_dir']['a.txt'] == "one\n"
+    assert len(git.state['stashes']) == 2
+    git.run_command("git stash drop stash@{0}")
+    assert git.run_command("git stash list") == "stash@{0}: On main: first"
+    git.run_command("git stash clear")
+    assert git.state['stashes'] == []
+    assert git.run_command("git stash pop") == "No stash entries found."
+
+
+# ---- 远程仓库 ----
+def test_push_clone_fetch_pull(git):
+    assert "* [new branch]      main -> main" in git.run_command("git push -u origin main")
+    other = VirtualGit(network=git.network)
+    other.run_command(f"git clone {URL}")
+    assert other.state['working_dir']['a.txt'] == "a\n"
+    assert other.state['branches']['main'] == git.state['branches']['main']
+
+    commit(other, "theirs", **{"b.txt": "b\n"})
+    other.run_command("git push")
+    assert "main -> origin/main" in git.run_command("git fetch")
+    assert git.state['remote_branches']['origin/main'] == other.state['branches']['main']
+    assert "behind 'origin/main' by 1 commit" in git.run_command("git status")
+
+    commit(git, "ours", **{"c.txt": "c\n"})
+    assert "[rejected]        main -> main (non-fast-forward)" in git.run_command("git push")
+    git.run_command("git pull")
+    assert git.state['working_dir']['b.txt'] == "b\n"
+    git.run_command("git push")
+    assert "Fast-forward" in other.run_command("git pull")
+    assert other.state['branches']['main'] == git.state['branches']['main']
+
+
+def test_push_unknown_remote(git):
+    assert git.run_command("git push nowhere main").startswith("fatal: 'nowhere' does not appear to be a git repository")
+
+
+# ---- 检查点 ----
+def test_checkpoint_restore_round_trip(diverged):
+    git = diverged
+    git.run_command("git push -u origin main")
+    remote = git.network[URL]
+
+    def snapshot():
+        return (
+            git.run_command("git status"), git.run_command("git log --oneline --all"),
+            git.run_command("git branch"), git.run_command("git stash list"),
+            dict(git.state['working_dir']), git.config_value("user.name"),
+            dict(git.state['remote_branches']), dict(remote.state['branches']),
+        )
+    before = snapshot()
+    saved = git.checkpoint()
+
+    git.state['working_dir']['a.txt'] = "dirty\n"
+    git.run_command("git stash")
+    git.run_command("git config user.name Ann")
+    git.run_command("git checkout topic")
+    git.run_command("git rebase main")  # 冲突, 停在变基中途
+    git.run_command("git rebase --abort")
+    commit(git, "extra", **{"dir__c.txt": "c\n"})
+    git.run_command("git push origin topic")
+    git.run_command("git branch -D main")
+    assert snapshot() != before
+
+    git.restore(saved)
+    assert snapshot() == before
+    # 恢复后仍然可以继续操作
+    assert "CONFLICT" in git.run_command("git merge topic")
@@ -1,21 +1,129 @@
 #!/usr/bin/env python3
+import json
+import os
+import signal
 import subprocess
-import toml
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import List, Optional
+
+import click
+import toml
+
+
+@dataclass
+class VerifyResult:
+    name: str
+    path: str
+    status: str  # passed / failed / timeout / error
+    duration: float
+    output: str = ""
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "passed"
 
-def verify_exercise(exercise_dir: Path):
-    meta = toml.load(exercise_dir / "meta.toml")
-    verify_cmd = meta.get("verify", "true")
-    
+
+def verify_exercise(exercise_dir: Path, timeout: Optional[float] = None) -> VerifyResult:
+    """运行练习 meta.toml 中的 verify 命令; 每个练习在独立的子进程中执行"""
+    name = f"{exercise_dir.parent.name}/{exercise_dir.name}"
+    start = time.perf_counter()
     try:
-        subprocess.run(verify_cmd, shell=True, check=True)
-        print(f"✅ {exercise_dir.name} passed")
-        return True
-    except subprocess.CalledProcessError:
-        print(f"❌ {exercise_dir.name} failed")
-        return False
+        meta = toml.load(exercise_dir / "meta.toml")
+        verify_cmd = meta.get("verify", "true")
+        # 独立的进程组: 超时时连同 shell 启动的子进程一起杀掉, 否则它们会继续运行并占着管道
+        proc = subprocess.Popen(
+            verify_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, start_new_session=True,
+        )
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.communicate()
+            raise
+        status = "passed" if proc.returncode == 0 else "failed"
+        output = stdout + stderr
+    except subprocess.TimeoutExpired:
+        status, output = "timeout", f"timed out after {timeout}s"
+    except Exception as exc:
+        status, output = "error", str(exc)
+    return VerifyResult(name, str(exercise_dir), status, time.perf_counter() - start, output)
+
+
+def find_exercises(root: Path) -> List[Path]:
+    return [ex for ex in sorted(root.glob("*/*")) if (ex / "meta.toml").exists()]
+
+
+def run_all(exercises: List[Path], workers: int, timeout: Optional[float],
+            fail_fast: bool = False) -> List[VerifyResult]:
+    """并行验证; fail_fast 时第一个失败后取消尚未开始的练习"""
+    results = []
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(verify_exercise, ex, timeout) for ex in exercises]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            mark = "✅" if result.passed else "❌"
+            print(f"{mark} {result.name} {result.status} ({result.duration:.2f}s)")
+            if fail_fast and not result.passed:
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return sorted(results, key=lambda r: r.name)
+
+
+def write_json(results: List[VerifyResult], path: Path) -> None:
+    path.write_text(json.dumps([asdict(r) for r in results], ensure_ascii=False, indent=2))
+
+
+def write_junit(results: List[VerifyResult], path: Path) -> None:
+    suite = ET.Element(
+        "testsuite",
+        name="exercises",
+        tests=str(len(results)),
+        failures=str(sum(r.status == "failed" for r in results)),
+        errors=str(sum(r.status in ("timeout", "error") for r in results)),
+        time=f"{sum(r.duration for r in results):.3f}",
+    )
+    for r in results:
+        case = ET.SubElement(suite, "testcase", classname="exercises", name=r.name, time=f"{r.duration:.3f}")
+        if r.status == "failed":
+            ET.SubElement(case, "failure", message="verify command failed").text = r.output
+        elif not r.passed:
+            ET.SubElement(case, "error", message=r.status).text = r.output
+    ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+
+@click.command()
+@click.argument("root", default="exercises", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option("-j", "--workers", default=os.cpu_count() or 1, help="Number of exercises verified in parallel")
+@click.option("--timeout", default=60.0, help="Per-exercise timeout in seconds")
+@click.option("--fail-fast", is_flag=True, help="Stop after the first failing exercise")
+@click.option("--json", "json_path", type=click.Path(dir_okay=False, path_type=Path), help="Write results as JSON")
+@click.option("--junit", "junit_path", type=click.Path(dir_okay=False, path_type=Path), help="Write results as JUnit XML")
+def main(root, workers, timeout, fail_fast, json_path, junit_path):
+    exercises = find_exercises(root)
+    start = time.perf_counter()
+    results = run_all(exercises, workers, timeout, fail_fast)
+    elapsed = time.perf_counter() - start
+
+    if json_path:
+        write_json(results, json_path)
+    if junit_path:
+        write_junit(results, junit_path)
+
+    passed = sum(r.passed for r in results)
+    print(f"\nSummary: {passed}/{len(exercises)} exercises passed in {elapsed:.2f}s")
+    raise SystemExit(0 if passed == len(exercises) else 1)
+
 
 if __name__ == "__main__":
-    exercises = Path("exercises").glob("*/*")
-    results = [verify_exercise(ex) for ex in exercises if (ex / "meta.toml").exists()]
-    print(f"\nSummary: {sum(results)}/{len(results)} exercises passed")
+    main()